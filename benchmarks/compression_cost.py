@@ -0,0 +1,70 @@
+"""
+Цена сжатия ответа /pvz-info: процессорное время против сэкономленных байт для каждой доступной кодировки
+(zstd и br - если установлены zstandard и brotli), а также стоимость повторной отдачи из кэша страниц.
+
+БД не нужна - тело собирается из строк, сгенерированных в памяти:
+
+    python -m benchmarks.compression_cost --page-size 100 --receptions 5 --products 20
+"""
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from time import perf_counter, process_time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.pvz_info_allocations import generate_rows, record_path
+from src.compression import CompressionConfig, build_encoders
+from src.page_cache import CachedPage, PageCache
+
+LEVELS: Dict[str, List[Tuple[str, int]]] = {
+    "gzip": [("GZIP_LEVEL", 1), ("GZIP_LEVEL", 6), ("GZIP_LEVEL", 9)],
+    "br": [("BROTLI_QUALITY", 1), ("BROTLI_QUALITY", 5), ("BROTLI_QUALITY", 9)],
+    "zstd": [("ZSTD_LEVEL", 1), ("ZSTD_LEVEL", 3), ("ZSTD_LEVEL", 9)],
+}
+
+
+def measure(encoder: Callable[[bytes], bytes], body: bytes, repeat: int) -> Tuple[float, int]:
+    size: int = len(encoder(body))
+    started: float = process_time()
+    for _ in range(repeat):
+        encoder(body)
+
+    return (process_time() - started) * 1000 / repeat, size
+
+
+async def cached_hits(body: bytes, encoding: str, repeat: int) -> float:
+    cache: PageCache = PageCache(name="benchmark", max_entries=1, max_bytes=len(body) * 2)
+    page: CachedPage = cache.put("page", 1, body)
+    await cache.encoded(page, encoding)
+
+    started: float = perf_counter()
+    for _ in range(repeat):
+        await cache.response(page, encoding, {})
+
+    return (perf_counter() - started) * 1000 / repeat
+
+
+def main(args: Namespace) -> None:
+    body: bytes = record_path(generate_rows(args))
+    print(f"page_size={args.page_size} receptions={args.receptions} products={args.products} body={len(body)} bytes")
+
+    for encoding in build_encoders():
+        for setting, level in LEVELS[encoding]:
+            encoder: Callable[[bytes], bytes] = build_encoders(CompressionConfig(**{setting: level}))[encoding]
+            cpu_ms, size = measure(encoder, body, args.repeat)
+            print(
+                f"{encoding:<5} level={level:<3} cpu={cpu_ms:>8.2f} ms  out={size:>9} bytes  "
+                f"ratio={len(body) / size:>6.1f}x  saved={(len(body) - size) / 1024:>8.1f} KiB  "
+                f"saved_per_cpu_ms={(len(body) - size) / 1024 / max(cpu_ms, 1e-6):>8.1f} KiB"
+            )
+
+    for encoding in build_encoders():
+        print(f"{encoding:<5} cached variant: {run(cached_hits(body, encoding, args.repeat)) * 1000:.1f} us/response")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--receptions", type=int, default=5)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+from asyncio import (
+    Queue,
+    StreamReader,
+    StreamWriter,
+    Server,
+    create_task,
+    gather,
+    get_running_loop,
+    open_connection,
+    sleep,
+    start_server,
+)
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+
+@dataclass
+class LatencyProxy:
+    """TCP-прокси перед Postgres: добавляет задержку сети и считает roundtrip-ы клиента"""
+
+    upstream_host: str
+    upstream_port: int
+    delay_ms: float = 0.0
+    roundtrips: int = 0
+    _server: Optional[Server] = field(default=None, repr=False)
+    _last_direction: str = field(default="server", repr=False)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        self._server = await start_server(self._handle, host=host, port=port)
+        address: Tuple[str, int] = self._server.sockets[0].getsockname()[:2]
+        return address
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset(self) -> None:
+        self.roundtrips = 0
+        self._last_direction = "server"
+
+    async def _handle(self, client_reader: StreamReader, client_writer: StreamWriter) -> None:
+        server_reader, server_writer = await open_connection(host=self.upstream_host, port=self.upstream_port)
+        await gather(
+            self._pipe(client_reader, server_writer, direction="client"),
+            self._pipe(server_reader, client_writer, direction="server"),
+            return_exceptions=True,
+        )
+
+    async def _pipe(self, reader: StreamReader, writer: StreamWriter, direction: str) -> None:
+        """Задержка в одну сторону - половина RTT; порядок пакетов сохраняется очередью"""
+        queue: Queue = Queue()
+        one_way: float = self.delay_ms / 2000
+
+        async def sender() -> None:
+            while True:
+                due, chunk = await queue.get()
+                if chunk is None:
+                    writer.close()
+                    return
+                await sleep(max(0.0, due - get_running_loop().time()))
+                writer.write(chunk)
+                await writer.drain()
+
+        sender_task = create_task(sender())
+        try:
+            while True:
+                chunk: bytes = await reader.read(65536)
+                if not chunk:
+                    break
+                # Новый roundtrip - клиент снова пишет после ответа сервера
+                if direction == "client" and self._last_direction == "server":
+                    self.roundtrips += 1
+                self._last_direction = direction
+                await queue.put((get_running_loop().time() + one_way, chunk))
+        finally:
+            await queue.put((0.0, None))
+            await sender_task
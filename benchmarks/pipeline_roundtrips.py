@@ -0,0 +1,120 @@
+"""
+Сравнение последовательных запросов и pipeline-режима для DeleteLastProduct / CloseReception.
+
+Между приложением и Postgres ставится LatencyProxy, который добавляет задержку сети и считает roundtrip-ы.
+Нужна локальная БД со схемой из postgres.sql.migrations (настройки из .env.postgres.local):
+
+    python -m benchmarks.pipeline_roundtrips --delay-ms 5 --iterations 50
+"""
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from os import environ
+from statistics import median
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from benchmarks.latency_proxy import LatencyProxy
+
+
+async def legacy_delete(accepting_id: int, product_id: int) -> Tuple:
+    """Прежняя реализация DeleteLastProduct.delete - SELECT, DELETE, UPDATE по очереди"""
+    from postgres.config import primary
+
+    async with primary() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT id, accepting_id, type, datetime FROM products WHERE accepting_id = %s AND id = %s",
+                (accepting_id, product_id)
+            )
+            product = await cursor.fetchone()
+            await cursor.execute("DELETE FROM products WHERE id = %s AND accepting_id = %s", (product_id, accepting_id))
+            await cursor.execute(
+                "UPDATE accepting_products SET product_id = array_remove(product_id, %s) WHERE id = %s "
+                "RETURNING product_id",
+                (product_id, accepting_id)
+            )
+            await cursor.fetchone()
+            return product  # type: ignore[return-value]
+
+
+async def legacy_close(pvz_id: int) -> Tuple:
+    """Прежняя реализация CloseReception.close - SELECT, затем UPDATE"""
+    from postgres.config import primary
+
+    async with primary() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT id, pvz_id, status FROM accepting_products WHERE pvz_id = %s AND status = 'in_progress'",
+                (pvz_id,)
+            )
+            reception = await cursor.fetchone()
+            await cursor.execute(
+                "UPDATE accepting_products SET status = 'close' WHERE id = %s RETURNING id, pvz_id, status",
+                (reception[0],)  # type: ignore[index]
+            )
+            return await cursor.fetchone()  # type: ignore[return-value]
+
+
+async def measure(
+        proxy: LatencyProxy,
+        call: Callable[[], Awaitable[Tuple]],
+        samples: Dict[str, List[float]],
+        name: str
+) -> None:
+    proxy.reset()
+    started: float = perf_counter()
+    await call()
+    samples.setdefault(f"{name}:ms", []).append((perf_counter() - started) * 1000)
+    samples.setdefault(f"{name}:roundtrips", []).append(proxy.roundtrips)
+
+
+async def main(args: Namespace) -> None:
+    proxy: LatencyProxy = LatencyProxy(upstream_host=args.pg_host, upstream_port=args.pg_port, delay_ms=args.delay_ms)
+    host, port = await proxy.start()
+
+    # Мутации подключаются к прокси: load_dotenv не перетирает уже заданные переменные
+    environ["PSG_LOCAL_HOST"] = host
+    environ["PSG_LOCAL_PORT"] = str(port)
+
+    from postgres.sql.mutation import PVZ, InitReceptions, AddProduct, DeleteLastProduct, CloseReception
+
+    pvz_id: int = (await PVZ(city="Москва").create()).id  # type: ignore[union-attr]
+    samples: Dict[str, List[float]] = {}
+
+    for _ in range(args.iterations):
+        for variant in ("legacy", "pipeline"):
+            accepting_id: int = (await InitReceptions(pvz_id=pvz_id).init()).id  # type: ignore[union-attr]
+            product_id: int = (await AddProduct(  # type: ignore[union-attr]
+                accepting_id=accepting_id, product_type="обувь").add()).id
+
+            if variant == "legacy":
+                await measure(proxy, lambda: legacy_delete(accepting_id, product_id), samples, "delete:legacy")
+                await measure(proxy, lambda: legacy_close(pvz_id), samples, "close:legacy")
+            else:
+                await measure(
+                    proxy,
+                    lambda: DeleteLastProduct(accepting_id=accepting_id, product_id=product_id).delete(),  # type: ignore
+                    samples,
+                    "delete:pipeline"
+                )
+                await measure(
+                    proxy, lambda: CloseReception(pvz_id=pvz_id).close(), samples, "close:pipeline"  # type: ignore
+                )
+
+    from postgres.config import ROUTER
+
+    await ROUTER.close()
+    await proxy.stop()
+
+    print(f"delay={args.delay_ms}ms iterations={args.iterations} (соединения из общего пула)")
+    for name in sorted(samples):
+        print(f"{name:<28} median={median(samples[name]):.2f}")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--pg-host", default=environ.get("PSG_LOCAL_HOST", "127.0.0.1"))
+    parser.add_argument("--pg-port", type=int, default=int(environ.get("PSG_LOCAL_PORT", "5432")))
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--iterations", type=int, default=50)
+    run(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+"""
+Аллокации на пути /pvz-info (tracemalloc): прежние кортежи -> пересборка словарей -> __dict__ -> JSONResponse
+против строк PVZInfoRow из class_row, сериализуемых RecordJSONResponse напрямую.
+
+БД не нужна - строки генерируются в памяти в том виде, в котором их отдает psycopg:
+
+    python -m benchmarks.pvz_info_allocations --page-size 100 --receptions 5 --products 20
+"""
+from argparse import ArgumentParser, Namespace
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from postgres.dto import PVZInfoRow
+from src.responses import RecordJSONResponse
+from src.sso.dto import PVZInfoResponse
+
+
+@dataclass
+class LegacyPVZInfoResponse:
+    result: Optional[Dict[str, bool]] = None
+    errors: Optional[str] = None
+    pvz_list: Optional[List[Any]] = None
+    total: Optional[int] = None
+    page: Optional[int] = None
+    page_size: Optional[int] = None
+
+
+def generate_rows(args: Namespace) -> List[Tuple[int, str, datetime, List[Dict[str, Any]]]]:
+    registered_at: datetime = datetime.fromisoformat("2025-04-01T10:00:00+03:00")
+    rows = []
+    for pvz_id in range(1, args.page_size + 1):
+        receptions: List[Dict[str, Any]] = []
+        for reception_index in range(args.receptions):
+            reception_id: int = pvz_id * 1000 + reception_index
+            products: List[Dict[str, Any]] = [
+                {
+                    "id": reception_id * 1000 + product_index,
+                    "accepting_id": reception_id,
+                    "datetime": (registered_at + timedelta(minutes=product_index)).isoformat(),
+                    "type": "электроника",
+                }
+                for product_index in range(args.products)
+            ]
+            receptions.append({
+                "id": reception_id,
+                "pvz_id": pvz_id,
+                "datetime": registered_at.isoformat(),
+                "product_ids": [product["id"] for product in products],
+                "status": "close",
+                "products": products,
+            })
+        rows.append((pvz_id, "Москва", registered_at, receptions))
+
+    return rows
+
+
+def legacy_path(rows: List[Tuple[int, str, datetime, List[Dict[str, Any]]]]) -> bytes:
+    formatted_data = [
+        {
+            "id": row[0],
+            "city": row[1],
+            "registered_at": str(row[2]),
+            "receptions": [
+                {
+                    "id": reception["id"],
+                    "pvz_id": reception["pvz_id"],
+                    "datetime": str(reception["datetime"]),
+                    "product_ids": reception["product_ids"],
+                    "status": reception["status"],
+                    "products": [
+                        {
+                            "id": product["id"],
+                            "accepting_id": product["accepting_id"],
+                            "datetime": str(product["datetime"]),
+                            "type": product["type"]
+                        }
+                        for product in reception["products"]
+                    ]
+                }
+                for reception in row[3]
+            ]
+        }
+        for row in rows
+    ]
+    result = LegacyPVZInfoResponse(pvz_list=formatted_data, total=len(rows), page=1, page_size=len(rows),
+                                   result={"status": True})
+    return JSONResponse(content=result.__dict__).body
+
+
+def record_path(rows: List[Tuple[int, str, datetime, List[Dict[str, Any]]]]) -> bytes:
+    # Строки PVZInfoRow создает row_factory курсора - в замер входит только их создание
+    pvz_data: List[PVZInfoRow] = [PVZInfoRow(*row) for row in rows]
+    result = PVZInfoResponse(pvz_list=pvz_data, total=len(rows), page=1, page_size=len(rows), result={"status": True})
+    return RecordJSONResponse(content=result).body
+
+
+def measure(call: Callable[[List[Any]], bytes], rows: List[Any], repeat: int) -> Tuple[float, float, int]:
+    start()
+    reset_peak()
+    baseline, _ = get_traced_memory()
+    body: bytes = call(rows)
+    _, peak = get_traced_memory()
+    stop()
+
+    started: float = perf_counter()
+    for _ in range(repeat):
+        call(rows)
+    elapsed_ms: float = (perf_counter() - started) * 1000 / repeat
+
+    return (peak - baseline) / 1024, elapsed_ms, len(body)
+
+
+def main(args: Namespace) -> None:
+    rows = generate_rows(args)
+    assert legacy_path(rows) == record_path(rows), "Ответы должны совпадать побайтово"
+
+    print(f"page_size={args.page_size} receptions={args.receptions} products={args.products}")
+    for name, call in (("legacy", legacy_path), ("records", record_path)):
+        peak_kib, elapsed_ms, size = measure(call, rows, args.repeat)
+        print(f"{name:<8} peak={peak_kib:>10.1f} KiB  time={elapsed_ms:>8.2f} ms  body={size} bytes")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--receptions", type=int, default=5)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+"""
+/pvz-info: один запрос с json_agg и подзапросом товаров на каждую приемку против двухфазной загрузки
+(страница ПВЗ, затем приемки и товары страницы по = ANY) при разном числе приемок на ПВЗ.
+
+Для каждого соотношения таблицы ОЧИЩАЮТСЯ и заполняются генератором benchmarks/synthetic_data.py, затем оба
+варианта выполняются на одних и тех же страницах; совпадение результатов проверяется. Нужна локальная БД
+со схемой после python -m postgres.sql.migrations (настройки из .env.postgres.local):
+
+    python -m benchmarks.pvz_info_loader --pvz 5000 --ratios 1 5 20 50 --products 0 20 --iterations 20
+"""
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from statistics import median
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic_data import (
+    ChunkPlan,
+    SyntheticConfig,
+    finalize,
+    plan_chunks,
+    prepare,
+    run_chunk,
+)
+from postgres.dto import PVZInfoRow
+
+
+def seed(args: Namespace, receptions_per_pvz: int) -> None:
+    config: SyntheticConfig = SyntheticConfig(
+        seed=args.seed,
+        users=0,
+        pvz=args.pvz,
+        receptions=(receptions_per_pvz, receptions_per_pvz),
+        products=(args.products[0], args.products[1]),
+        open_ratio=0.3,
+        moderator_ratio=0.0,
+        start=datetime.fromisoformat(args.start),
+        days=args.days,
+        chunk_size=500,
+        users_chunk_size=50000,
+    )
+    _, *base_ids = run(prepare(truncate=True))
+    plans: List[ChunkPlan] = plan_chunks(config, (base_ids[0], base_ids[1], base_ids[2]))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(run_chunk, [config] * len(plans), plans))
+    run(finalize())
+
+
+def canonical(rows: Optional[List[PVZInfoRow]]) -> List[Tuple[int, List[Tuple[Any, ...]]]]:
+    """Порядок приемок и товаров у json_agg не определен, а даты - строки в формате Postgres"""
+    return [
+        (row.id, sorted(
+            (
+                reception["id"],
+                datetime.fromisoformat(reception["datetime"]),
+                reception["product_count"],
+                tuple(sorted(product["id"] for product in reception["products"])),
+            )
+            for reception in row.receptions
+        ))
+        for row in rows or []
+    ]
+
+
+async def measure(args: Namespace, pages: List[int]) -> Dict[str, List[float]]:
+    from postgres.config import ROUTER
+    from postgres.sql.mutation import GetPVZInfo
+
+    start_date: datetime = datetime.fromisoformat(args.start)
+    end_date: datetime = datetime.fromisoformat(args.end)
+    samples: Dict[str, List[float]] = {"json_agg": [], "batched": []}
+
+    for page in pages:
+        results: Dict[str, Any] = {}
+        for _ in range(args.iterations):
+            for name, batched in (("json_agg", False), ("batched", True)):
+                started: float = perf_counter()
+                pvz_data, _, _ = await GetPVZInfo(
+                    page=page, page_size=args.page_size, start_date=start_date, end_date=end_date,
+                    parallel_count=False, batched=batched
+                ).get()
+                samples[name].append((perf_counter() - started) * 1000)
+                results[name] = canonical(pvz_data)
+
+        if results["json_agg"] != results["batched"]:
+            raise Exception(f"Варианты вернули разные данные для страницы {page}")
+
+    await ROUTER.close()
+    return samples
+
+
+def main(args: Namespace) -> None:
+    last_page: int = max(1, args.pvz // args.page_size)
+    pages: List[int] = sorted({1, max(1, last_page // 2), last_page})
+
+    print(f"pvz={args.pvz} products={args.products} page_size={args.page_size} pages={pages}")
+    for ratio in args.ratios:
+        seed(args, ratio)
+        samples: Dict[str, List[float]] = run(measure(args, pages))
+        summary: str = " ".join(f"{name}={median(values):.2f}ms" for name, values in samples.items())
+        speedup: float = median(samples["json_agg"]) / median(samples["batched"])
+        print(f"receptions/pvz={ratio:<4} {summary} speedup={speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pvz", type=int, default=5000)
+    parser.add_argument("--ratios", type=int, nargs="+", default=[1, 5, 20, 50], help="приемок на ПВЗ")
+    parser.add_argument("--products", type=int, nargs=2, default=[0, 20], metavar=("MIN", "MAX"))
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--start", default="2024-01-01T00:00:00+03:00")
+    parser.add_argument("--end", default="2025-01-01T00:00:00+03:00")
+    parser.add_argument("--days", type=int, default=365)
+    main(parser.parse_args())
@@ -0,0 +1,73 @@
+"""
+Задержка GetPVZInfo: count на том же соединении после страницы против count на втором соединении пула.
+
+Нужна локальная БД с данными из benchmarks/synthetic_data.py (настройки из .env.postgres.local). Между приложением
+и Postgres можно поставить LatencyProxy - с задержкой сети выигрыш параллельного count виден и на малых объемах:
+
+    python -m benchmarks.synthetic_data --truncate --seed 42 --pvz 20000 --receptions 1 20 --products 0 30 --workers 8
+    python -m benchmarks.pvz_info_parallel_count --iterations 30 --delay-ms 2
+"""
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from datetime import datetime
+from os import environ
+from statistics import median
+from time import perf_counter
+from typing import Dict, List
+
+from benchmarks.latency_proxy import LatencyProxy
+
+
+async def main(args: Namespace) -> None:
+    proxy: LatencyProxy = LatencyProxy(upstream_host=args.pg_host, upstream_port=args.pg_port, delay_ms=args.delay_ms)
+    host, port = await proxy.start()
+
+    # Мутации подключаются к прокси: load_dotenv не перетирает уже заданные переменные
+    environ["PSG_LOCAL_HOST"] = host
+    environ["PSG_LOCAL_PORT"] = str(port)
+
+    from postgres.config import ROUTER
+    from postgres.sql.mutation import GetPVZInfo
+
+    start_date: datetime = datetime.fromisoformat(args.start_date)
+    end_date: datetime = datetime.fromisoformat(args.end_date)
+    samples: Dict[str, List[float]] = {}
+
+    # Прогрев: пул открыт на оба соединения, страницы и индексы в shared_buffers
+    for parallel_count in (False, True):
+        await GetPVZInfo(
+            page=args.page, page_size=args.page_size, start_date=start_date, end_date=end_date,
+            parallel_count=parallel_count
+        ).get()
+
+    for _ in range(args.iterations):
+        for parallel_count in (False, True):
+            started: float = perf_counter()
+            await GetPVZInfo(
+                page=args.page, page_size=args.page_size, start_date=start_date, end_date=end_date,
+                parallel_count=parallel_count
+            ).get()
+            name: str = "parallel" if parallel_count else "sequential"
+            samples.setdefault(name, []).append((perf_counter() - started) * 1000)
+
+    await ROUTER.close()
+    await proxy.stop()
+
+    print(f"delay={args.delay_ms}ms iterations={args.iterations} page={args.page} page_size={args.page_size}")
+    for name in ("sequential", "parallel"):
+        ordered: List[float] = sorted(samples[name])
+        p95: float = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{name:<12} median={median(ordered):.2f}ms p95={p95:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--pg-host", default=environ.get("PSG_LOCAL_HOST", "127.0.0.1"))
+    parser.add_argument("--pg-port", type=int, default=int(environ.get("PSG_LOCAL_PORT", "5432")))
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--start-date", default="2024-01-01T00:00:00+03:00")
+    parser.add_argument("--end-date", default="2026-01-01T00:00:00+03:00")
+    run(main(parser.parse_args()))
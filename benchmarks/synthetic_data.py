@@ -0,0 +1,300 @@
+"""
+Генератор синтетических данных для схемы из postgres.sql.migrations: пользователи, ПВЗ в трех городах, приемки
+(закрытые и не более одной открытой на ПВЗ, распределены по времени) и товары в них.
+
+Данные детерминированы сидом и не зависят от числа процессов: ПВЗ и пользователи разбиты на чанки фиксированного
+размера, у каждого чанка свои генераторы, а диапазоны id всех чанков считаются до загрузки. Чанки грузятся через
+COPY параллельно - каждый в своем процессе и своей транзакции. Пример на ~10M товаров:
+
+    python -m benchmarks.synthetic_data --truncate --seed 42 --users 100000 --pvz 70000 \\
+        --receptions 1 20 --products 0 30 --workers 8
+"""
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from random import Random
+from time import perf_counter
+from typing import Iterator, List, Optional, Tuple
+
+from bcrypt import hashpw
+
+from postgres.config import connect
+from src.sso.constants import VALID_CITIES, VALID_PRODUCT_TYPES, VALID_USER_TYPES
+
+CITIES: Tuple[str, ...] = tuple(VALID_CITIES.values())
+PRODUCT_TYPES: Tuple[str, ...] = tuple(VALID_PRODUCT_TYPES.values())
+BCRYPT_ALPHABET: str = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+PVZRecord = Tuple[int, str, datetime]
+ReceptionRecord = Tuple[int, int, datetime, List[int], str]
+ProductRecord = Tuple[int, int, datetime, str]
+UserRecord = Tuple[int, str, str, str, str]
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    seed: int
+    users: int
+    pvz: int
+    receptions: Tuple[int, int]
+    products: Tuple[int, int]
+    open_ratio: float
+    moderator_ratio: float
+    start: datetime
+    days: int
+    chunk_size: int
+    users_chunk_size: int
+
+
+@dataclass(frozen=True)
+class ChunkPlan:
+    index: int
+    first_pvz_id: int
+    pvz_count: int
+    first_reception_id: int
+    first_product_id: int
+    receptions: int
+    products: int
+
+
+@dataclass(frozen=True)
+class UsersPlan:
+    index: int
+    first_user_id: int
+    count: int
+
+
+def chunk_random(config: SyntheticConfig, stream: str, index: int) -> Random:
+    """Отдельный поток случайных чисел на чанк: результат не зависит от порядка и параллелизма загрузки"""
+    return Random(f"{config.seed}:{stream}:{index}")
+
+
+def chunk_shape(config: SyntheticConfig, index: int, pvz_count: int) -> List[List[int]]:
+    """Число товаров в каждой приемке каждого ПВЗ чанка - отдельно от содержимого, чтобы заранее знать диапазоны id"""
+    rng: Random = chunk_random(config, "shape", index)
+    return [
+        [rng.randint(*config.products) for _ in range(rng.randint(*config.receptions))]
+        for _ in range(pvz_count)
+    ]
+
+
+def plan_chunks(config: SyntheticConfig, base_ids: Tuple[int, int, int]) -> List[ChunkPlan]:
+    base_pvz_id, base_reception_id, base_product_id = base_ids
+    plans: List[ChunkPlan] = []
+    reception_id, product_id = base_reception_id + 1, base_product_id + 1
+
+    for index, first in enumerate(range(0, config.pvz, config.chunk_size)):
+        pvz_count: int = min(config.chunk_size, config.pvz - first)
+        shape: List[List[int]] = chunk_shape(config, index, pvz_count)
+        receptions: int = sum(len(counts) for counts in shape)
+        products: int = sum(sum(counts) for counts in shape)
+
+        plans.append(ChunkPlan(
+            index=index,
+            first_pvz_id=base_pvz_id + first + 1,
+            pvz_count=pvz_count,
+            first_reception_id=reception_id,
+            first_product_id=product_id,
+            receptions=receptions,
+            products=products,
+        ))
+        reception_id, product_id = reception_id + receptions, product_id + products
+
+    return plans
+
+
+def plan_users(config: SyntheticConfig, base_user_id: int) -> List[UsersPlan]:
+    return [
+        UsersPlan(
+            index=index,
+            first_user_id=base_user_id + first + 1,
+            count=min(config.users_chunk_size, config.users - first)
+        )
+        for index, first in enumerate(range(0, config.users, config.users_chunk_size))
+    ]
+
+
+def generate_chunk(
+        config: SyntheticConfig,
+        plan: ChunkPlan
+) -> Tuple[List[PVZRecord], List[ReceptionRecord], List[ProductRecord]]:
+    rng: Random = chunk_random(config, "rows", plan.index)
+    span: timedelta = timedelta(days=config.days)
+    end: datetime = config.start + span
+    reception_id, product_id = plan.first_reception_id, plan.first_product_id
+
+    pvz_rows: List[PVZRecord] = []
+    reception_rows: List[ReceptionRecord] = []
+    product_rows: List[ProductRecord] = []
+
+    for offset, counts in enumerate(chunk_shape(config, plan.index, plan.pvz_count)):
+        pvz_id: int = plan.first_pvz_id + offset
+        # ПВЗ открываются в первой четверти периода, приемки распределены от открытия до конца периода
+        registered_at: datetime = config.start + span * rng.random() * 0.25
+        pvz_rows.append((pvz_id, rng.choice(CITIES), registered_at))
+
+        moments: List[datetime] = sorted(registered_at + (end - registered_at) * rng.random() for _ in counts)
+        last_is_open: bool = rng.random() < config.open_ratio
+
+        for position, (moment, product_count) in enumerate(zip(moments, counts)):
+            product_ids: List[int] = list(range(product_id, product_id + product_count))
+            status: str = "in_progress" if last_is_open and position == len(counts) - 1 else "close"
+            reception_rows.append((reception_id, pvz_id, moment, product_ids, status))
+
+            accepted_at: datetime = moment
+            for current_id in product_ids:
+                accepted_at += timedelta(seconds=rng.randint(1, 120))
+                product_rows.append((current_id, reception_id, accepted_at, rng.choice(PRODUCT_TYPES)))
+
+            reception_id, product_id = reception_id + 1, product_id + product_count
+
+    return pvz_rows, reception_rows, product_rows
+
+
+def generate_users(config: SyntheticConfig, plan: UsersPlan, hashed: str) -> Iterator[UserRecord]:
+    rng: Random = chunk_random(config, "users", plan.index)
+    for user_id in range(plan.first_user_id, plan.first_user_id + plan.count):
+        user_type: str = VALID_USER_TYPES["moderator" if rng.random() < config.moderator_ratio else "client"]
+        yield user_id, user_type, f"user{user_id:08d}", f"user{user_id:08d}@example.com", hashed
+
+
+def password_hash(config: SyntheticConfig, password: str, rounds: int) -> str:
+    """Один bcrypt-хеш на всех пользователей (хешировать миллионы паролей слишком долго); соль - из сида"""
+    rng: Random = chunk_random(config, "password", 0)
+    salt: str = "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + rng.choice(".Oeu")
+    return hashpw(password.encode("utf-8"), f"$2b${rounds:02d}${salt}".encode("utf-8")).decode("utf-8")
+
+
+async def load_chunk(config: SyntheticConfig, plan: ChunkPlan) -> Tuple[int, int, int, int]:
+    pvz_rows, reception_rows, product_rows = generate_chunk(config, plan)
+
+    async with await connect() as connection:
+        async with connection.cursor() as cursor:
+            async with cursor.copy("COPY pvz_list (id, city, registered_at) FROM STDIN") as copy:
+                for pvz_row in pvz_rows:
+                    await copy.write_row(pvz_row)
+            async with cursor.copy(
+                    "COPY accepting_products (id, pvz_id, datetime, product_id, status) FROM STDIN"
+            ) as copy:
+                for reception_row in reception_rows:
+                    await copy.write_row(reception_row)
+            async with cursor.copy("COPY products (id, accepting_id, datetime, type) FROM STDIN") as copy:
+                for product_row in product_rows:
+                    await copy.write_row(product_row)
+
+    return 0, len(pvz_rows), len(reception_rows), len(product_rows)
+
+
+async def load_users(config: SyntheticConfig, plan: UsersPlan, hashed: str) -> Tuple[int, int, int, int]:
+    async with await connect() as connection:
+        async with connection.cursor() as cursor:
+            async with cursor.copy("COPY users (id, user_type, username, email, password) FROM STDIN") as copy:
+                for user_row in generate_users(config, plan, hashed):
+                    await copy.write_row(user_row)
+
+    return plan.count, 0, 0, 0
+
+
+def run_chunk(config: SyntheticConfig, plan: ChunkPlan) -> Tuple[int, int, int, int]:
+    return run(load_chunk(config, plan))
+
+
+def run_users(config: SyntheticConfig, plan: UsersPlan, hashed: str) -> Tuple[int, int, int, int]:
+    return run(load_users(config, plan, hashed))
+
+
+async def prepare(truncate: bool) -> Tuple[int, int, int, int]:
+    """Опционально очищает таблицы; возвращает текущие максимальные id (users, pvz, приемки, товары)"""
+    async with await connect() as connection:
+        if truncate:
+            await connection.execute("TRUNCATE products, accepting_products, pvz_list, users RESTART IDENTITY CASCADE")
+
+        cursor = await connection.execute(
+            """
+                SELECT (SELECT COALESCE(max(id), 0) FROM users),
+                       (SELECT COALESCE(max(id), 0) FROM pvz_list),
+                       (SELECT COALESCE(max(id), 0) FROM accepting_products),
+                       (SELECT COALESCE(max(id), 0) FROM products)
+            """
+        )
+        base_ids: Optional[Tuple[int, int, int, int]] = await cursor.fetchone()
+        if base_ids is None:
+            raise Exception("Не удалось прочитать текущие id")
+
+        return base_ids
+
+
+async def finalize() -> None:
+    """id заданы явно - сдвигаем SERIAL-последовательности и обновляем статистику для планировщика"""
+    async with await connect() as connection:
+        await connection.set_autocommit(True)
+        for table in ("users", "pvz_list", "accepting_products", "products"):
+            await connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(max(id), 1), max(id) IS NOT NULL) "
+                f"FROM {table}"
+            )
+            await connection.execute(f"ANALYZE {table}")
+
+
+def main(args: Namespace) -> None:
+    config: SyntheticConfig = SyntheticConfig(
+        seed=args.seed,
+        users=args.users,
+        pvz=args.pvz,
+        receptions=(args.receptions[0], args.receptions[1]),
+        products=(args.products[0], args.products[1]),
+        open_ratio=args.open_ratio,
+        moderator_ratio=args.moderator_ratio,
+        start=datetime.fromisoformat(args.start),
+        days=args.days,
+        chunk_size=args.chunk_size,
+        users_chunk_size=args.users_chunk_size,
+    )
+
+    started: float = perf_counter()
+    base_user_id, *base_ids = run(prepare(args.truncate))
+    plans: List[ChunkPlan] = plan_chunks(config, (base_ids[0], base_ids[1], base_ids[2]))
+    users: List[UsersPlan] = plan_users(config, base_user_id)
+    hashed: str = password_hash(config, args.password, args.bcrypt_rounds)
+    print(
+        f"план: users={config.users} pvz={config.pvz} receptions={sum(plan.receptions for plan in plans)} "
+        f"products={sum(plan.products for plan in plans)} chunks={len(plans) + len(users)} workers={args.workers}"
+    )
+
+    totals: List[int] = [0, 0, 0, 0]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures: List[Future] = [executor.submit(run_users, config, plan, hashed) for plan in users]
+        futures += [executor.submit(run_chunk, config, plan) for plan in plans]
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            totals = [total + count for total, count in zip(totals, future.result())]
+            print(f"\r{done}/{len(futures)} чанков", end="", flush=True)
+
+    run(finalize())
+    elapsed: float = perf_counter() - started
+    print(
+        f"\nзагружено за {elapsed:.1f} с: users={totals[0]} pvz={totals[1]} receptions={totals[2]} "
+        f"products={totals[3]} ({sum(totals) / elapsed:.0f} строк/с); пароль пользователей - {args.password!r}"
+    )
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pvz", type=int, default=1000)
+    parser.add_argument("--receptions", type=int, nargs=2, default=[1, 20], metavar=("MIN", "MAX"))
+    parser.add_argument("--products", type=int, nargs=2, default=[0, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--open-ratio", type=float, default=0.3, help="доля ПВЗ с открытой последней приемкой")
+    parser.add_argument("--moderator-ratio", type=float, default=0.05)
+    parser.add_argument("--start", default="2024-01-01T00:00:00+03:00")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-size", type=int, default=500, help="ПВЗ в одном чанке (влияет на данные)")
+    parser.add_argument("--users-chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед загрузкой")
+    main(parser.parse_args())
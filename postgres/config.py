@@ -1,9 +1,44 @@
-from dotenv import load_dotenv, find_dotenv
+from asyncio import Lock
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from os import getenv
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
 from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg.sql import SQL, Literal
+from psycopg_pool import AsyncConnectionPool
 
-load_dotenv(find_dotenv(filename=".env.postgres.local"))
+from src.env import load_env
+from src.metrics import METRICS
+
+load_env()
+
+METRICS.describe("db_read_route_total", "counter", "Чтения по месту выполнения (target: replica, primary)")
+METRICS.describe("db_statement_timeout_sets_total", "counter", "Смены statement_timeout на соединениях пула")
+
+# Бюджет statement_timeout текущего HTTP-запроса в секундах - выставляет RequestDeadlineMiddleware
+REQUEST_STATEMENT_TIMEOUT: ContextVar[Optional[float]] = ContextVar("request_statement_timeout", default=None)
+
+# Бюджеты отдельных мутаций (секунды); действует меньший из бюджета мутации и бюджета запроса
+DEFAULT_STATEMENT_BUDGETS: Dict[str, float] = {
+    "GetPVZInfo": 10.0,
+    "SearchProducts": 30.0,
+    "CloseStaleReceptions": 60.0,
+    "SweepExpiredSessions": 60.0,
+}
+
+
+def parse_timeouts(raw: str) -> Dict[str, float]:
+    """Формат: "GetPVZInfo=10;/pvz-info=5" (имя или маршрут = секунды)"""
+    timeouts: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in raw.split(";"))):
+        name, seconds = item.split("=", 1)
+        timeouts[name.strip()] = float(seconds)
+
+    return timeouts
 
 
 @dataclass
@@ -13,6 +48,30 @@ class PSQLConfig:
     DB_PASSWORD: str = getenv("PSG_LOCAL_PASSWORD", default="")
     DB_HOST: str = getenv("PSG_LOCAL_HOST", default="localhost")
     DB_PORT: str = getenv("PSG_LOCAL_PORT", default="5432")
+    DB_TIMEZONE: str = getenv("PSG_TIMEZONE", default="Europe/Moscow")
+
+    POOL_MIN_SIZE: int = int(getenv("PSG_POOL_MIN_SIZE", default=1))
+    POOL_MAX_SIZE: int = int(getenv("PSG_POOL_MAX_SIZE", default=10))
+
+    # Реплики - libpq-строки или URI через ";"
+    REPLICA_DSNS: str = getenv("PSG_REPLICA_DSNS", default="")
+    REPLICA_MAX_LAG_SECONDS: float = float(getenv("PSG_REPLICA_MAX_LAG_SECONDS", default=5))
+    REPLICA_LAG_CHECK_INTERVAL: float = float(getenv("PSG_REPLICA_LAG_CHECK_INTERVAL", default=1))
+    REPLICA_ACQUIRE_TIMEOUT: float = float(getenv("PSG_REPLICA_ACQUIRE_TIMEOUT", default=0.5))
+
+    STATEMENT_TIMEOUTS: str = getenv("PSG_STATEMENT_TIMEOUTS", default="")
+
+    # count для /pvz-info - на втором соединении пула параллельно со страницей
+    PVZ_INFO_PARALLEL_COUNT: bool = getenv("PSG_PVZ_INFO_PARALLEL_COUNT", default="true").lower() == "true"
+    # Сколько запросов одновременно держат второе соединение под count; остальные считают в своем пакете
+    PVZ_INFO_COUNT_SLOTS: int = int(getenv("PSG_PVZ_INFO_COUNT_SLOTS", default=max(POOL_MAX_SIZE // 2, 1)))
+    # Страница /pvz-info двумя фазами (ПВЗ, затем приемки и товары по = ANY) вместо json_agg в одном запросе
+    PVZ_INFO_BATCHED: bool = getenv("PSG_PVZ_INFO_BATCHED", default="true").lower() == "true"
+
+    # Шарды по городам: "Казань=postgresql://...;Санкт-Петербург=postgresql://..."; пусто - одна база
+    SHARDS: str = getenv("PSG_SHARDS", default="")
+    # Строк импорта ПВЗ в очереди шарда: чтение файла ждет, пока COPY шарда их не заберет
+    SHARD_IMPORT_QUEUE_SIZE: int = int(getenv("PSG_SHARD_IMPORT_QUEUE_SIZE", default=1000))
 
 
 async def connect(db: PSQLConfig = PSQLConfig) -> AsyncConnection:  # type: ignore[assignment]
@@ -24,3 +83,304 @@ async def connect(db: PSQLConfig = PSQLConfig) -> AsyncConnection:  # type: igno
         dbname=db.DB_NAME,
     )
     return connection
+
+
+def primary_conninfo(db: PSQLConfig = PSQLConfig) -> str:  # type: ignore[assignment]
+    return make_conninfo(
+        host=db.DB_HOST,
+        port=db.DB_PORT,
+        user=db.DB_USER,
+        password=db.DB_PASSWORD,
+        dbname=db.DB_NAME,
+        options=f"-c timezone={db.DB_TIMEZONE}",
+    )
+
+
+def replica_conninfos(db: PSQLConfig = PSQLConfig) -> List[str]:  # type: ignore[assignment]
+    return [
+        make_conninfo(dsn.strip(), options=f"-c timezone={db.DB_TIMEZONE}")
+        for dsn in db.REPLICA_DSNS.split(";") if dsn.strip()
+    ]
+
+
+def parse_shards(raw: str) -> Tuple[List[str], Dict[str, int]]:
+    """
+        Формат: "Казань=postgresql://...;Санкт-Петербург=postgresql://..." (город = DSN его базы). Номера шардов
+        начинаются с 1 в порядке первого упоминания DSN - города с одним DSN делят шард
+    """
+    dsns: List[str] = []
+    cities: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in raw.split(";"))):
+        city, dsn = (value.strip() for value in item.split("=", 1))
+        if dsn not in dsns:
+            dsns.append(dsn)
+        cities[city] = dsns.index(dsn) + 1
+
+    return dsns, cities
+
+
+REPLICA_LAG_QUERY: str = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@dataclass
+class ReplicaState:
+    pool: AsyncConnectionPool
+    lag: float = 0.0
+    checked_at: Optional[float] = None
+
+
+@dataclass
+class ConnectionRouter:
+    """Записи - всегда на primary; чтения - на реплики с допустимым отставанием, иначе на primary"""
+
+    primary_conninfo: str
+    replica_conninfos: List[str]
+    max_lag: float
+    lag_check_interval: float
+    acquire_timeout: float
+    pool_factory: Callable[[str], AsyncConnectionPool]
+    statement_budgets: Dict[str, float] = field(default_factory=dict)
+    _primary: Optional[AsyncConnectionPool] = field(default=None, repr=False)
+    _replicas: List[ReplicaState] = field(default_factory=list, repr=False)
+    _next_replica: int = field(default=0, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+    _statement_timeouts: "WeakKeyDictionary[AsyncConnection, float]" = field(
+        default_factory=WeakKeyDictionary, repr=False
+    )
+
+    @classmethod
+    def from_config(
+            cls,
+            db: PSQLConfig = PSQLConfig,  # type: ignore[assignment]
+            conninfo: Optional[str] = None
+    ) -> "ConnectionRouter":
+        """conninfo - база шарда: без реплик, остальные настройки общие с основной базой"""
+        def pool_factory(conninfo: str) -> AsyncConnectionPool:
+            return AsyncConnectionPool(
+                conninfo=conninfo,
+                min_size=db.POOL_MIN_SIZE,
+                max_size=db.POOL_MAX_SIZE,
+                open=False,
+            )
+
+        return cls(
+            primary_conninfo=primary_conninfo(db) if conninfo is None else conninfo,
+            replica_conninfos=replica_conninfos(db) if conninfo is None else [],
+            max_lag=db.REPLICA_MAX_LAG_SECONDS,
+            lag_check_interval=db.REPLICA_LAG_CHECK_INTERVAL,
+            acquire_timeout=db.REPLICA_ACQUIRE_TIMEOUT,
+            pool_factory=pool_factory,
+            statement_budgets={**DEFAULT_STATEMENT_BUDGETS, **parse_timeouts(db.STATEMENT_TIMEOUTS)},
+        )
+
+    async def open(self) -> AsyncConnectionPool:
+        if self._primary is not None:
+            return self._primary
+
+        async with self._lock:
+            if self._primary is None:
+                replicas: List[ReplicaState] = [
+                    ReplicaState(pool=self.pool_factory(conninfo)) for conninfo in self.replica_conninfos
+                ]
+                primary_pool: AsyncConnectionPool = self.pool_factory(self.primary_conninfo)
+                for pool in [primary_pool, *(replica.pool for replica in replicas)]:
+                    await pool.open(wait=False)
+
+                self._replicas = replicas
+                self._primary = primary_pool
+
+        return self._primary
+
+    async def close(self) -> None:
+        async with self._lock:
+            for pool in [self._primary, *(replica.pool for replica in self._replicas)]:
+                if pool is not None:
+                    await pool.close()
+
+            self._primary, self._replicas = None, []
+
+    @asynccontextmanager
+    async def primary(self, budget: Optional[str] = None) -> AsyncIterator[AsyncConnection]:
+        pool: AsyncConnectionPool = await self.open()
+        async with pool.connection() as connection:
+            await self._apply_statement_timeout(connection, self.statement_timeout(budget))
+            yield connection
+
+    @asynccontextmanager
+    async def replica(
+            self,
+            max_lag: Optional[float] = None,
+            budget: Optional[str] = None
+    ) -> AsyncIterator[AsyncConnection]:
+        await self.open()
+        picked: Optional[Tuple[AsyncConnectionPool, AsyncConnection]] = await self._pick_replica(
+            self.max_lag if max_lag is None else max_lag,
+            self.statement_timeout(budget)
+        )
+        if picked is None:
+            METRICS.inc("db_read_route_total", target="primary")
+            async with self.primary(budget=budget) as connection:
+                yield connection
+            return
+
+        METRICS.inc("db_read_route_total", target="replica")
+        pool, connection = picked
+        try:
+            async with connection:
+                yield connection
+        finally:
+            await pool.putconn(connection)
+
+    def statement_timeout(self, budget: Optional[str] = None) -> Optional[float]:
+        limits: List[float] = [
+            limit for limit in (REQUEST_STATEMENT_TIMEOUT.get(), self.statement_budgets.get(budget or ""))
+            if limit
+        ]
+        return min(limits) if limits else None
+
+    async def _apply_statement_timeout(self, connection: AsyncConnection, timeout: Optional[float]) -> None:
+        """
+            Сессионный SET (вне транзакции, в autocommit) переживает COMMIT внутри мутации и остается на соединении
+            после возврата в пул - поэтому запоминаем значение и отправляем SET только при смене бюджета
+        """
+        if self._statement_timeouts.get(connection) == timeout:
+            return
+
+        await connection.set_autocommit(True)
+        try:
+            if timeout is None:
+                await connection.execute("RESET statement_timeout")
+            else:
+                await connection.execute(SQL("SET statement_timeout = {}").format(Literal(int(timeout * 1000))))
+        finally:
+            await connection.set_autocommit(False)
+
+        METRICS.inc("db_statement_timeout_sets_total")
+        if timeout is None:
+            self._statement_timeouts.pop(connection, None)
+        else:
+            self._statement_timeouts[connection] = timeout
+
+    async def _pick_replica(
+            self,
+            max_lag: float,
+            timeout: Optional[float] = None
+    ) -> Optional[Tuple[AsyncConnectionPool, AsyncConnection]]:
+        """Round-robin по репликам; отстающие и недоступные пропускаются до следующей проверки"""
+        for _ in range(len(self._replicas)):
+            replica: ReplicaState = self._replicas[self._next_replica % len(self._replicas)]
+            self._next_replica += 1
+
+            now: float = monotonic()
+            fresh: bool = replica.checked_at is not None and now - replica.checked_at < self.lag_check_interval
+            if fresh and replica.lag > max_lag:
+                continue
+
+            try:
+                connection: AsyncConnection = await replica.pool.getconn(timeout=self.acquire_timeout)
+            except Exception:
+                replica.lag, replica.checked_at = float("inf"), now
+                continue
+
+            try:
+                await self._apply_statement_timeout(connection, timeout)
+                if not fresh:
+                    cursor = await connection.execute(REPLICA_LAG_QUERY)
+                    replica.lag, replica.checked_at = float((await cursor.fetchone())[0]), now  # type: ignore[index]
+            except Exception:
+                replica.lag, replica.checked_at = float("inf"), now
+
+            if replica.lag <= max_lag:
+                return replica.pool, connection
+
+            if not connection.broken:
+                await connection.rollback()
+            await replica.pool.putconn(connection)
+
+        return None
+
+
+ROUTER: ConnectionRouter = ConnectionRouter.from_config()
+
+# Основная база: пользователи, сессии и ПВЗ городов без своего шарда
+DEFAULT_SHARD: int = 0
+
+
+@dataclass
+class ShardMap:
+    """
+        ПВЗ, их приемки и товары живут в базе шарда своего города. id этих таблиц выдаются последовательностями
+        с шагом, равным числу шардов (ShardSequences в postgres/sql/migrations.py): шард k выдает k + 1, k + 1 + n,
+        ... - поэтому шард восстанавливается по любому id без таблицы соответствия. Состав шардов после появления
+        данных не меняется: другой шаг перепутал бы уже выданные id
+    """
+
+    routers: List[ConnectionRouter]
+    cities: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, db: PSQLConfig = PSQLConfig) -> "ShardMap":  # type: ignore[assignment]
+        dsns, cities = parse_shards(db.SHARDS)
+        return cls(
+            routers=[
+                ROUTER,
+                *(
+                    ConnectionRouter.from_config(
+                        db, conninfo=make_conninfo(dsn, options=f"-c timezone={db.DB_TIMEZONE}")
+                    )
+                    for dsn in dsns
+                ),
+            ],
+            cities=cities,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.routers) > 1
+
+    @property
+    def count(self) -> int:
+        return len(self.routers)
+
+    def shards(self) -> range:
+        return range(len(self.routers))
+
+    def for_city(self, city: str) -> int:
+        return self.cities.get(city, DEFAULT_SHARD)
+
+    def for_id(self, entity_id: int) -> int:
+        """id ПВЗ, приемки или товара"""
+        return (entity_id - 1) % len(self.routers)
+
+    def router(self, shard: int) -> ConnectionRouter:
+        return self.routers[shard]
+
+    async def open(self) -> None:
+        for router in self.routers:
+            await router.open()
+
+    async def close(self) -> None:
+        for router in self.routers:
+            await router.close()
+
+
+SHARDS: ShardMap = ShardMap.from_config()
+
+
+def primary(budget: Optional[str] = None, shard: int = DEFAULT_SHARD) -> AsyncContextManager[AsyncConnection]:
+    """Соединение из пула primary - для записей и чтений, от которых зависит запись"""
+    return SHARDS.router(shard).primary(budget=budget)
+
+
+def replica(
+        max_lag: Optional[float] = None,
+        budget: Optional[str] = None,
+        shard: int = DEFAULT_SHARD
+) -> AsyncContextManager[AsyncConnection]:
+    """Соединение с реплики (или с primary, если подходящей реплики нет) - только для чтений"""
+    return SHARDS.router(shard).replica(max_lag=max_lag, budget=budget)
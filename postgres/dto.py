@@ -1,7 +1,89 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from src.dto import BaseResponse
 
 
-@dataclass
+@dataclass(slots=True)
 class InitTableResponse(BaseResponse):
     pass
+
+
+# Типизированные строки результатов - создаются напрямую row_factory (class_row) курсора
+@dataclass(slots=True, frozen=True)
+class RegisteredUserRow:
+    id: int
+    user_type: str
+    username: str
+    email: str
+
+
+@dataclass(slots=True, frozen=True)
+class UserCredentialsRow:
+    id: int
+    username: str
+    password: str
+    user_type: str
+    email: str
+
+
+@dataclass(slots=True, frozen=True)
+class PVZRow:
+    id: int
+    city: str
+    registered_at: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class ReceptionRow:
+    id: int
+    pvz_id: int
+    status: str
+    product_count: int = 0
+    product_counts: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True, frozen=True)
+class ActiveReceptionRow:
+    id: int
+    product_id: Optional[List[int]]
+
+
+@dataclass(slots=True, frozen=True)
+class ProductRow:
+    id: int
+    accepting_id: int
+    type: str
+    datetime: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class ProductSearchRow:
+    id: int
+    accepting_id: int
+    pvz_id: int
+    type: str
+    datetime: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class PVZInfoRow:
+    id: int
+    city: str
+    registered_at: datetime
+    receptions: List[Dict[str, Any]]
+
+
+@dataclass(slots=True, frozen=True)
+class PVZInfoVersionRow:
+    version: int
+    changed_at: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class PVZEvent:
+    """Полезная нагрузка pg_notify канала pvz_events"""
+    event: str
+    pvz_id: int
+    reception_id: int
+    product_id: Optional[int] = None
@@ -0,0 +1,145 @@
+from asyncio import CancelledError, Event, Queue, QueueFull, Task, create_task, gather, sleep, wait_for
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from json import loads
+from os import getenv
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from psycopg import AsyncConnection
+
+from postgres.config import DEFAULT_SHARD, SHARDS, PSQLConfig, primary_conninfo
+from postgres.dto import PVZEvent
+from src.metrics import METRICS
+
+# Канал, в который мутации приемок и товаров пишут pg_notify
+PVZ_EVENTS_CHANNEL: str = "pvz_events"
+SUBSCRIBERS_LIMIT_ERROR: str = "Слишком много подписчиков на события ПВЗ, повторите позже"
+LISTENER_UNAVAILABLE_ERROR: str = "Подписка на события ПВЗ недоступна, повторите позже"
+
+METRICS.describe("pvz_events_subscribers", "gauge", "Открытые SSE-подписки на события ПВЗ")
+METRICS.describe("pvz_events_received_total", "counter", "События, полученные через LISTEN (event)")
+METRICS.describe("pvz_events_dropped_total", "counter", "События, не доставленные медленным подписчикам")
+METRICS.describe("pvz_events_listener_errors_total", "counter", "Переподключения LISTEN-соединения")
+
+
+@dataclass(frozen=True)
+class EventsConfig:
+    QUEUE_SIZE: int = int(getenv("PVZ_EVENTS_QUEUE_SIZE", default=100))
+    MAX_SUBSCRIBERS: int = int(getenv("PVZ_EVENTS_MAX_SUBSCRIBERS", default=1000))
+    RECONNECT_DELAY: float = float(getenv("PVZ_EVENTS_RECONNECT_DELAY", default=1))
+    # Сколько подписчик ждет, пока LISTEN выполнится на всех базах
+    READY_TIMEOUT: float = float(getenv("PVZ_EVENTS_READY_TIMEOUT", default=5))
+
+
+async def listen_connection(conninfo: str) -> AsyncConnection:
+    return await AsyncConnection.connect(conninfo, autocommit=True)
+
+
+@dataclass
+class PVZEventHub:
+    """
+        Одно LISTEN-соединение на процесс (вне пула - оно занято все время жизни приложения), события
+        раздаются по очередям подписчиков. NOTIFY видят все воркеры, поэтому подписка работает при любом их числе.
+        NOTIFY не выходит за пределы базы - с шардами слушается каждая (shard_conninfos)
+    """
+
+    conninfo: str
+    config: EventsConfig = field(default_factory=EventsConfig)
+    connect: Callable[[str], Awaitable[AsyncConnection]] = listen_connection
+    shard_conninfos: List[str] = field(default_factory=list)
+    _subscribers: Dict[int, Tuple[Optional[int], Queue]] = field(default_factory=dict, repr=False)
+    _task: Optional[Task] = field(default=None, repr=False)
+    # conninfo, на которых LISTEN уже выполнен; _ready выставлен, пока слушаются все базы
+    _listening: Set[str] = field(default_factory=set, repr=False)
+    _ready: Event = field(default_factory=Event, repr=False)
+
+    @classmethod
+    def from_config(cls, db: PSQLConfig = PSQLConfig) -> "PVZEventHub":  # type: ignore[assignment]
+        return cls(
+            conninfo=primary_conninfo(db),
+            shard_conninfos=[router.primary_conninfo for router in SHARDS.routers[DEFAULT_SHARD + 1:]]
+        )
+
+    def has_capacity(self) -> bool:
+        return len(self._subscribers) < self.config.MAX_SUBSCRIBERS
+
+    @asynccontextmanager
+    async def subscribe(self, pvz_id: Optional[int] = None) -> AsyncIterator["Queue[PVZEvent]"]:
+        """pvz_id=None - события всех ПВЗ"""
+        if not self.has_capacity():
+            raise Exception(SUBSCRIBERS_LIMIT_ERROR)
+
+        queue: "Queue[PVZEvent]" = Queue(maxsize=self.config.QUEUE_SIZE)
+        self._subscribers[id(queue)] = (pvz_id, queue)
+        METRICS.set("pvz_events_subscribers", len(self._subscribers))
+        if self._task is None or self._task.done():
+            self._task = create_task(self._listen_all(), name="pvz-events-listener")
+
+        try:
+            """
+                NOTIFY до выполнения LISTEN не доставляется никому - очередь отдается подписчику только после
+                него: все события после этого момента дойдут, пока соединение не оборвется
+            """
+            try:
+                await wait_for(self._ready.wait(), timeout=self.config.READY_TIMEOUT)
+            except TimeoutError:
+                raise Exception(LISTENER_UNAVAILABLE_ERROR)
+
+            yield queue
+        finally:
+            self._subscribers.pop(id(queue), None)
+            METRICS.set("pvz_events_subscribers", len(self._subscribers))
+
+    def publish(self, event: PVZEvent) -> None:
+        METRICS.inc("pvz_events_received_total", event=event.event)
+        for pvz_id, queue in list(self._subscribers.values()):
+            if pvz_id is not None and pvz_id != event.pvz_id:
+                continue
+            try:
+                queue.put_nowait(event)
+            except QueueFull:
+                METRICS.inc("pvz_events_dropped_total")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_all(self) -> None:
+        await gather(*(self._listen(conninfo) for conninfo in [self.conninfo, *self.shard_conninfos]))
+
+    async def _listen(self, conninfo: str) -> None:
+        while True:
+            try:
+                async with await self.connect(conninfo) as connection:
+                    await connection.execute(f"LISTEN {PVZ_EVENTS_CHANNEL}")
+                    self._listening.add(conninfo)
+                    if len(self._listening) == 1 + len(self.shard_conninfos):
+                        self._ready.set()
+
+                    async for notify in connection.notifies():
+                        try:
+                            event: PVZEvent = PVZEvent(**loads(notify.payload))
+                        except (TypeError, ValueError):
+                            continue
+                        self.publish(event)
+            except CancelledError:
+                self._lost(conninfo)
+                raise
+            except Exception:
+                # Пока соединение восстанавливается, события теряются: NOTIFY не хранит историю
+                self._lost(conninfo)
+                METRICS.inc("pvz_events_listener_errors_total")
+                await sleep(self.config.RECONNECT_DELAY)
+
+    def _lost(self, conninfo: str) -> None:
+        """Новые подписчики ждут переподключения, уже подписанные узнают об обрыве только по пропуску событий"""
+        self._listening.discard(conninfo)
+        self._ready.clear()
+
+
+PVZ_EVENTS: PVZEventHub = PVZEventHub.from_config()
@@ -1,12 +1,19 @@
+from typing import Optional
+
+from psycopg import AsyncConnection
+from psycopg.sql import SQL
+
 from postgres.config import connect
 from postgres.dto import InitTableResponse
+from src.tokens import SessionsConfig
 
 
 class Tables:
     @staticmethod
-    async def init() -> InitTableResponse:
+    async def init(conninfo: Optional[str] = None) -> InitTableResponse:
+        """conninfo - база шарда; по умолчанию основная база"""
         try:
-            async with await connect() as connection:
+            async with await (connect() if conninfo is None else AsyncConnection.connect(conninfo)) as connection:
                 async with connection.cursor() as cursor:
                     """Установка btree_gist"""
                     await cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist;")
@@ -52,8 +59,7 @@ class Tables:
                                 username VARCHAR(100) NOT NULL UNIQUE CHECK (length(username) >= 5),
                                 password VARCHAR(100) NOT NULL CHECK (length(password) >= 7),
                                 email VARCHAR(100) NOT NULL UNIQUE CHECK (
-                                    email ~* '^[A-Za-z0-9._%-]+@[A-Za-z0-9.-]+[.][A-Za-z]+$'),
-                                uuid_token VARCHAR);
+                                    email ~* '^[A-Za-z0-9._%-]+@[A-Za-z0-9.-]+[.][A-Za-z]+$'));
                                 
                             CREATE TABLE IF NOT EXISTS pvz_list (
                             id SERIAL PRIMARY KEY,
@@ -79,6 +85,37 @@ class Tables:
                                 type product_type NOT NULL);
                         """
                     )
+
+                    """
+                        Сессии вынесены из users: вход переписывает узкую строку (id, 32 байта, срок) вместо строки
+                        с хешем пароля и email. Индекса по expires_at нет намеренно - с ним повторный вход не был бы
+                        HOT-обновлением; уборщик раз в несколько минут просматривает узкую таблицу целиком
+                    """
+                    await cursor.execute(
+                        SQL("""
+                            CREATE {persistence} TABLE IF NOT EXISTS sessions (
+                                user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                                token_digest BYTEA NOT NULL,
+                                expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+                            ) WITH (fillfactor = 70);
+                        """).format(persistence=SQL("UNLOGGED" if SessionsConfig.UNLOGGED else ""))
+                    )
+
+                    """Водяной знак изменений для ETag /pvz-info: счетчик, разбитый на слоты против конкуренции писателей"""
+                    await cursor.execute(
+                        """
+                            CREATE TABLE IF NOT EXISTS pvz_info_version (
+                                slot SMALLINT PRIMARY KEY,
+                                version BIGINT NOT NULL DEFAULT 0,
+                                changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW());
+
+                            INSERT INTO pvz_info_version (slot)
+                            SELECT generate_series(0, 15)
+                            ON CONFLICT DO NOTHING;
+                        """
+                    )
+
+                    # Триггеры, индексы, новые колонки и пересчеты на заполненных таблицах - в postgres/sql/migrations.py
             return InitTableResponse(result={"status": True})
 
         except Exception as error:
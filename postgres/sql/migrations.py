@@ -0,0 +1,495 @@
+"""
+Версионированные миграции поверх Tables.init: то, что нельзя безопасно выполнить на живой таблице как
+CREATE ... IF NOT EXISTS при старте, - индексы на больших таблицах, новые колонки и пересчеты существующих строк.
+
+Примененные версии записываются в schema_migrations, Tables.init и миграции выполняются по порядку под
+advisory-блокировкой: одновременно стартующие поды ждут, пока первый закончит, и затем не находят ничего нового.
+Шаг должен быть повторяемым - миграция с CONCURRENTLY-индексом или пачками не атомарна, и после сбоя выполняется
+заново:
+
+    python -m postgres.sql.migrations
+"""
+from asyncio import run, sleep
+from dataclasses import dataclass, field
+from functools import partial
+from logging import Logger, basicConfig, getLogger
+from os import getenv
+from typing import Awaitable, Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.errors import LockNotAvailable
+from psycopg.sql import SQL, Identifier, Literal
+
+from postgres.config import DEFAULT_SHARD, SHARDS, primary_conninfo
+from postgres.dto import InitTableResponse
+from postgres.sql.init_tables import Tables
+
+logger: Logger = getLogger(__name__)
+
+# Ключ pg_advisory_lock считается на сервере: hashtext(MIGRATIONS_LOCK)
+MIGRATIONS_LOCK: str = "pvz_schema_migrations"
+
+
+@dataclass(frozen=True)
+class MigrationsConfig:
+    # Сколько DDL ждет блокировку таблицы: ожидающий ALTER TABLE задерживает все запросы к ней после себя
+    LOCK_TIMEOUT: float = float(getenv("MIGRATIONS_LOCK_TIMEOUT", default=5))
+    LOCK_RETRIES: int = int(getenv("MIGRATIONS_LOCK_RETRIES", default=5))
+    LOCK_RETRY_DELAY: float = float(getenv("MIGRATIONS_LOCK_RETRY_DELAY", default=2))
+    BACKFILL_BATCH_SIZE: int = int(getenv("MIGRATIONS_BACKFILL_BATCH_SIZE", default=5000))
+    # Пауза между пачками - реплики и autovacuum успевают за WAL пересчета
+    BACKFILL_PAUSE: float = float(getenv("MIGRATIONS_BACKFILL_PAUSE", default=0.05))
+
+
+class Step(Protocol):
+    async def apply(self, connection: AsyncConnection, config: MigrationsConfig) -> None:
+        ...
+
+
+@dataclass(frozen=True)
+class Statement:
+    """Обычный DDL/DML в своей транзакции; при занятой таблице повторяется, а не копит очередь запросов за собой"""
+    sql: SQL
+
+    async def apply(self, connection: AsyncConnection, config: MigrationsConfig) -> None:
+        for attempt in range(config.LOCK_RETRIES + 1):
+            try:
+                async with connection.transaction():
+                    await connection.execute(
+                        SQL("SET LOCAL lock_timeout = {}").format(Literal(f"{int(config.LOCK_TIMEOUT * 1000)}ms"))
+                    )
+                    await connection.execute(self.sql)
+                return
+            except LockNotAvailable:
+                if attempt == config.LOCK_RETRIES:
+                    raise
+                logger.warning("Таблица занята, повтор через %.1f с", config.LOCK_RETRY_DELAY * (attempt + 1))
+                await sleep(config.LOCK_RETRY_DELAY * (attempt + 1))
+
+
+@dataclass(frozen=True)
+class ConcurrentIndex:
+    """
+        CREATE INDEX CONCURRENTLY не блокирует запись, но не работает в транзакции, а прерванная сборка оставляет
+        невалидный индекс, который IF NOT EXISTS считает готовым, - такой индекс удаляется и строится заново
+    """
+    name: str
+    table: str
+    # Все после имени таблицы: "(pvz_id, datetime)", "USING brin (datetime)", "(datetime) WHERE ..."
+    definition: str
+    unique: bool = False
+
+    async def apply(self, connection: AsyncConnection, config: MigrationsConfig) -> None:
+        cursor: AsyncCursor = await connection.execute(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (self.name,)
+        )
+        existing: Optional[Tuple[bool]] = await cursor.fetchone()
+        if existing is not None and existing[0]:
+            return
+        if existing is not None:
+            logger.warning("Индекс %s невалиден после прерванной сборки - строится заново", self.name)
+            await connection.execute(SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(Identifier(self.name)))
+
+        await connection.execute(
+            SQL("CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}").format(
+                unique=SQL("UNIQUE " if self.unique else ""),
+                name=Identifier(self.name),
+                table=Identifier(self.table),
+                definition=SQL(self.definition),
+            )
+        )
+
+
+@dataclass(frozen=True)
+class Backfill:
+    """
+        Пересчет существующих строк короткими транзакциями. sql меняет не больше %(batch_size)s строк и пропускает
+        уже обработанные (например, WHERE id IN (SELECT id ... WHERE column IS NULL LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED)) - выполняется, пока пачка не окажется неполной
+    """
+    sql: SQL
+    batch_size: Optional[int] = None
+
+    async def apply(self, connection: AsyncConnection, config: MigrationsConfig) -> None:
+        batch_size: int = self.batch_size or config.BACKFILL_BATCH_SIZE
+        updated: int = 0
+        while True:
+            async with connection.transaction():
+                cursor: AsyncCursor = await connection.execute(self.sql, {"batch_size": batch_size})
+            updated += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                logger.info("Пересчитано строк: %d", updated)
+                return
+            await sleep(config.BACKFILL_PAUSE)
+
+
+@dataclass(frozen=True)
+class ShardSequences:
+    """
+        id ПВЗ, приемок и товаров шарда shard из count: shard + 1, shard + 1 + count, ... (ShardMap.for_id).
+        Последовательность выравнивается только если еще не выровнена - иначе setval мог бы вернуть ее назад
+        под вставками работающего приложения. ПВЗ с id чужого шарда (данные до включения шардирования)
+        маршрутизировались бы не туда - это ошибка, а не повод перенумеровать
+    """
+    shard: int
+    count: int
+    tables: Tuple[str, ...] = ("pvz_list", "accepting_products", "products")
+
+    async def apply(self, connection: AsyncConnection, config: MigrationsConfig) -> None:
+        cursor: AsyncCursor = await connection.execute(
+            "SELECT count(*) FROM pvz_list WHERE (id - 1) %% %s <> %s", (self.count, self.shard)
+        )
+        misplaced: int = (await cursor.fetchone())[0]  # type: ignore[index]
+        if misplaced:
+            raise Exception(f"В шарде {self.shard} есть ПВЗ с id другого шарда: {misplaced}")
+
+        for table in self.tables:
+            cursor = await connection.execute(
+                SQL("""
+                    SELECT s.sequence, seq.seqincrement, (SELECT COALESCE(max(id), 0) FROM {table})
+                    FROM (SELECT pg_get_serial_sequence({name}, 'id') AS sequence) s
+                    JOIN pg_sequence seq ON seq.seqrelid = s.sequence::regclass
+                """).format(table=Identifier(table), name=Literal(table))
+            )
+            sequence, increment, max_id = await cursor.fetchone()  # type: ignore[misc]
+            cursor = await connection.execute(SQL("SELECT last_value, is_called FROM {}").format(SQL(sequence)))
+            last_value, is_called = await cursor.fetchone()  # type: ignore[misc]
+            if increment == self.count and (last_value - 1) % self.count == self.shard:
+                continue
+
+            # Ближайший свободный id этого шарда
+            floor: int = max(max_id, last_value if is_called else last_value - 1)
+            next_id: int = floor + 1 + (self.shard - floor) % self.count
+            await connection.execute(
+                SQL("ALTER SEQUENCE {} INCREMENT BY {}").format(SQL(sequence), Literal(self.count))
+            )
+            await connection.execute("SELECT setval(%s, %s, false)", (sequence, next_id))
+            logger.info("Последовательность %s: шаг %d, следующий id %d", sequence, self.count, next_id)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: Tuple[Step, ...]
+
+
+# Счетчики товаров приемки (всего и по типам). Колонки добавляются без NOT NULL: NULL - "еще не пересчитано",
+# новые приемки получают DEFAULT 0. Оба ALTER TABLE меняют только каталог, без перезаписи таблицы
+RECEPTION_COUNTERS_COLUMNS: SQL = SQL("""
+    ALTER TABLE accepting_products
+        ADD COLUMN IF NOT EXISTS product_count INTEGER,
+        ADD COLUMN IF NOT EXISTS electronics_count INTEGER,
+        ADD COLUMN IF NOT EXISTS clothes_count INTEGER,
+        ADD COLUMN IF NOT EXISTS shoes_count INTEGER;
+    ALTER TABLE accepting_products
+        ALTER COLUMN product_count SET DEFAULT 0,
+        ALTER COLUMN electronics_count SET DEFAULT 0,
+        ALTER COLUMN clothes_count SET DEFAULT 0,
+        ALTER COLUMN shoes_count SET DEFAULT 0;
+""")
+
+# Statement-триггер агрегирует изменения по transition-таблице: и COPY на тысячи товаров обновляет каждую приемку
+# один раз. Триггер включается до пересчета: NULL + delta остается NULL, пересчет затем ставит точное значение
+RECEPTION_COUNTERS_TRIGGERS: SQL = SQL("""
+    CREATE OR REPLACE FUNCTION maintain_reception_counters() RETURNS trigger AS $$
+    DECLARE
+        delta INTEGER := CASE WHEN TG_OP = 'DELETE' THEN -1 ELSE 1 END;
+        accepting_ids INTEGER[];
+        types product_type[];
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            UPDATE accepting_products
+            SET product_count = 0, electronics_count = 0, clothes_count = 0, shoes_count = 0
+            WHERE product_count <> 0;
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(accepting_id), array_agg(type) INTO accepting_ids, types
+            FROM inserted_products;
+        ELSE
+            SELECT array_agg(accepting_id), array_agg(type) INTO accepting_ids, types
+            FROM deleted_products;
+        END IF;
+
+        -- Пустой UPDATE сработал бы триггером версии accepting_products
+        IF accepting_ids IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        UPDATE accepting_products ap
+        SET product_count = ap.product_count + delta * changed.total,
+            electronics_count = ap.electronics_count + delta * changed.electronics,
+            clothes_count = ap.clothes_count + delta * changed.clothes,
+            shoes_count = ap.shoes_count + delta * changed.shoes
+        FROM (
+            SELECT accepting_id,
+                   count(*) AS total,
+                   count(*) FILTER (WHERE type = 'электроника') AS electronics,
+                   count(*) FILTER (WHERE type = 'одежда') AS clothes,
+                   count(*) FILTER (WHERE type = 'обувь') AS shoes
+            FROM unnest(accepting_ids, types) AS product(accepting_id, type)
+            GROUP BY accepting_id
+        ) AS changed
+        WHERE ap.id = changed.accepting_id;
+        RETURN NULL;
+    END$$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE TRIGGER products_counters_insert
+        AFTER INSERT ON products
+        REFERENCING NEW TABLE AS inserted_products
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_reception_counters();
+    CREATE OR REPLACE TRIGGER products_counters_delete
+        AFTER DELETE ON products
+        REFERENCING OLD TABLE AS deleted_products
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_reception_counters();
+    CREATE OR REPLACE TRIGGER products_counters_truncate
+        AFTER TRUNCATE ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_reception_counters();
+""")
+
+# Закрытые приемки товары уже не получают - их можно пересчитывать пачками, не держа блокировок между пачками
+RECEPTION_COUNTERS_BACKFILL: SQL = SQL("""
+    UPDATE accepting_products ap
+    SET product_count = counted.total,
+        electronics_count = counted.electronics,
+        clothes_count = counted.clothes,
+        shoes_count = counted.shoes
+    FROM (
+        SELECT batch.id,
+               count(p.id) AS total,
+               count(p.id) FILTER (WHERE p.type = 'электроника') AS electronics,
+               count(p.id) FILTER (WHERE p.type = 'одежда') AS clothes,
+               count(p.id) FILTER (WHERE p.type = 'обувь') AS shoes
+        FROM (
+            SELECT id FROM accepting_products
+            WHERE product_count IS NULL AND status = 'close'
+            LIMIT %(batch_size)s
+            FOR UPDATE
+        ) AS batch
+        LEFT JOIN products p ON p.accepting_id = batch.id
+        GROUP BY batch.id
+    ) AS counted
+    WHERE ap.id = counted.id
+""")
+
+# Открытые приемки (не больше одной на ПВЗ) сначала блокируются, и UPDATE считает товары уже по новому снимку:
+# вставка до блокировки в нем видна, вставка после нее ждет и прибавляет свой delta к пересчитанному значению
+RECEPTION_COUNTERS_BACKFILL_OPEN: SQL = SQL("""
+    SELECT id FROM accepting_products WHERE product_count IS NULL FOR UPDATE;
+
+    UPDATE accepting_products ap
+    SET product_count = counted.total,
+        electronics_count = counted.electronics,
+        clothes_count = counted.clothes,
+        shoes_count = counted.shoes
+    FROM (
+        SELECT pending.id,
+               count(p.id) AS total,
+               count(p.id) FILTER (WHERE p.type = 'электроника') AS electronics,
+               count(p.id) FILTER (WHERE p.type = 'одежда') AS clothes,
+               count(p.id) FILTER (WHERE p.type = 'обувь') AS shoes
+        FROM accepting_products pending
+        LEFT JOIN products p ON p.accepting_id = pending.id
+        WHERE pending.product_count IS NULL
+        GROUP BY pending.id
+    ) AS counted
+    WHERE ap.id = counted.id;
+""")
+
+# SET NOT NULL без полного просмотра под ACCESS EXCLUSIVE: NOT VALID CHECK проверяется под SHARE UPDATE EXCLUSIVE,
+# и Postgres доверяет ему вместо своего просмотра таблицы
+RECEPTION_COUNTERS_CHECK: SQL = SQL("""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'accepting_products_counters_not_null') THEN
+            ALTER TABLE accepting_products ADD CONSTRAINT accepting_products_counters_not_null CHECK (
+                product_count IS NOT NULL AND electronics_count IS NOT NULL
+                AND clothes_count IS NOT NULL AND shoes_count IS NOT NULL
+            ) NOT VALID;
+        END IF;
+    END$$;
+""")
+
+RECEPTION_COUNTERS_NOT_NULL: SQL = SQL("""
+    ALTER TABLE accepting_products
+        ALTER COLUMN product_count SET NOT NULL,
+        ALTER COLUMN electronics_count SET NOT NULL,
+        ALTER COLUMN clothes_count SET NOT NULL,
+        ALTER COLUMN shoes_count SET NOT NULL;
+    ALTER TABLE accepting_products DROP CONSTRAINT IF EXISTS accepting_products_counters_not_null;
+""")
+
+# Водяной знак изменений для ETag /pvz-info: каждый statement на таблицах страницы увеличивает версию своего слота.
+# CREATE OR REPLACE TRIGGER берет SHARE ROW EXCLUSIVE на таблицу - один раз здесь, а не при каждом старте
+PVZ_INFO_VERSION_TRIGGERS: SQL = SQL("""
+    CREATE OR REPLACE FUNCTION bump_pvz_info_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE pvz_info_version
+        SET version = version + 1, changed_at = NOW()
+        WHERE slot = pg_backend_pid() % 16;
+        RETURN NULL;
+    END$$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE TRIGGER pvz_list_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pvz_list
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pvz_info_version();
+    CREATE OR REPLACE TRIGGER accepting_products_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON accepting_products
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pvz_info_version();
+    CREATE OR REPLACE TRIGGER products_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pvz_info_version();
+""")
+
+# Только добавлять в конец; примененную миграцию не менять - вместо этого новая версия
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        name="pvz_info_batched_loader_indexes",
+        steps=(
+            ConcurrentIndex("accepting_products_pvz_id_datetime", "accepting_products", "(pvz_id, datetime)"),
+            ConcurrentIndex("products_accepting_id", "products", "(accepting_id)"),
+        ),
+    ),
+    Migration(
+        version=2,
+        name="stale_receptions_index",
+        steps=(
+            # Незакрытых приемок не больше числа ПВЗ - частичный индекс для автозакрытия по возрасту крошечный
+            ConcurrentIndex(
+                "accepting_products_in_progress_datetime", "accepting_products",
+                "(datetime) WHERE status = 'in_progress'"
+            ),
+        ),
+    ),
+    Migration(
+        version=3,
+        name="datetime_brin_indexes",
+        steps=(
+            # Товары и приемки пишутся почти только в конец таблицы - datetime растет вместе с порядком строк
+            ConcurrentIndex("products_datetime_brin", "products", "USING brin (datetime) WITH (pages_per_range = 32)"),
+            ConcurrentIndex(
+                "accepting_products_datetime_brin", "accepting_products",
+                "USING brin (datetime) WITH (pages_per_range = 32)"
+            ),
+        ),
+    ),
+    Migration(
+        version=4,
+        name="drop_users_uuid_token",
+        # Токены переехали в sessions
+        steps=(Statement(SQL("ALTER TABLE users DROP COLUMN IF EXISTS uuid_token")),),
+    ),
+    Migration(
+        version=5,
+        name="reception_product_counters",
+        steps=(
+            Statement(RECEPTION_COUNTERS_COLUMNS),
+            Statement(RECEPTION_COUNTERS_TRIGGERS),
+            Backfill(RECEPTION_COUNTERS_BACKFILL),
+            Statement(RECEPTION_COUNTERS_BACKFILL_OPEN),
+            Statement(RECEPTION_COUNTERS_CHECK),
+            Statement(SQL("ALTER TABLE accepting_products VALIDATE CONSTRAINT accepting_products_counters_not_null")),
+            Statement(RECEPTION_COUNTERS_NOT_NULL),
+        ),
+    ),
+    Migration(
+        version=6,
+        name="pvz_info_version_triggers",
+        steps=(Statement(PVZ_INFO_VERSION_TRIGGERS),),
+    ),
+)
+
+
+async def connect_autocommit(conninfo: Optional[str] = None) -> AsyncConnection:
+    """Вне транзакции: CONCURRENTLY в ней запрещен, а открытая транзакция раннера сама мешала бы его сборке"""
+    return await AsyncConnection.connect(conninfo or primary_conninfo(), autocommit=True)
+
+
+@dataclass
+class MigrationRunner:
+    migrations: Tuple[Migration, ...] = MIGRATIONS
+    config: MigrationsConfig = field(default_factory=MigrationsConfig)
+    connect: Callable[[], Awaitable[AsyncConnection]] = connect_autocommit
+    # Шаги после каждого запуска, не версионируются: зависят от конфигурации, а не от кода (ShardSequences)
+    always: Tuple[Step, ...] = ()
+    # Базовая схема (Tables.init) - под той же блокировкой, до миграций
+    baseline: Optional[Callable[[], Awaitable[InitTableResponse]]] = None
+
+    def __post_init__(self) -> None:
+        versions: List[int] = [migration.version for migration in self.migrations]
+        if versions != sorted(set(versions)):
+            raise Exception("Версии миграций должны строго возрастать")
+
+    async def run(self) -> List[int]:
+        """Применяет недостающие миграции по порядку и возвращает их версии"""
+        try:
+            connection: AsyncConnection = await self.connect()
+            async with connection:
+                # Сессионная блокировка держится между транзакциями шагов и снимается и при обрыве соединения
+                await connection.execute("SELECT pg_advisory_lock(hashtext(%s))", (MIGRATIONS_LOCK,))
+                try:
+                    if self.baseline is not None:
+                        initialized: InitTableResponse = await self.baseline()
+                        if initialized.errors:
+                            raise Exception(initialized.errors)
+                    return await self._apply_pending(connection)
+                finally:
+                    if not connection.broken:
+                        await connection.execute("SELECT pg_advisory_unlock(hashtext(%s))", (MIGRATIONS_LOCK,))
+
+        except Exception as error:
+            raise error
+
+    async def _apply_pending(self, connection: AsyncConnection) -> List[int]:
+        await connection.execute(
+            """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW());
+            """
+        )
+        cursor: AsyncCursor = await connection.execute("SELECT version FROM schema_migrations")
+        applied: Set[int] = {row[0] for row in await cursor.fetchall()}
+
+        done: List[int] = []
+        for migration in self.migrations:
+            if migration.version in applied:
+                continue
+
+            logger.info("Миграция %d: %s", migration.version, migration.name)
+            for step in migration.steps:
+                await step.apply(connection, self.config)
+            await connection.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name)
+            )
+            done.append(migration.version)
+
+        for step in self.always:
+            await step.apply(connection, self.config)
+
+        return done
+
+
+async def migrate() -> Dict[int, List[int]]:
+    """Базовая схема (Tables.init), затем версионированные миграции - на основной базе и на каждом шарде"""
+    applied: Dict[int, List[int]] = {}
+    for shard in SHARDS.shards():
+        conninfo: Optional[str] = None if shard == DEFAULT_SHARD else SHARDS.router(shard).primary_conninfo
+        applied[shard] = await MigrationRunner(
+            connect=partial(connect_autocommit, conninfo),
+            always=(ShardSequences(shard, SHARDS.count),) if SHARDS.enabled else (),
+            baseline=partial(Tables.init, conninfo),
+        ).run()
+
+    return applied
+
+
+if __name__ == "__main__":
+    basicConfig(level="INFO")
+    for applied_shard, applied_versions in run(migrate()).items():
+        logger.info("Шард %d, применены миграции: %s", applied_shard, applied_versions or "нет новых")
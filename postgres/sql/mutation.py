@@ -1,13 +1,28 @@
+from asyncio import FIRST_COMPLETED, Queue, QueueFull, Semaphore, Task, create_task, gather, wait
 from dataclasses import dataclass
 from datetime import timedelta, datetime
-from typing import Optional, Union, List, Dict, Any, Tuple
-
-from bcrypt import gensalt as bcrypt_salt, hashpw as bcrypt_hashpw, checkpw as bcrypt_checkpw
-from psycopg.sql import SQL
-
-from postgres.config import connect
+from heapq import merge
+from typing import Any, AsyncIterator, Dict, Optional, Union, List, Tuple
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.rows import class_row
+from psycopg.sql import SQL, Composed, Literal
+
+from postgres.config import DEFAULT_SHARD, SHARDS, PSQLConfig, primary, replica
+from postgres.dto import (
+    RegisteredUserRow,
+    UserCredentialsRow,
+    PVZRow,
+    ReceptionRow,
+    ActiveReceptionRow,
+    ProductRow,
+    ProductSearchRow,
+    PVZInfoRow,
+    PVZInfoVersionRow,
+)
 from src.dto import JWTTokenResponse
-from src.tokens import create_access_token, JWTConfig
+from src.passwords import check_password, needs_rehash, rehash_password
+from src.tokens import SessionsConfig, create_access_token, JWTConfig, session_expires_at, token_digest
 
 
 @dataclass(frozen=True)
@@ -18,25 +33,35 @@ class UserRegisterMutation:
     email: str
     uuid: str
 
-    async def register(self) -> Union[Tuple, Exception]:
+    async def register(self) -> Union[RegisteredUserRow, Exception]:
         if len(self.password) < 7:
             raise ValueError("password must be at least 7 characters long")
 
         try:
-            hashed_password: Union[str, Exception] = self.__hashed_password(self.password)
+            # bcrypt - сотни миллисекунд CPU: в потоке и до того, как занято соединение из пула
+            hashed_password: str = await rehash_password(self.password)
 
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary() as connection:
+                async with connection.cursor(row_factory=class_row(RegisteredUserRow)) as cursor:
                     await cursor.execute(
                         query="""
-                                INSERT INTO users (username, user_type, password, email, uuid_token)
-                                VALUES (%s, %s, %s, %s, %s)
-                                RETURNING id, user_type, username, email
+                                WITH registered AS (
+                                    INSERT INTO users (username, user_type, password, email)
+                                    VALUES (%s, %s, %s, %s)
+                                    RETURNING id, user_type, username, email
+                                ), session AS (
+                                    INSERT INTO sessions (user_id, token_digest, expires_at)
+                                    SELECT id, %s, %s FROM registered
+                                )
+                                SELECT id, user_type, username, email FROM registered
                             """,
-                        params=(self.username, self.user_type, hashed_password, self.email, self.uuid)
+                        params=(
+                            self.username, self.user_type, hashed_password, self.email,
+                            token_digest(self.uuid), session_expires_at()
+                        )
                     )
 
-                    result: Optional[Tuple[Any]] = await cursor.fetchone()
+                    result: Optional[RegisteredUserRow] = await cursor.fetchone()
                     if result is None:
                         raise Exception("Что-то пошло не так")
 
@@ -45,80 +70,77 @@ class UserRegisterMutation:
         except Exception as error:
             raise error
 
-    @staticmethod
-    def __hashed_password(password: str) -> Union[str, Exception]:
-        try:
-            salt = bcrypt_salt()
-            hashed = bcrypt_hashpw(password.encode("utf-8"), salt)
-            return hashed.decode("utf-8")
-
-        except Exception as error:
-            raise error
-
 
 @dataclass(frozen=True)
 class UserLoginMutation:
     username: str
     password: str
 
-    async def login(self) -> Union[Tuple, Exception]:
+    async def login(self) -> str:
+        """
+            Два обращения к пулу primary по одному запросу в каждом - намеренно, а не один запрос на одном
+            соединении: между чтением хеша и записью сессии идет bcrypt (в потоке, сотни миллисекунд), и
+            соединение, удержанное на это время, при всплеске входов разбирает пул у остальных запросов. Токен
+            нельзя выдать в одном UPDATE ... RETURNING - пароль проверяется в приложении, а не в БД.
+            Запись - один INSERT ... ON CONFLICT в узкую sessions: строка users переписывается только при
+            пересчете хеша, условие на старый хеш отменяет вход, если пароль сменили между двумя запросами
+        """
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary() as connection:
+                async with connection.cursor(row_factory=class_row(UserCredentialsRow)) as cursor:
                     await cursor.execute(
                         query=
                         """
-                            SELECT username, password, user_type, email FROM users WHERE username = %s
+                            SELECT id, username, password, user_type, email FROM users WHERE username = %s
                         """,
                         params=(self.username,)
                     )
-
-                    user: Optional[Tuple] = await cursor.fetchone()
-                    if user is None:
-                        raise Exception("Пользователь не найден")
-
-                    hashed_password: str = user[1]  # type: ignore[misc]
-                    if not bcrypt_checkpw(self.password.encode(), hashed_password.encode()):
-                        raise Exception("Некорректный пароль")
-
-                    user_name: str = user[0]
-                    if self.username != user_name:
-                        raise Exception("Некорректный никнейм")
-
-                    return user
-
-        except Exception as error:
-            raise error
-
-
-@dataclass(frozen=True)
-class UpdateAccessTokenMutation:
-    email: str
-    user_type: str
-
-    async def update(self) -> Union[str, Exception]:
-        try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
-                    new_token: JWTTokenResponse = create_access_token(  # type: ignore[assignment]
-                        data={"sub": self.email, "role": self.user_type},
-                        expires_delta=timedelta(minutes=JWTConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
-                    )
-                    await cursor.execute(
-                        query=
-                        """
+                    user: Optional[UserCredentialsRow] = await cursor.fetchone()
+
+            if user is None:
+                raise Exception("Пользователь не найден")
+            if not await check_password(self.password, user.password):
+                raise Exception("Некорректный пароль")
+
+            new_hash: str = user.password
+            if needs_rehash(user.password):
+                new_hash = await rehash_password(self.password)
+
+            new_token: JWTTokenResponse = create_access_token(  # type: ignore[assignment]
+                data={"sub": user.email, "role": user.user_type},
+                expires_delta=timedelta(minutes=JWTConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
+            )
+
+            async with primary() as connection:
+                # Условие на старый хеш: если пароль сменили, пока шла проверка, вход не засчитывается
+                session_cursor: AsyncCursor = await connection.execute(
+                    query=
+                    """
+                        WITH rehashed AS (
                             UPDATE users
-                            SET uuid_token = %s
-                            WHERE email = %s
-                            RETURNING uuid_token
-                        """,
-                        params=(str(new_token.access_token), self.email)
-                    )
-                    result: Optional[tuple[str]] = await cursor.fetchone()
-                    if result is None:
-                        raise Exception("Oops, token not found")
-
-                    return result[0]
+                            SET password = %(new_hash)s
+                            WHERE id = %(user_id)s AND password = %(old_hash)s AND %(new_hash)s <> %(old_hash)s
+                        )
+                        INSERT INTO sessions (user_id, token_digest, expires_at)
+                        SELECT id, %(token_digest)s, %(expires_at)s
+                        FROM users
+                        WHERE id = %(user_id)s AND password = %(old_hash)s
+                        ON CONFLICT (user_id) DO UPDATE
+                        SET token_digest = EXCLUDED.token_digest, expires_at = EXCLUDED.expires_at
+                        RETURNING user_id
+                    """,
+                    params={
+                        "user_id": user.id,
+                        "new_hash": new_hash,
+                        "old_hash": user.password,
+                        "token_digest": token_digest(str(new_token.access_token)),
+                        "expires_at": session_expires_at(),
+                    }
+                )
+                if await session_cursor.fetchone() is None:
+                    raise Exception("Некорректный пароль")
+
+            return str(new_token.access_token)
 
         except Exception as error:
             raise error
@@ -127,23 +149,28 @@ class UpdateAccessTokenMutation:
 @dataclass(frozen=True)
 class GetMe:
     email: str
+    use_primary: bool = False
 
-    async def get(self) -> str:
+    async def get(self) -> Optional[bytes]:
+        """
+            SHA-256 действующего токена пользователя или None, если действующей сессии нет (на реплике - в том
+            числе еще не доехавшей после входа); UNLOGGED-таблица sessions на репликах недоступна
+        """
         try:
-            async with await connect() as connection:
+            async with (primary() if self.use_primary or SessionsConfig.UNLOGGED else replica()) as connection:
                 async with connection.cursor() as cursor:
                     await cursor.execute(
                         query=
                         """
-                            SELECT uuid_token FROM users WHERE email = %s
+                            SELECT s.token_digest
+                            FROM users u
+                            JOIN sessions s ON s.user_id = u.id
+                            WHERE u.email = %s AND s.expires_at > NOW()
                         """,
                         params=(self.email,)
                     )
-                    token: Optional[tuple[str]] = await cursor.fetchone()
-                    if token is None:
-                        raise Exception("Access not found")
-
-                    return token[0]
+                    digest: Optional[tuple[bytes]] = await cursor.fetchone()
+                    return digest[0] if digest is not None else None
 
         except Exception as error:
             raise error
@@ -153,10 +180,10 @@ class GetMe:
 class PVZ:
     city: str
 
-    async def create(self) -> Union[Tuple, Exception]:
+    async def create(self) -> Union[PVZRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary(shard=SHARDS.for_city(self.city)) as connection:
+                async with connection.cursor(row_factory=class_row(PVZRow)) as cursor:
                     await cursor.execute(
                         query=
                         """
@@ -166,7 +193,7 @@ class PVZ:
                         """,
                         params=(self.city,)
                     )
-                    result: Optional[tuple[str]] = await cursor.fetchone()
+                    result: Optional[PVZRow] = await cursor.fetchone()
                     if not result:
                         raise Exception("Не получилось завести запись о новом ПВЗ")
 
@@ -176,13 +203,138 @@ class PVZ:
             raise error
 
 
+@dataclass(frozen=True)
+class ImportPVZ:
+    cities: AsyncIterator[str]
+
+    async def load(self) -> Union[List[int], Exception]:
+        try:
+            if not SHARDS.enabled:
+                loaded: List[Tuple[int, int]] = await self._copy(DEFAULT_SHARD, self._numbered(self.cities))
+            else:
+                loaded = await self._scatter()
+
+            if not loaded:
+                raise Exception("Файл импорта не содержит ни одного города")
+
+            return [pvz_id for _, pvz_id in sorted(loaded)]
+
+        except Exception as error:
+            raise error
+
+    @staticmethod
+    async def _numbered(cities: AsyncIterator[str]) -> AsyncIterator[Tuple[int, str]]:
+        position: int = 0
+        async for city in cities:
+            yield position, city
+            position += 1
+
+    async def _scatter(self) -> List[Tuple[int, int]]:
+        """
+            Города раскладываются по шардам с позицией в файле, и каждый шард загружается своим COPY по мере чтения
+            файла - в памяти не больше SHARD_IMPORT_QUEUE_SIZE строк на шард. Транзакция у каждого шарда своя: при
+            ошибке одного шарда остальные отменяются, но уже закоммиченные шарды остаются загруженными
+        """
+        queues: Dict[int, "Queue[Optional[Tuple[int, str]]]"] = {}
+        copies: Dict[int, Task] = {}
+        try:
+            position: int = 0
+            async for city in self.cities:
+                shard: int = SHARDS.for_city(city)
+                if shard not in queues:
+                    queues[shard] = Queue(maxsize=PSQLConfig.SHARD_IMPORT_QUEUE_SIZE)
+                    copies[shard] = create_task(self._copy(shard, self._drained(queues[shard])))
+                await self._put(queues[shard], copies[shard], (position, city))
+                position += 1
+
+            for shard, queue in queues.items():
+                await self._put(queue, copies[shard], None)
+
+            loaded: List[Tuple[int, int]] = []
+            for rows in await gather(*copies.values()):
+                loaded += rows
+            return loaded
+
+        except BaseException:
+            for copy in copies.values():
+                copy.cancel()
+            await gather(*copies.values(), return_exceptions=True)
+            raise
+
+    @staticmethod
+    async def _put(queue: "Queue[Optional[Tuple[int, str]]]", copy: Task, row: Optional[Tuple[int, str]]) -> None:
+        """Упавший COPY очередь больше не читает - ожидание места в ней заканчивается его ошибкой"""
+        try:
+            queue.put_nowait(row)
+            return
+        except QueueFull:
+            pass
+
+        put: Task = create_task(queue.put(row))
+        try:
+            done, _ = await wait((put, copy), return_when=FIRST_COMPLETED)
+        finally:
+            put.cancel()
+        if put in done:
+            return
+        raise copy.exception() or Exception("COPY шарда завершился до конца файла импорта")
+
+    @staticmethod
+    async def _drained(queue: "Queue[Optional[Tuple[int, str]]]") -> AsyncIterator[Tuple[int, str]]:
+        while True:
+            row: Optional[Tuple[int, str]] = await queue.get()
+            if row is None:
+                return
+            yield row
+
+    @staticmethod
+    async def _copy(shard: int, rows: AsyncIterator[Tuple[int, str]]) -> List[Tuple[int, int]]:
+        """Пары (позиция в файле, id ПВЗ)"""
+        async with primary(shard=shard) as connection:
+            async with connection.cursor() as cursor:
+                """Staging-таблица живет до конца транзакции: COPY не умеет RETURNING"""
+                await cursor.execute(
+                    query=
+                    """
+                        CREATE TEMP TABLE pvz_import (
+                            position INTEGER NOT NULL,
+                            city city_type NOT NULL
+                        ) ON COMMIT DROP
+                    """
+                )
+
+                async with cursor.copy("COPY pvz_import (position, city) FROM STDIN") as copy:
+                    async for row in rows:
+                        await copy.write_row(row)
+
+                """
+                    Порядок строк RETURNING не гарантирован, поэтому id выдаются заранее и возвращаются вместе
+                    с позицией. CTE с nextval материализуется один раз - вставка и ответ видят одни и те же id
+                """
+                await cursor.execute(
+                    query=
+                    """
+                        WITH staged AS (
+                            SELECT position, city, nextval(pg_get_serial_sequence('pvz_list', 'id')) AS id
+                            FROM pvz_import
+                            ORDER BY position
+                        ), inserted AS (
+                            INSERT INTO pvz_list (id, city)
+                            SELECT id, city FROM staged
+                        )
+                        SELECT position, id FROM staged
+                    """
+                )
+                return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+
 @dataclass(frozen=True)
 class CheckActiveAccepting:
     pvz_id: int
 
     async def check(self) -> None:
         try:
-            async with await connect() as connection:
+            async with primary(shard=SHARDS.for_id(self.pvz_id)) as connection:
                 async with connection.cursor() as cursor:
                     await cursor.execute(
                         query=
@@ -203,21 +355,36 @@ class CheckActiveAccepting:
 class InitReceptions:
     pvz_id: int
 
-    async def init(self) -> Union[Tuple, Exception]:
+    async def init(self) -> Union[ReceptionRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary(shard=SHARDS.for_id(self.pvz_id)) as connection:
+                async with connection.cursor(row_factory=class_row(ReceptionRow)) as cursor:
+                    # pg_notify для SSE (postgres/events.py) - в той же транзакции: слушатели получат событие после COMMIT
                     await cursor.execute(
                         query=
                         """
-                            INSERT INTO accepting_products (pvz_id, status)
-                            VALUES (%s, %s)
-                            RETURNING id, pvz_id, status
+                            WITH reception AS (
+                                INSERT INTO accepting_products (pvz_id, status)
+                                VALUES (%s, %s)
+                                RETURNING id, pvz_id, status, product_count, json_build_object(
+                                    'электроника', electronics_count, 'одежда', clothes_count, 'обувь', shoes_count
+                                ) AS product_counts
+                            )
+                            SELECT reception.id, reception.pvz_id, reception.status,
+                                   reception.product_count, reception.product_counts
+                            FROM reception
+                            CROSS JOIN LATERAL (
+                                SELECT pg_notify('pvz_events', json_build_object(
+                                    'event', 'reception_created',
+                                    'pvz_id', reception.pvz_id,
+                                    'reception_id', reception.id
+                                )::text)
+                            ) AS notified
                         """,
                         params=(self.pvz_id, "in_progress")
                     )
 
-                    result: Optional[tuple[str]] = await cursor.fetchone()
+                    result: Optional[ReceptionRow] = await cursor.fetchone()
                     if result is None:
                         raise Exception("Не получилось создать приемку")
 
@@ -233,7 +400,7 @@ class CheckAcceptingStatus:
 
     async def check(self) -> None:
         try:
-            async with await connect() as connection:
+            async with primary(shard=SHARDS.for_id(self.accepting_id)) as connection:
                 async with connection.cursor() as cursor:
                     await cursor.execute(
                         query=
@@ -259,38 +426,42 @@ class AddProduct:
     accepting_id: int
     product_type: str
 
-    async def add(self) -> Union[Tuple, Exception]:
+    async def add(self) -> Union[ProductRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary(shard=SHARDS.for_id(self.accepting_id)) as connection:
+                async with connection.cursor(row_factory=class_row(ProductRow)) as cursor:
+                    """Вставка товара и дописывание его id в приемку - одним запросом (один roundtrip)"""
                     await cursor.execute(
                         query=
                         """
-                            INSERT INTO products (accepting_id, type)
-                            VALUES (%s, %s)
-                            RETURNING id, accepting_id, type, datetime
+                            WITH product AS (
+                                INSERT INTO products (accepting_id, type)
+                                VALUES (%s, %s)
+                                RETURNING id, accepting_id, type, datetime
+                            ), updated AS (
+                                UPDATE accepting_products ap
+                                SET product_id = array_append(ap.product_id, product.id)
+                                FROM product
+                                WHERE ap.id = product.accepting_id
+                                RETURNING ap.id, ap.pvz_id
+                            )
+                            SELECT product.id, product.accepting_id, product.type, product.datetime
+                            FROM product
+                            JOIN updated ON updated.id = product.accepting_id
+                            CROSS JOIN LATERAL (
+                                SELECT pg_notify('pvz_events', json_build_object(
+                                    'event', 'product_added',
+                                    'pvz_id', updated.pvz_id,
+                                    'reception_id', product.accepting_id,
+                                    'product_id', product.id
+                                )::text)
+                            ) AS notified
                         """,
                         params=(self.accepting_id, self.product_type)
                     )
-                    product: Optional[tuple[str]] = await cursor.fetchone()
+                    # Строки нет, только если UPDATE приемки ничего не затронул
+                    product: Optional[ProductRow] = await cursor.fetchone()
                     if product is None:
-                        raise Exception("Не удалось обновить товар")
-
-                    product_id: str = product[0]
-
-                    await cursor.execute(
-                        query=
-                        """
-                            UPDATE accepting_products
-                            SET product_id = array_append(product_id, %s)
-                            WHERE id = %s
-                            RETURNING product_id
-                        """,
-                        params=(product_id, self.accepting_id)
-                    )
-
-                    updated_products: Optional[tuple[str]] = await cursor.fetchone()
-                    if updated_products is None:
                         raise Exception("Не удалось обновить список товаров в приемке")
 
                     return product
@@ -303,10 +474,10 @@ class AddProduct:
 class GetActiveAccepting:
     pvz_id: int
 
-    async def get(self) -> Union[Tuple, Exception]:
+    async def get(self) -> Union[ActiveReceptionRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary(shard=SHARDS.for_id(self.pvz_id)) as connection:
+                async with connection.cursor(row_factory=class_row(ActiveReceptionRow)) as cursor:
                     await cursor.execute(
                         query=
                         """
@@ -315,7 +486,7 @@ class GetActiveAccepting:
                         """,
                         params=(self.pvz_id,)
                     )
-                    result: Optional[tuple[str]] = await cursor.fetchone()
+                    result: Optional[ActiveReceptionRow] = await cursor.fetchone()
                     if result is None:
                         raise Exception("Активная приемка для данного ПВЗ не найдена")
 
@@ -330,47 +501,54 @@ class DeleteLastProduct:
     accepting_id: int
     product_id: int
 
-    async def delete(self) -> Union[Tuple, Exception]:
+    async def delete(self) -> Union[ProductRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
-                    await cursor.execute(
-                        query=
-                        """
-                            SELECT id, accepting_id, type, datetime
-                            FROM products
-                            WHERE accepting_id = %s AND id = %s
-                        """,
-                        params=(self.accepting_id, self.product_id)
-                    )
-                    product: Optional[tuple[str]] = await cursor.fetchone()
-                    if product is None:
-                        raise Exception("Товар не найден")
-
-                    await cursor.execute(
+            async with primary(shard=SHARDS.for_id(self.accepting_id)) as connection:
+                """Оба запроса независимы друг от друга - отправляются одним пакетом (pipeline mode)"""
+                async with connection.pipeline():
+                    deleted_cursor: AsyncCursor[ProductRow] = connection.cursor(row_factory=class_row(ProductRow))
+                    await deleted_cursor.execute(
                         query=
                         """
                             DELETE FROM products
                             WHERE id = %s AND accepting_id = %s
+                            RETURNING id, accepting_id, type, datetime
                         """,
                         params=(self.product_id, self.accepting_id)
                     )
-
-                    await cursor.execute(
+                    updated_cursor: AsyncCursor = await connection.execute(
                         query=
                         """
-                            UPDATE accepting_products
-                            SET product_id = array_remove(product_id, %s)
-                            WHERE id = %s
-                            RETURNING product_id
+                            WITH updated AS (
+                                UPDATE accepting_products
+                                SET product_id = array_remove(product_id, %(product_id)s)
+                                WHERE id = %(accepting_id)s
+                                RETURNING id, pvz_id, product_id
+                            )
+                            SELECT updated.product_id
+                            FROM updated
+                            CROSS JOIN LATERAL (
+                                SELECT pg_notify('pvz_events', json_build_object(
+                                    'event', 'product_deleted',
+                                    'pvz_id', updated.pvz_id,
+                                    'reception_id', updated.id,
+                                    'product_id', %(product_id)s
+                                )::text)
+                            ) AS notified
                         """,
-                        params=(self.product_id, self.accepting_id)
+                        params={"product_id": self.product_id, "accepting_id": self.accepting_id}
                     )
-                    updated_products: Optional[tuple[str]] = await cursor.fetchone()
-                    if updated_products is None:
-                        raise Exception("Не удалось обновить список товаров в приемке")
 
-                    return product
+                # При исключении ниже транзакция откатывается вместе с UPDATE
+                product: Optional[ProductRow] = await deleted_cursor.fetchone()
+                if product is None:
+                    raise Exception("Товар не найден")
+
+                updated_products: Optional[Tuple] = await updated_cursor.fetchone()
+                if updated_products is None:
+                    raise Exception("Не удалось обновить список товаров в приемке")
+
+                return product
 
         except Exception as error:
             raise error
@@ -380,156 +558,620 @@ class DeleteLastProduct:
 class CloseReception:
     pvz_id: int
 
-    async def close(self) -> Union[Tuple, Exception]:
+    async def close(self) -> Union[ReceptionRow, Exception]:
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
+            async with primary(shard=SHARDS.for_id(self.pvz_id)) as connection:
+                async with connection.cursor(row_factory=class_row(ReceptionRow)) as cursor:
                     await cursor.execute(
                         query=
                         """
-                            SELECT id, pvz_id, status FROM accepting_products
-                            WHERE pvz_id = %s AND status = 'in_progress'
+                            WITH closed AS (
+                                UPDATE accepting_products
+                                SET status = 'close'
+                                WHERE pvz_id = %s AND status = 'in_progress'
+                                RETURNING id, pvz_id, status, product_count, json_build_object(
+                                    'электроника', electronics_count, 'одежда', clothes_count, 'обувь', shoes_count
+                                ) AS product_counts
+                            )
+                            SELECT closed.id, closed.pvz_id, closed.status, closed.product_count, closed.product_counts
+                            FROM closed
+                            CROSS JOIN LATERAL (
+                                SELECT pg_notify('pvz_events', json_build_object(
+                                    'event', 'reception_closed',
+                                    'pvz_id', closed.pvz_id,
+                                    'reception_id', closed.id
+                                )::text)
+                            ) AS notified
                         """,
                         params=(self.pvz_id,)
                     )
-                    reception: Optional[tuple[str]] = await cursor.fetchone()
-                    if reception is None:
+                    updated_reception: Optional[ReceptionRow] = await cursor.fetchone()
+                    if updated_reception is None:
                         raise Exception("Активная приемка для данного ПВЗ не найдена")
 
-                    reception_id: str = reception[0]
+                    return updated_reception
 
-                    await cursor.execute(
-                        query=
-                        """
-                            UPDATE accepting_products
-                            SET status = 'close'
-                            WHERE id = %s
-                            RETURNING id, pvz_id, status
-                        """,
-                        params=(reception_id,)
-                    )
-                    updated_reception: Optional[tuple[str]] = await cursor.fetchone()
-                    if updated_reception is None:
-                        raise Exception("Не удалось закрыть приемку")
+        except Exception as error:
+            raise error
+
+
+@dataclass(frozen=True)
+class CloseStaleReceptions:
+    max_age: timedelta
+    batch_size: int = 500
+    shard: int = DEFAULT_SHARD
+
+    async def close(self) -> int:
+        """
+            Закрывает все приемки старше max_age пачками по batch_size: каждая пачка - отдельная транзакция,
+            поэтому строки заблокированы недолго, а занятые параллельной мутацией пропускаются (SKIP LOCKED)
+        """
+        try:
+            closed: int = 0
+            async with primary(budget="CloseStaleReceptions", shard=self.shard) as connection:
+                while True:
+                    async with connection.transaction():
+                        cursor: AsyncCursor = await connection.execute(
+                            query=
+                            """
+                                SELECT id
+                                FROM accepting_products
+                                WHERE status = 'in_progress' AND datetime < NOW() - %(max_age)s
+                                ORDER BY id
+                                LIMIT %(batch_size)s
+                                FOR UPDATE SKIP LOCKED
+                            """,
+                            params={"max_age": self.max_age, "batch_size": self.batch_size}
+                        )
+                        stale_ids: List[int] = [row[0] for row in await cursor.fetchall()]
+
+                        # Пустой UPDATE тоже сработал бы statement-триггером версии и сбросил ETag-и /pvz-info
+                        if stale_ids:
+                            await connection.execute(
+                                query=
+                                """
+                                    WITH closed AS (
+                                        UPDATE accepting_products
+                                        SET status = 'close'
+                                        WHERE id = ANY(%s)
+                                        RETURNING id, pvz_id
+                                    )
+                                    SELECT pg_notify('pvz_events', json_build_object(
+                                        'event', 'reception_closed',
+                                        'pvz_id', closed.pvz_id,
+                                        'reception_id', closed.id
+                                    )::text)
+                                    FROM closed
+                                """,
+                                params=(stale_ids,)
+                            )
+
+                    closed += len(stale_ids)
+                    if len(stale_ids) < self.batch_size:
+                        return closed
+
+        except Exception as error:
+            raise error
 
-                    return updated_reception
+
+@dataclass(frozen=True)
+class SweepExpiredSessions:
+    batch_size: int = 1000
+
+    async def sweep(self) -> int:
+        """Удаляет истекшие сессии пачками - короткие транзакции не мешают входам и не раздувают WAL разом"""
+        try:
+            deleted: int = 0
+            async with primary(budget="SweepExpiredSessions") as connection:
+                while True:
+                    async with connection.transaction():
+                        cursor: AsyncCursor = await connection.execute(
+                            query=
+                            """
+                                DELETE FROM sessions
+                                WHERE user_id IN (
+                                    SELECT user_id
+                                    FROM sessions
+                                    WHERE expires_at <= NOW()
+                                    LIMIT %s
+                                    FOR UPDATE SKIP LOCKED
+                                )
+                            """,
+                            params=(self.batch_size,)
+                        )
+
+                    deleted += cursor.rowcount
+                    if cursor.rowcount < self.batch_size:
+                        return deleted
 
         except Exception as error:
             raise error
 
 
+PVZ_INFO_VERSION_QUERY: SQL = SQL("""
+    SELECT sum(version)::bigint AS version, max(changed_at) AS changed_at
+    FROM pvz_info_version
+""")
+
+PVZ_INFO_COUNT_QUERY: SQL = SQL("""
+    SELECT COUNT(DISTINCT p.id)
+    FROM pvz_list p
+    LEFT JOIN (
+        SELECT pvz_id
+        FROM accepting_products
+        WHERE (%s IS NULL OR datetime >= %s)
+        AND (%s IS NULL OR datetime <= %s)
+    ) ap ON p.id = ap.pvz_id
+""")
+
+# Двухфазная загрузка /pvz-info: страница ПВЗ, затем приемки и товары всей страницы двумя запросами по = ANY
+PVZ_PAGE_QUERY: SQL = SQL("""
+    SELECT id, city, registered_at
+    FROM pvz_list
+    ORDER BY id
+    LIMIT %(page_size)s OFFSET %(offset)s
+""")
+
+# Keyset-страница потоковой выгрузки: диапазон по первичному ключу вместо OFFSET
+PVZ_AFTER_QUERY: SQL = SQL("""
+    SELECT id, city, registered_at
+    FROM pvz_list
+    WHERE id > %(last_id)s
+    ORDER BY id
+    LIMIT %(page_size)s
+""")
+
+# datetime - текстом JSON Postgres, как в json_build_object однозапросного варианта: дробная часть секунд без
+# хвостовых нулей, а не шесть знаков isoformat - тело страницы и ETag не зависят от способа загрузки
+PVZ_RECEPTIONS_QUERY: SQL = SQL("""
+    SELECT id, pvz_id, to_json(datetime) #>> '{}', status, product_id,
+           product_count, electronics_count, clothes_count, shoes_count
+    FROM accepting_products
+    WHERE pvz_id = ANY(%(pvz_ids)s) AND datetime >= %(start_date)s AND datetime <= %(end_date)s
+    ORDER BY id
+""")
+
+PVZ_PRODUCTS_QUERY: SQL = SQL("""
+    SELECT pr.id, pr.accepting_id, to_json(pr.datetime) #>> '{}', pr.type
+    FROM products pr
+    JOIN accepting_products ap ON ap.id = pr.accepting_id
+    WHERE ap.pvz_id = ANY(%(pvz_ids)s) AND ap.datetime >= %(start_date)s AND ap.datetime <= %(end_date)s
+    ORDER BY pr.id
+""")
+
+
+# Запросы, которые держат соединение страницы и ждут второе под count, не должны занимать пул целиком: иначе
+# одновременные вызовы (gRPC не проходит admission control) разбирают все соединения под страницы и ждут друг
+# друга до PoolTimeout. Второе соединение ждет не больше половины пула, остальные освобождаются запросами, которым
+# оно не нужно. Слот берется без ожидания: все заняты - count идет в пакете со страницей
+PVZ_INFO_COUNT_SLOTS: Semaphore = Semaphore(PSQLConfig.PVZ_INFO_COUNT_SLOTS)
+
+
+def merge_versions(versions: List[PVZInfoVersionRow]) -> PVZInfoVersionRow:
+    """Версия данных всех шардов: сумма монотонных счетчиков тоже монотонна"""
+    return PVZInfoVersionRow(
+        version=sum(version.version for version in versions),
+        changed_at=max(version.changed_at for version in versions)
+    )
+
+
 @dataclass(frozen=True)
 class GetPVZInfo:
     page: int
     page_size: int
     start_date: datetime
     end_date: datetime
+    known_version: Optional[int] = None
+    summary: bool = False
+    parallel_count: bool = PSQLConfig.PVZ_INFO_PARALLEL_COUNT
+    batched: bool = PSQLConfig.PVZ_INFO_BATCHED
 
-    async def get(self) -> Tuple[List[Union[Dict[str, str], List[Union[Dict[str, Union[str, Any]]]]]], int]:
+    async def get(self) -> Tuple[Optional[List[PVZInfoRow]], int, PVZInfoVersionRow]:
+        """Без изменений с known_version агрегация не выполняется - возвращается (None, 0, версия)"""
         try:
-            async with await connect() as connection:
-                async with connection.cursor() as cursor:
-                    """Определение time-zone"""
-                    await cursor.execute("SET TIME ZONE 'Europe/Moscow';")
+            if SHARDS.enabled:
+                return await self._gather()
+
+            # time-zone задается при подключении (PSQLConfig.DB_TIMEZONE)
+            async with replica(budget="GetPVZInfo") as connection:
+                """Версия и страница не зависят друг от друга - отправляются одним пакетом (pipeline mode)"""
+                async with connection.pipeline():
+                    # Версия читается раньше данных: при гонке ETag отстает от тела, а не наоборот
+                    version_cursor: AsyncCursor[PVZInfoVersionRow] = connection.cursor(
+                        row_factory=class_row(PVZInfoVersionRow)
+                    )
+                    await version_cursor.execute(PVZ_INFO_VERSION_QUERY)
+                    version: Optional[PVZInfoVersionRow] = None
+                    if self.known_version is not None:
+                        version = await version_cursor.fetchone()
+                        if version is not None and version.version == self.known_version:
+                            return None, 0, version
 
                     offset: int = (self.page - 1) * self.page_size
-                    query: SQL = SQL("""
-                        SELECT 
-                            p.id,
-                            p.city,
-                            p.registered_at,
-                            COALESCE(
-                                json_agg(
-                                    json_build_object(
-                                        'id', ap.id,
-                                        'pvz_id', ap.pvz_id,
-                                        'datetime', ap.datetime,
-                                        'product_ids', ap.product_id,
-                                        'status', ap.status,
-                                        'products', (
-                                            SELECT COALESCE(
-                                                json_agg(
-                                                    json_build_object(
-                                                        'id', pr.id,
-                                                        'accepting_id', pr.accepting_id,
-                                                        'datetime', pr.datetime,
-                                                        'type', pr.type
-                                                    )
-                                                ),
-                                                '[]'::json
-                                            )
-                                            FROM products pr
-                                            WHERE pr.accepting_id = ap.id
+                    page_cursor: Optional[AsyncCursor] = None
+                    aggregated_cursor: Optional[AsyncCursor[PVZInfoRow]] = None
+                    if self.batched:
+                        page_cursor = await connection.execute(
+                            PVZ_PAGE_QUERY, {"page_size": self.page_size, "offset": offset}
+                        )
+                    else:
+                        aggregated_cursor = connection.cursor(row_factory=class_row(PVZInfoRow))
+                        await aggregated_cursor.execute(self._aggregated_query(), [
+                            self.start_date, self.start_date,
+                            self.end_date, self.end_date,
+                            self.page_size, offset
+                        ])
+
+                    """
+                        count сканирует весь диапазон дат и выполняется сервером после страницы - на отдельном
+                        соединении из пула он идет параллельно с ней. Снимок у соединений разный, но total нужен
+                        только для пагинации, а ETag защищен тем, что версия прочитана раньше обоих запросов
+                    """
+                    count_params: List[datetime] = [self.start_date, self.start_date, self.end_date, self.end_date]
+                    count_task: Optional[Task[int]] = None
+                    count_cursor: Optional[AsyncCursor] = None
+                    if self.parallel_count and not PVZ_INFO_COUNT_SLOTS.locked():
+                        # Слот свободен - acquire не ждет; отпускается, когда задача count завершится
+                        await PVZ_INFO_COUNT_SLOTS.acquire()
+                        count_task = create_task(self._count(count_params))
+                        count_task.add_done_callback(lambda _: PVZ_INFO_COUNT_SLOTS.release())
+                    else:
+                        count_cursor = await connection.execute(PVZ_INFO_COUNT_QUERY, count_params)
+
+                    try:
+                        pvz_data: List[PVZInfoRow]
+                        if page_cursor is not None:
+                            pvz_data = await self._load_receptions(connection, await page_cursor.fetchall())
+                        else:
+                            # receptions уже собраны json_agg и разобраны psycopg - повторная пересборка не нужна
+                            pvz_data = await aggregated_cursor.fetchall()  # type: ignore[union-attr]
+                        if version is None:
+                            version = await version_cursor.fetchone()
+                        total: int = (
+                            await count_task if count_task is not None
+                            else (await count_cursor.fetchone())[0]  # type: ignore[union-attr,index]
+                        )
+                    finally:
+                        if count_task is not None:
+                            count_task.cancel()
+
+                    return pvz_data, total, version  # type: ignore[return-value]
+
+        except Exception as error:
+            raise error
+
+    async def _gather(self) -> Tuple[Optional[List[PVZInfoRow]], int, PVZInfoVersionRow]:
+        """
+            Шарды опрашиваются параллельно: каждый отдает версию, count и первые offset + page_size ПВЗ по id,
+            общая страница - срез слияния этих списков (id не повторяются между шардами). Приемки и товары
+            грузятся второй фазой только из шардов, чьи ПВЗ попали на страницу. Всегда двухфазная загрузка;
+            цена глубокой страницы растет с offset на каждом шарде
+        """
+        if self.known_version is not None:
+            version: PVZInfoVersionRow = merge_versions(
+                await gather(*(self._shard_version(shard) for shard in SHARDS.shards()))
+            )
+            if version.version == self.known_version:
+                return None, 0, version
+
+        offset: int = (self.page - 1) * self.page_size
+        pages: List[Tuple[PVZInfoVersionRow, List[Tuple[int, str, datetime]], int]] = await gather(
+            *(self._shard_page(shard, offset + self.page_size) for shard in SHARDS.shards())
+        )
+        page_rows: List[Tuple[int, str, datetime]] = list(
+            merge(*(rows for _, rows, _ in pages), key=lambda row: row[0])
+        )[offset:offset + self.page_size]
+
+        return (
+            await self._load_sharded(page_rows),
+            sum(total for _, _, total in pages),
+            merge_versions([shard_version for shard_version, _, _ in pages])
+        )
+
+    async def after(self, last_id: int) -> List[PVZInfoRow]:
+        """
+            Keyset-страница для потоковой выгрузки: page_size ПВЗ с id больше last_id, без версии и count
+            (page и known_version не используются). Каждая страница читается своим снимком, но вставки
+            не сдвигают уже пройденный диапазон id - ПВЗ не пропускаются и не повторяются
+        """
+        try:
+            params: Dict[str, int] = {"last_id": last_id, "page_size": self.page_size}
+            if not SHARDS.enabled:
+                async with replica(budget="GetPVZInfo") as connection:
+                    async with connection.pipeline():
+                        cursor: AsyncCursor = await connection.execute(PVZ_AFTER_QUERY, params)
+                        return await self._load_receptions(connection, await cursor.fetchall())
+
+            # Каждый шард отдает page_size своих ПВЗ после last_id - общая страница в их слиянии
+            pages: List[List[Tuple[int, str, datetime]]] = await gather(
+                *(self._shard_after(shard, params) for shard in SHARDS.shards())
+            )
+            return await self._load_sharded(list(merge(*pages, key=lambda row: row[0]))[:self.page_size])
+
+        except Exception as error:
+            raise error
+
+    async def _shard_after(self, shard: int, params: Dict[str, int]) -> List[Tuple[int, str, datetime]]:
+        async with replica(budget="GetPVZInfo", shard=shard) as connection:
+            cursor: AsyncCursor = await connection.execute(PVZ_AFTER_QUERY, params)
+            return await cursor.fetchall()
+
+    async def _load_sharded(self, page_rows: List[Tuple[int, str, datetime]]) -> List[PVZInfoRow]:
+        """Вторая фаза по шардам: приемки и товары только из шардов, чьи ПВЗ попали на страницу"""
+        rows_by_shard: Dict[int, List[Tuple[int, str, datetime]]] = {}
+        for row in page_rows:
+            rows_by_shard.setdefault(SHARDS.for_id(row[0]), []).append(row)
+        loaded: List[List[PVZInfoRow]] = await gather(
+            *(self._shard_receptions(shard, rows) for shard, rows in rows_by_shard.items())
+        )
+        by_id: Dict[int, PVZInfoRow] = {row.id: row for rows in loaded for row in rows}
+
+        return [by_id[pvz_id] for pvz_id, _, _ in page_rows]
+
+    async def _shard_version(self, shard: int) -> PVZInfoVersionRow:
+        async with replica(budget="GetPVZInfo", shard=shard) as connection:
+            cursor: AsyncCursor[PVZInfoVersionRow] = connection.cursor(row_factory=class_row(PVZInfoVersionRow))
+            await cursor.execute(PVZ_INFO_VERSION_QUERY)
+            return await cursor.fetchone()  # type: ignore[return-value]
+
+    async def _shard_page(
+            self,
+            shard: int,
+            limit: int
+    ) -> Tuple[PVZInfoVersionRow, List[Tuple[int, str, datetime]], int]:
+        async with replica(budget="GetPVZInfo", shard=shard) as connection:
+            async with connection.pipeline():
+                # Как и без шардов, версия читается раньше данных
+                version_cursor: AsyncCursor[PVZInfoVersionRow] = connection.cursor(
+                    row_factory=class_row(PVZInfoVersionRow)
+                )
+                await version_cursor.execute(PVZ_INFO_VERSION_QUERY)
+                page_cursor: AsyncCursor = await connection.execute(PVZ_PAGE_QUERY, {"page_size": limit, "offset": 0})
+                count_cursor: AsyncCursor = await connection.execute(
+                    PVZ_INFO_COUNT_QUERY, [self.start_date, self.start_date, self.end_date, self.end_date]
+                )
+                return (
+                    await version_cursor.fetchone(),  # type: ignore[return-value]
+                    await page_cursor.fetchall(),
+                    (await count_cursor.fetchone())[0],  # type: ignore[index]
+                )
+
+    async def _shard_receptions(self, shard: int, pvz_rows: List[Tuple[int, str, datetime]]) -> List[PVZInfoRow]:
+        async with replica(budget="GetPVZInfo", shard=shard) as connection:
+            async with connection.pipeline():
+                return await self._load_receptions(connection, pvz_rows)
+
+    async def _load_receptions(
+            self,
+            connection: AsyncConnection,
+            pvz_rows: List[Tuple[int, str, datetime]]
+    ) -> List[PVZInfoRow]:
+        """
+            Вторая фаза: приемки и товары всей страницы - двумя запросами одним пакетом вместо подзапроса
+            на каждую приемку. Дерево собирается за один проход; форма приемок та же, что у json_agg
+        """
+        receptions: Dict[int, List[Dict[str, Any]]] = {pvz_id: [] for pvz_id, _, _ in pvz_rows}
+        if not receptions:
+            return []
+
+        params: Dict[str, Any] = {
+            "pvz_ids": list(receptions),
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+        }
+        receptions_cursor: AsyncCursor = await connection.execute(PVZ_RECEPTIONS_QUERY, params)
+        products_cursor: Optional[AsyncCursor] = None
+        if not self.summary:
+            products_cursor = await connection.execute(PVZ_PRODUCTS_QUERY, params)
+
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for (
+                reception_id, pvz_id, accepted_at, status, product_ids,
+                product_count, electronics_count, clothes_count, shoes_count
+        ) in await receptions_cursor.fetchall():
+            reception: Dict[str, Any] = {
+                "id": reception_id,
+                "pvz_id": pvz_id,
+                "datetime": accepted_at,
+                "status": status,
+            }
+            if not self.summary:
+                reception["product_ids"] = product_ids
+                reception["products"] = []
+            reception["product_count"] = product_count
+            reception["product_counts"] = {
+                "электроника": electronics_count,
+                "одежда": clothes_count,
+                "обувь": shoes_count,
+            }
+            receptions[pvz_id].append(reception)
+            by_id[reception_id] = reception
+
+        if products_cursor is not None:
+            for product_id, accepting_id, product_datetime, product_type in await products_cursor.fetchall():
+                by_id[accepting_id]["products"].append({
+                    "id": product_id,
+                    "accepting_id": accepting_id,
+                    "datetime": product_datetime,
+                    "type": product_type,
+                })
+
+        return [
+            PVZInfoRow(id=pvz_id, city=city, registered_at=registered_at, receptions=receptions[pvz_id])
+            for pvz_id, city, registered_at in pvz_rows
+        ]
+
+    def _aggregated_query(self) -> Composed:
+        """Прежний однозапросный вариант: json_agg по LEFT JOIN и коррелированный подзапрос товаров"""
+        # Сводке хватает счетчиков приемки - коррелированный подзапрос по products не выполняется
+        products: SQL = SQL("") if self.summary else SQL("""
+                            'product_ids', ap.product_id,
+                            'products', (
+                                SELECT COALESCE(
+                                    json_agg(
+                                        json_build_object(
+                                            'id', pr.id,
+                                            'accepting_id', pr.accepting_id,
+                                            'datetime', pr.datetime,
+                                            'type', pr.type
                                         )
-                                    )
-                                ) FILTER (WHERE ap.id IS NOT NULL),
-                                '[]'::json
-                            ) as receptions
-                        FROM pvz_list p
-                        LEFT JOIN (
-                            SELECT *
-                            FROM accepting_products
-                            WHERE %s IS NULL OR datetime >= %s
-                            AND %s IS NULL OR datetime <= %s
-                        ) ap ON p.id = ap.pvz_id
-                        GROUP BY p.id, p.city, p.registered_at
-                        ORDER BY p.id
-                        LIMIT %s OFFSET %s
-                    """)
-
-                    count_query: SQL = SQL("""
-                        SELECT COUNT(DISTINCT p.id)
-                        FROM pvz_list p
-                        LEFT JOIN (
-                            SELECT pvz_id
-                            FROM accepting_products
-                            WHERE %s IS NULL OR datetime >= %s
-                            AND %s IS NULL OR datetime <= %s
-                        ) ap ON p.id = ap.pvz_id
-                    """)
-
-                    params: List[Union[Optional[datetime | int]]] = [
-                        self.start_date, self.start_date,
-                        self.end_date, self.end_date,
-                        self.page_size, offset
-                    ]
-
-                    await cursor.execute(query, params)
-                    pvz_data: Optional[List[Any]] = await cursor.fetchall()
-
-                    count_params = params[:-2]
-                    await cursor.execute(count_query, count_params)
-                    total: int = (await cursor.fetchone())[0]  # type: ignore[index]
-
-                    formatted_data: List[Union[Dict[str, str] | List[Union[Dict[str, str | Any]]]]] = [
-                        {
-                            "id": row[0],
-                            "city": row[1],
-                            "registered_at": str(row[2]),
-                            "receptions": [  # type: ignore[dict-item]
-                                {
-                                    "id": reception["id"],
-                                    "pvz_id": reception["pvz_id"],
-                                    "datetime": str(reception["datetime"]),
-                                    "product_ids": reception["product_ids"],
-                                    "status": reception["status"],
-                                    "products": [
-                                        {
-                                            "id": product["id"],
-                                            "accepting_id": product["accepting_id"],
-                                            "datetime": str(product["datetime"]),
-                                            "type": product["type"]
-                                        }
-                                        for product in reception["products"]
-                                    ]
-                                }
-                                for reception in row[3]
-                            ]
-                        }
-                        for row in pvz_data  # type: ignore[union-attr]
-                    ]
-
-                    return formatted_data, total
+                                    ),
+                                    '[]'::json
+                                )
+                                FROM products pr
+                                WHERE pr.accepting_id = ap.id
+                            ),
+        """)
+        return SQL("""
+            SELECT 
+                p.id,
+                p.city,
+                p.registered_at,
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'id', ap.id,
+                            'pvz_id', ap.pvz_id,
+                            'datetime', ap.datetime,
+                            'status', ap.status,
+                            {products}
+                            'product_count', ap.product_count,
+                            'product_counts', json_build_object(
+                                'электроника', ap.electronics_count,
+                                'одежда', ap.clothes_count,
+                                'обувь', ap.shoes_count
+                            )
+                        )
+                    ) FILTER (WHERE ap.id IS NOT NULL),
+                    '[]'::json
+                ) as receptions
+            FROM pvz_list p
+            LEFT JOIN (
+                SELECT *
+                FROM accepting_products
+                WHERE (%s IS NULL OR datetime >= %s)
+                AND (%s IS NULL OR datetime <= %s)
+            ) ap ON p.id = ap.pvz_id
+            GROUP BY p.id, p.city, p.registered_at
+            ORDER BY p.id
+            LIMIT %s OFFSET %s
+        """).format(products=products)
+
+    async def _count(self, params: List[datetime]) -> int:
+        async with replica(budget="GetPVZInfo") as connection:
+            cursor: AsyncCursor = await connection.execute(PVZ_INFO_COUNT_QUERY, params)
+            return (await cursor.fetchone())[0]  # type: ignore[index]
+
+
+@dataclass(frozen=True)
+class SearchProducts:
+    start_date: datetime
+    end_date: datetime
+    limit: int
+    product_type: Optional[str] = None
+    pvz_id: Optional[int] = None
+    after: Optional[Tuple[datetime, int]] = None
+
+    async def search(self) -> List[ProductSearchRow]:
+        """
+            Keyset-пагинация по (datetime, id): страница начинается сразу после последней строки предыдущей,
+            без OFFSET. Диапазон по products.datetime отсекается BRIN-индексом - читаются только блоки
+            нужных месяцев, поэтому фильтры собираются в запрос только если заданы (без "%s IS NULL OR ...")
+        """
+        try:
+            conditions: List[SQL] = [SQL("p.datetime >= %(start_date)s"), SQL("p.datetime <= %(end_date)s")]
+            params: Dict[str, Any] = {
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "limit": self.limit,
+            }
+            if self.product_type is not None:
+                conditions.append(SQL("p.type = %(product_type)s"))
+                params["product_type"] = self.product_type
+            if self.pvz_id is not None:
+                conditions.append(SQL("ap.pvz_id = %(pvz_id)s"))
+                params["pvz_id"] = self.pvz_id
+            if self.after is not None:
+                # Отдельное условие на datetime - его видит BRIN, сравнение кортежей индекс не использует
+                conditions.append(SQL("p.datetime >= %(after_datetime)s"))
+                conditions.append(SQL("(p.datetime, p.id) > (%(after_datetime)s, %(after_id)s)"))
+                params["after_datetime"], params["after_id"] = self.after
+
+            query: Composed = SQL("""
+                SELECT p.id, p.accepting_id, ap.pvz_id, p.type, p.datetime
+                FROM products p
+                JOIN accepting_products ap ON ap.id = p.accepting_id
+                WHERE {conditions}
+                ORDER BY p.datetime, p.id
+                LIMIT %(limit)s
+            """).format(conditions=SQL(" AND ").join(conditions))
+
+            """
+                Шард ПВЗ известен по его id; без фильтра по ПВЗ каждый шард отдает до limit строк после курсора, и
+                первые limit строк слияния по (datetime, id) - та же страница, что дала бы одна база
+            """
+            shards: List[int] = (
+                [SHARDS.for_id(self.pvz_id)] if self.pvz_id is not None else list(SHARDS.shards())
+            )
+            pages: List[List[ProductSearchRow]] = await gather(
+                *(self._search_shard(shard, query, params) for shard in shards)
+            )
+            if len(pages) == 1:
+                return pages[0]
+            return list(merge(*pages, key=lambda row: (row.datetime, row.id)))[:self.limit]
+
+        except Exception as error:
+            raise error
+
+    @staticmethod
+    async def _search_shard(shard: int, query: Composed, params: Dict[str, Any]) -> List[ProductSearchRow]:
+        async with replica(budget="SearchProducts", shard=shard) as connection:
+            async with connection.cursor(row_factory=class_row(ProductSearchRow)) as cursor:
+                await cursor.execute(query, params)
+                return await cursor.fetchall()
+
+
+@dataclass(frozen=True)
+class ExportProducts:
+    start_date: datetime
+    end_date: datetime
+    chunk_size: int = 64 * 1024
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """
+            CSV формирует сам Postgres (COPY ... TO STDOUT): строки не разбираются в Python, а блоки протокола
+            склеиваются до chunk_size и сразу уходят в ответ - Postgres шлет по сообщению на строку. COPY не
+            принимает параметры, поэтому даты подставляются Literal; ORDER BY нет - сортировка копила бы всю выгрузку
+        """
+        try:
+            """Шарды выгружаются по очереди, заголовок CSV - только у первого"""
+            buffer: bytearray = bytearray()
+            for shard in SHARDS.shards():
+                query: Composed = SQL("""
+                    COPY (
+                        SELECT p.id AS product_id, p.type, p.datetime, p.accepting_id AS reception_id,
+                               ap.pvz_id, pl.city
+                        FROM products p
+                        JOIN accepting_products ap ON ap.id = p.accepting_id
+                        JOIN pvz_list pl ON pl.id = ap.pvz_id
+                        WHERE p.datetime >= {start_date} AND p.datetime <= {end_date}
+                    ) TO STDOUT WITH (FORMAT csv, HEADER {header})
+                """).format(
+                    start_date=Literal(self.start_date),
+                    end_date=Literal(self.end_date),
+                    header=SQL("true" if shard == DEFAULT_SHARD else "false")
+                )
+
+                async with replica(shard=shard) as connection:
+                    async with connection.cursor() as cursor:
+                        async with cursor.copy(query) as copy:
+                            async for data in copy:
+                                buffer += data
+                                if len(buffer) >= self.chunk_size:
+                                    yield bytes(buffer)
+                                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
 
         except Exception as error:
             raise error
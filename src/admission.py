@@ -0,0 +1,177 @@
+from asyncio import Semaphore, wait_for
+from dataclasses import dataclass, field
+from os import getenv
+from time import perf_counter
+from typing import Dict, FrozenSet, Optional
+
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.metrics import METRICS
+
+METRICS.describe("admission_in_flight", "gauge", "Запросы, выполняющиеся внутри лимита маршрута")
+METRICS.describe("admission_queued", "gauge", "Запросы, ожидающие свободного слота маршрута")
+METRICS.describe("admission_admitted_total", "counter", "Запросы, допущенные к выполнению")
+METRICS.describe("admission_rejected_total", "counter", "Запросы, отклоненные с 503 (reason: queue_full, queue_timeout)")
+METRICS.describe("admission_queue_wait_seconds_total", "counter", "Суммарное время ожидания в очереди маршрута")
+
+
+@dataclass(frozen=True)
+class RouteBudget:
+    limit: int
+    queue_timeout: float
+    max_queue: int
+
+
+def parse_route_budgets(raw: str) -> Dict[str, RouteBudget]:
+    """Формат: "/pvz-info=8:2.0:32;/authorization-checker=200:0.05:400" (limit:queue_timeout:max_queue)"""
+    budgets: Dict[str, RouteBudget] = {}
+    for item in filter(None, (part.strip() for part in raw.split(";"))):
+        route, values = item.split("=", 1)
+        limit, queue_timeout, max_queue = values.split(":")
+        budgets[route.strip()] = RouteBudget(
+            limit=int(limit),
+            queue_timeout=float(queue_timeout),
+            max_queue=int(max_queue)
+        )
+
+    return budgets
+
+
+# Ключ scope с найденным шаблоном маршрута: admission control и дедлайны разбирают один и тот же запрос
+ROUTE_PATH_KEY: str = "pvz.route_path"
+
+
+def route_path(scope: Scope) -> Optional[str]:
+    """
+        Шаблон маршрута (/pvz/{pvz_id}/events), а не конкретный путь - лимиты и бюджеты задаются по нему.
+        Список маршрутов просматривается один раз на запрос, результат сохраняется в scope
+    """
+    if ROUTE_PATH_KEY in scope:
+        return scope[ROUTE_PATH_KEY]
+
+    path: Optional[str] = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            path = route.path
+            break
+
+    scope[ROUTE_PATH_KEY] = path
+    return path
+
+
+# Дешевые проверки токена пропускаем широко, тяжелую агрегацию /pvz-info - узко
+DEFAULT_ROUTE_BUDGETS: Dict[str, RouteBudget] = {
+    "/authorization-checker": RouteBudget(limit=200, queue_timeout=0.05, max_queue=400),
+    "/pvz-info": RouteBudget(limit=8, queue_timeout=2.0, max_queue=32),
+    # Выгрузка держит соединение с репликой все время передачи - одновременно лишь несколько
+    "/export/products.csv": RouteBudget(limit=2, queue_timeout=0.5, max_queue=2),
+}
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    DEFAULT_LIMIT: int = int(getenv("ADMISSION_DEFAULT_LIMIT", default=32))
+    DEFAULT_QUEUE_TIMEOUT: float = float(getenv("ADMISSION_DEFAULT_QUEUE_TIMEOUT", default=1.0))
+    DEFAULT_MAX_QUEUE: int = int(getenv("ADMISSION_DEFAULT_MAX_QUEUE", default=64))
+    RETRY_AFTER_SECONDS: int = int(getenv("ADMISSION_RETRY_AFTER_SECONDS", default=1))
+    ROUTE_BUDGETS: Dict[str, RouteBudget] = field(
+        default_factory=lambda: {
+            **DEFAULT_ROUTE_BUDGETS,
+            **parse_route_budgets(getenv("ADMISSION_ROUTE_LIMITS", default=""))
+        }
+    )
+    # SSE-потоки держат соединение часами - их число ограничивает PVZ_EVENTS_MAX_SUBSCRIBERS, а не слоты admission
+    EXEMPT_ROUTES: FrozenSet[str] = frozenset({
+        "/metrics", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json", "/pvz/events", "/pvz/{pvz_id}/events"
+    })
+
+    def budget(self, route: str) -> RouteBudget:
+        return self.ROUTE_BUDGETS.get(
+            route,
+            RouteBudget(limit=self.DEFAULT_LIMIT, queue_timeout=self.DEFAULT_QUEUE_TIMEOUT, max_queue=self.DEFAULT_MAX_QUEUE)
+        )
+
+
+class RouteLimiter:
+    def __init__(self, route: str, budget: RouteBudget) -> None:
+        self.route: str = route
+        self.budget: RouteBudget = budget
+        self.in_flight: int = 0
+        self.queued: int = 0
+        self._semaphore: Semaphore = Semaphore(budget.limit)
+
+    async def acquire(self) -> Optional[str]:
+        """Возвращает причину отказа или None, если слот получен"""
+        if self._semaphore.locked():
+            if self.queued >= self.budget.max_queue:
+                return self._reject("queue_full")
+
+            self.queued += 1
+            METRICS.set("admission_queued", self.queued, route=self.route)
+            started: float = perf_counter()
+            try:
+                await wait_for(self._semaphore.acquire(), timeout=self.budget.queue_timeout)
+            except TimeoutError:
+                return self._reject("queue_timeout")
+            finally:
+                self.queued -= 1
+                METRICS.set("admission_queued", self.queued, route=self.route)
+                METRICS.inc("admission_queue_wait_seconds_total", perf_counter() - started, route=self.route)
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        METRICS.set("admission_in_flight", self.in_flight, route=self.route)
+        METRICS.inc("admission_admitted_total", route=self.route)
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        METRICS.set("admission_in_flight", self.in_flight, route=self.route)
+        self._semaphore.release()
+
+    def _reject(self, reason: str) -> str:
+        METRICS.inc("admission_rejected_total", route=self.route, reason=reason)
+        return reason
+
+
+class AdmissionControlMiddleware:
+    """Ограничивает параллелизм по шаблону маршрута и быстро отвечает 503 при перегрузке"""
+
+    def __init__(self, app: ASGIApp, config: AdmissionConfig = AdmissionConfig()) -> None:
+        self.app: ASGIApp = app
+        self.config: AdmissionConfig = config
+        self.limiters: Dict[str, RouteLimiter] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route: Optional[str] = route_path(scope) if scope["type"] == "http" else None
+        if route is None or route in self.config.EXEMPT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        limiter: RouteLimiter = self._limiter(route)
+        rejected: Optional[str] = await limiter.acquire()
+        if rejected is not None:
+            response: JSONResponse = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"errors": "Сервис перегружен, повторите запрос позже"},
+                headers={"Retry-After": str(self.config.RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    def _limiter(self, route: str) -> RouteLimiter:
+        limiter: Optional[RouteLimiter] = self.limiters.get(route)
+        if limiter is None:
+            limiter = self.limiters[route] = RouteLimiter(route=route, budget=self.config.budget(route))
+
+        return limiter
@@ -0,0 +1,107 @@
+from asyncio import to_thread
+from dataclasses import dataclass
+from gzip import compress as gzip_compress
+from importlib import import_module
+from os import getenv
+from time import perf_counter
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+from src.metrics import METRICS
+
+Encoders = Dict[str, Callable[[bytes], bytes]]
+
+METRICS.describe("response_compression_bytes_total", "counter", "Байты до/после сжатия (encoding, stage: in, out)")
+METRICS.describe("response_compression_seconds_total", "counter", "Процессорное время сжатия ответов (encoding)")
+
+
+def optional_module(name: str) -> Optional[ModuleType]:
+    """brotli и zstandard - необязательные зависимости: без них остается только gzip"""
+    try:
+        return import_module(name)
+    except ImportError:
+        return None
+
+
+brotli: Optional[ModuleType] = optional_module("brotli")
+zstandard: Optional[ModuleType] = optional_module("zstandard")
+
+
+@dataclass(frozen=True)
+class CompressionConfig:
+    # Меньшие тела не сжимаем - выигрыш в байтах не окупает заголовки и CPU
+    MIN_SIZE: int = int(getenv("COMPRESSION_MIN_SIZE", default=1024))
+    # Тела от этого размера сжимаются в пуле потоков, чтобы не блокировать event loop
+    OFFLOAD_SIZE: int = int(getenv("COMPRESSION_OFFLOAD_SIZE", default=64 * 1024))
+    GZIP_LEVEL: int = int(getenv("COMPRESSION_GZIP_LEVEL", default=6))
+    BROTLI_QUALITY: int = int(getenv("COMPRESSION_BROTLI_QUALITY", default=5))
+    ZSTD_LEVEL: int = int(getenv("COMPRESSION_ZSTD_LEVEL", default=3))
+
+
+COMPRESSION: CompressionConfig = CompressionConfig()
+
+
+def build_encoders(config: CompressionConfig = COMPRESSION) -> Encoders:
+    """Кодировщики в порядке предпочтения сервера при равных q из Accept-Encoding"""
+    encoders: Encoders = {}
+    if zstandard is not None:
+        zstd_module: ModuleType = zstandard
+        # ZstdCompressor не потокобезопасен - создаем на каждый вызов
+        encoders["zstd"] = lambda body: zstd_module.ZstdCompressor(level=config.ZSTD_LEVEL).compress(body)
+    if brotli is not None:
+        brotli_module: ModuleType = brotli
+        encoders["br"] = lambda body: brotli_module.compress(body, quality=config.BROTLI_QUALITY)
+    encoders["gzip"] = lambda body: gzip_compress(body, compresslevel=config.GZIP_LEVEL, mtime=0)
+
+    return encoders
+
+
+ENCODERS: Encoders = build_encoders()
+
+
+def negotiate(accept_encoding: Optional[str], encoders: Encoders = ENCODERS) -> Optional[str]:
+    """Кодировка с наибольшим q из поддерживаемых; None - отдаем как есть"""
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        weight: float = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.lower()] = weight
+
+    wildcard: float = weights.get("*", 0.0)
+    best: Optional[str] = None
+    best_weight: float = 0.0
+    for coding in encoders:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+
+    return best
+
+
+def encode(body: bytes, encoding: str, encoders: Encoders = ENCODERS) -> bytes:
+    started: float = perf_counter()
+    encoded: bytes = encoders[encoding](body)
+
+    METRICS.inc("response_compression_seconds_total", perf_counter() - started, encoding=encoding)
+    METRICS.inc("response_compression_bytes_total", len(body), encoding=encoding, stage="in")
+    METRICS.inc("response_compression_bytes_total", len(encoded), encoding=encoding, stage="out")
+    return encoded
+
+
+async def compress(body: bytes, encoding: str, config: CompressionConfig = COMPRESSION) -> bytes:
+    if len(body) >= config.OFFLOAD_SIZE:
+        # zlib, brotli и zstd отпускают GIL на время сжатия - поток не мешает обработке других запросов
+        return await to_thread(encode, body, encoding)
+
+    return encode(body, encoding)
@@ -0,0 +1,135 @@
+from asyncio import CancelledError, Queue, QueueFull, Task, create_task, timeout
+from contextvars import Token
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Dict, FrozenSet, Optional
+
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from postgres.config import REQUEST_STATEMENT_TIMEOUT, parse_timeouts
+from src.admission import route_path
+from src.metrics import METRICS
+
+METRICS.describe("requests_cancelled_total", "counter", "Запросы, прерванные до завершения (route, reason)")
+
+# Бюджет запроса в секундах: столько же получает statement_timeout его запросов к БД
+DEFAULT_ROUTE_DEADLINES: Dict[str, float] = {
+    "/pvz-info": 5.0,
+    "/products/search": 15.0,
+}
+
+
+@dataclass(frozen=True)
+class DeadlineConfig:
+    ROUTE_DEADLINES: Dict[str, float] = field(
+        default_factory=lambda: {**DEFAULT_ROUTE_DEADLINES, **parse_timeouts(getenv("REQUEST_DEADLINES", default=""))}
+    )
+    # Прерываются только чтения: оборванная запись откатилась бы, но клиент так и не узнал бы об этом
+    CANCEL_ON_DISCONNECT: bool = getenv("CANCEL_ON_DISCONNECT", default="true").lower() == "true"
+    CANCEL_METHODS: FrozenSet[str] = frozenset({"GET", "HEAD"})
+
+
+class RequestDeadlineMiddleware:
+    """
+        Выставляет бюджет маршрута как statement_timeout (защита на стороне БД) и как дедлайн задачи запроса;
+        при отключении клиента задача отменяется. Отмена посреди запроса к БД отправляет Postgres cancel -
+        это делает сам psycopg, когда ожидание результата прерывается CancelledError
+    """
+
+    def __init__(self, app: ASGIApp, config: DeadlineConfig = DeadlineConfig()) -> None:
+        self.app: ASGIApp = app
+        self.config: DeadlineConfig = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route: Optional[str] = route_path(scope) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline: Optional[float] = self.config.ROUTE_DEADLINES.get(route)
+        cancellable: bool = self.config.CANCEL_ON_DISCONNECT and scope["method"] in self.config.CANCEL_METHODS
+        if deadline is None and not cancellable:
+            await self.app(scope, receive, send)
+            return
+
+        response_started: bool = False
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        statement_timeout: Token = REQUEST_STATEMENT_TIMEOUT.set(deadline)
+        try:
+            if cancellable:
+                await self._run_cancellable(scope, receive, tracked_send, route, deadline)
+            else:
+                await self._run(scope, receive, tracked_send, deadline)
+        except TimeoutError:
+            METRICS.inc("requests_cancelled_total", route=route, reason="deadline")
+            if not response_started:
+                response: JSONResponse = JSONResponse(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    content={"errors": "Запрос выполнялся слишком долго, сузьте диапазон или повторите позже"}
+                )
+                await response(scope, receive, send)
+        finally:
+            REQUEST_STATEMENT_TIMEOUT.reset(statement_timeout)
+
+    async def _run(self, scope: Scope, receive: Receive, send: Send, deadline: Optional[float]) -> None:
+        async with timeout(deadline):
+            await self.app(scope, receive, send)
+
+    async def _run_cancellable(
+            self,
+            scope: Scope,
+            receive: Receive,
+            send: Send,
+            route: str,
+            deadline: Optional[float]
+    ) -> None:
+        """
+            Сообщения клиента читает отдельная задача и передает приложению через очередь на одно сообщение:
+            тело не буферизуется целиком, а http.disconnect замечается, даже если приложение receive не вызывает
+        """
+        messages: "Queue[Message]" = Queue(maxsize=1)
+        response_complete: bool = False
+        disconnected: bool = False
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_complete
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+
+        app_task: Task = create_task(self._run(scope, messages.get, tracked_send, deadline))
+
+        async def pump() -> None:
+            nonlocal disconnected
+            while True:
+                message: Message = await receive()
+                if message["type"] == "http.disconnect":
+                    # После отправленного ответа disconnect штатный - фоновые задачи ответа не прерываем
+                    if response_complete:
+                        return
+                    disconnected = True
+                    app_task.cancel()
+                    try:
+                        messages.put_nowait(message)
+                    except QueueFull:
+                        pass
+                    return
+                await messages.put(message)
+
+        pump_task: Task = create_task(pump())
+        try:
+            await app_task
+        except CancelledError:
+            if not disconnected:
+                raise
+            METRICS.inc("requests_cancelled_total", route=route, reason="disconnect")
+        finally:
+            pump_task.cancel()
+            app_task.cancel()
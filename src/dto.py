@@ -1,13 +1,29 @@
 from dataclasses import dataclass
+from datetime import datetime, UTC
+from email.utils import format_datetime
 from typing import Dict, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseResponse:
     result: Optional[Dict[str, bool]] = None
     errors: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class JWTTokenResponse:
     access_token: str
+
+
+@dataclass(slots=True, frozen=True)
+class CacheValidators:
+    etag: str
+    last_modified: Optional[datetime] = None
+    not_modified: bool = False
+
+    def headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.astimezone(UTC), usegmt=True)
+
+        return headers
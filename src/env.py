@@ -0,0 +1,38 @@
+from functools import cache
+from os.path import abspath, dirname, isfile, join
+from typing import Dict, Tuple
+
+# Локальные env-файлы проекта: в контейнере их нет, переменные приходят из окружения
+ENV_FILES: Tuple[str, ...] = (".env.jwt.local", ".env.postgres.local")
+
+
+def find_env_files(start: str, filenames: Tuple[str, ...] = ENV_FILES) -> Tuple[str, ...]:
+    """Один проход вверх по каталогам для всех файлов; для каждого берется ближайший, как у find_dotenv"""
+    found: Dict[str, str] = {}
+    directory: str = start
+    while True:
+        for filename in filenames:
+            path: str = join(directory, filename)
+            if filename not in found and isfile(path):
+                found[filename] = path
+        parent: str = dirname(directory)
+        if parent == directory or len(found) == len(filenames):
+            break
+        directory = parent
+
+    return tuple(found[filename] for filename in filenames if filename in found)
+
+
+@cache
+def load_env() -> Tuple[str, ...]:
+    """
+        Вызывается модулями с конфигурацией до объявления их dataclass: файлы ищутся и читаются один раз
+        на процесс. Уже заданные переменные окружения не перетираются; без файлов python-dotenv не импортируется
+    """
+    paths: Tuple[str, ...] = find_env_files(dirname(dirname(abspath(__file__))))
+    if paths:
+        from dotenv import load_dotenv
+        for path in paths:
+            load_dotenv(path)
+
+    return paths
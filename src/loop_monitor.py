@@ -0,0 +1,110 @@
+from asyncio import AbstractEventLoop, CancelledError, Task, get_running_loop, sleep
+from dataclasses import dataclass
+from logging import Logger, getLogger
+from os import getenv
+from sys import _current_frames
+from threading import Event, Thread, get_ident
+from time import monotonic
+from traceback import format_stack
+from typing import Optional
+
+from src.metrics import METRICS
+
+logger: Logger = getLogger(__name__)
+
+METRICS.describe("event_loop_lag_seconds", "gauge", "Задержка последнего тика монитора event loop")
+METRICS.describe("event_loop_lag_seconds_max", "gauge", "Максимальная задержка event loop с запуска процесса")
+METRICS.describe("event_loop_lag_seconds_total", "counter", "Суммарная задержка event loop")
+METRICS.describe("event_loop_lag_samples_total", "counter", "Число измерений задержки event loop")
+METRICS.describe("event_loop_blocked_total", "counter", "Тики, в которых event loop был заблокирован дольше порога")
+
+
+@dataclass(frozen=True)
+class LoopMonitorConfig:
+    ENABLED: bool = getenv("LOOP_MONITOR_ENABLED", default="true").lower() == "true"
+    INTERVAL: float = float(getenv("LOOP_MONITOR_INTERVAL", default=0.1))
+    BLOCK_THRESHOLD: float = float(getenv("LOOP_MONITOR_BLOCK_THRESHOLD", default=0.1))
+    # Отладочный режим: сторожевой поток снимает стек потока event loop, пока тот заблокирован
+    DEBUG: bool = getenv("LOOP_MONITOR_DEBUG", default="false").lower() == "true"
+
+
+class LoopLagMonitor:
+    """
+        Корутина просыпается каждые INTERVAL секунд; опоздание пробуждения - задержка event loop
+        (все, что выполнялось синхронно: bcrypt, подписи JWT, тяжелая сериализация)
+    """
+
+    def __init__(self, config: LoopMonitorConfig = LoopMonitorConfig()) -> None:
+        self.config: LoopMonitorConfig = config
+        self.max_lag: float = 0.0
+        self._task: Optional[Task] = None
+        self._watchdog: Optional[Thread] = None
+        self._stopped: Event = Event()
+        self._loop_thread: Optional[int] = None
+        self._last_tick: float = monotonic()
+
+    def start(self) -> None:
+        if not self.config.ENABLED or self._task is not None:
+            return
+
+        loop: AbstractEventLoop = get_running_loop()
+        self._loop_thread = get_ident()
+        self._last_tick = monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._run(), name="loop-lag-monitor")
+
+        if self.config.DEBUG:
+            self._watchdog = Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def record(self, lag: float) -> None:
+        lag = max(lag, 0.0)
+        self.max_lag = max(self.max_lag, lag)
+        METRICS.set("event_loop_lag_seconds", lag)
+        METRICS.set("event_loop_lag_seconds_max", self.max_lag)
+        METRICS.inc("event_loop_lag_seconds_total", lag)
+        METRICS.inc("event_loop_lag_samples_total")
+        if lag >= self.config.BLOCK_THRESHOLD:
+            METRICS.inc("event_loop_blocked_total")
+
+    async def _run(self) -> None:
+        while True:
+            started: float = monotonic()
+            await sleep(self.config.INTERVAL)
+            self._last_tick = monotonic()
+            self.record(self._last_tick - started - self.config.INTERVAL)
+
+    def _watch(self) -> None:
+        """Если тик опаздывает больше порога - loop занят синхронным кодом, логируем его текущий стек"""
+        reported_tick: Optional[float] = None
+        deadline: float = self.config.INTERVAL + self.config.BLOCK_THRESHOLD
+
+        while not self._stopped.wait(self.config.BLOCK_THRESHOLD / 2):
+            last_tick: float = self._last_tick
+            blocked_for: float = monotonic() - last_tick
+            if blocked_for < deadline or reported_tick == last_tick:
+                continue
+
+            reported_tick = last_tick
+            frame = _current_frames().get(self._loop_thread)  # type: ignore[arg-type]
+            if frame is not None:
+                logger.warning(
+                    "Event loop заблокирован %.3f с, стек:\n%s", blocked_for - self.config.INTERVAL,
+                    "".join(format_stack(frame))
+                )
+
+
+LOOP_MONITOR: LoopLagMonitor = LoopLagMonitor()
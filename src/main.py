@@ -1,13 +1,45 @@
+from contextlib import asynccontextmanager
 from sys import path as sys_path
 from os import getcwd
-from uvicorn import run as uvicorn_run
+from typing import AsyncIterator
 from fastapi import FastAPI
 
 # Adding ./src to python path for running from console purpose:
 sys_path.append(getcwd())
 
+from postgres.config import SHARDS
+from postgres.events import PVZ_EVENTS
+from src.admission import AdmissionControlMiddleware
+from src.deadlines import RequestDeadlineMiddleware
+from src.loop_monitor import LOOP_MONITOR
+from src.metrics import metrics_router
+from src.profiling import PROFILING, ProfilingMiddleware
+from src.rpc.config import GRPCConfig
+from src.sessions import SESSION_SWEEPER
+from src.stale_receptions import STALE_RECEPTIONS
 from src.sso.routes import sso_router
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    await SHARDS.open()
+    LOOP_MONITOR.start()
+    if GRPCConfig.ENABLED:
+        # grpc и protobuf загружаются только для включенного сервера, а не при импорте приложения
+        from src.rpc.server import GRPC_SERVER
+        await GRPC_SERVER.start()
+    STALE_RECEPTIONS.start()
+    SESSION_SWEEPER.start()
+    yield
+    await SESSION_SWEEPER.stop()
+    await STALE_RECEPTIONS.stop()
+    if GRPCConfig.ENABLED:
+        await GRPC_SERVER.stop()
+    await PVZ_EVENTS.close()
+    await LOOP_MONITOR.stop()
+    await SHARDS.close()
+
+
 app = FastAPI(
     title="[AVITO] - Trainee-spring-2025 - ",
     description=
@@ -21,15 +53,25 @@ app = FastAPI(
     swagger_ui_parameters={
         "defaultModelsExpandDepth": -1,
         "operationsSorter": "alpha"
-    }
+    },
+    lifespan=lifespan
 )
 
+# Дедлайн считается от допуска к выполнению: время в очереди admission control в бюджет не входит
+app.add_middleware(RequestDeadlineMiddleware)
+# Без PROFILING_TOKEN middleware не подключается - накладных расходов на обычные запросы нет
+if PROFILING.enabled:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+
 app.include_router(router=sso_router)
+app.include_router(router=metrics_router)
 
 if __name__ == "__main__":
     # Разкомментить, если миграция не прошла (Инициализация таблиц):
     from asyncio import run as asyncio_run
-    from postgres.sql.init_tables import Tables
-    asyncio_run(Tables.init())
+    from uvicorn import run as uvicorn_run
+    from postgres.sql.migrations import migrate
+    asyncio_run(migrate())
 
     uvicorn_run(app, host="0.0.0.0", port=8090)
@@ -0,0 +1,80 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from hmac import compare_digest
+from os import getenv
+from typing import Annotated, DefaultDict, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Header
+from starlette import status
+from starlette.responses import PlainTextResponse
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    # Пустой токен - /metrics выключен: трафик по маршрутам и состояние пулов не отдаются без авторизации
+    TOKEN: str = getenv("METRICS_TOKEN", default="")
+
+
+METRICS_CONFIG: MetricsConfig = MetricsConfig()
+
+
+@dataclass
+class MetricsRegistry:
+    """In-process метрики в текстовом формате Prometheus (без внешних зависимостей)"""
+
+    _kinds: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    _values: DefaultDict[str, Dict[Labels, float]] = field(default_factory=lambda: defaultdict(dict))
+
+    def describe(self, name: str, kind: str, description: str) -> None:
+        self._kinds[name] = (kind, description)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key: Labels = tuple(sorted(labels.items()))
+        self._values[name][key] = self._values[name].get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        self._values[name][tuple(sorted(labels.items()))] = value
+
+    def get(self, name: str, **labels: str) -> float:
+        return self._values[name].get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, description) in self._kinds.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in self._values.get(name, {}).items():
+                rendered_labels: str = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{rendered_labels}}} {value}" if labels else f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS: MetricsRegistry = MetricsRegistry()
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get(
+    path="/metrics",
+    response_class=PlainTextResponse,
+    name="Метрики сервиса (Prometheus)",
+    tags=["Различные проверки"]
+)
+async def metrics(
+        authorization: Annotated[Optional[str], Header(include_in_schema=False)] = None
+) -> PlainTextResponse:
+    """Prometheus передает токен как bearer_token: Authorization: Bearer <METRICS_TOKEN>"""
+    if not METRICS_CONFIG.TOKEN:
+        return PlainTextResponse(content="Not Found", status_code=status.HTTP_404_NOT_FOUND)
+    expected: str = f"Bearer {METRICS_CONFIG.TOKEN}"
+    if authorization is None or not compare_digest(authorization.encode("utf-8"), expected.encode("utf-8")):
+        return PlainTextResponse(
+            content="Unauthorized",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    return PlainTextResponse(content=METRICS.render(), media_type="text/plain; version=0.0.4")
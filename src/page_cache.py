@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Dict, Optional
+
+from starlette import status
+from starlette.responses import Response
+
+from src.compression import COMPRESSION, CompressionConfig, compress, negotiate
+from src.metrics import METRICS
+
+METRICS.describe("page_cache_total", "counter", "Обращения к кэшу страниц (cache, result: hit, miss, evict)")
+METRICS.describe("page_cache_bytes", "gauge", "Тела страниц и их сжатые варианты в кэше, байт (cache)")
+
+
+@dataclass(frozen=True)
+class PageCacheConfig:
+    MAX_ENTRIES: int = int(getenv("PAGE_CACHE_MAX_ENTRIES", default=256))
+    MAX_BYTES: int = int(getenv("PAGE_CACHE_MAX_BYTES", default=32 * 1024 * 1024))
+
+
+@dataclass(slots=True)
+class CachedPage:
+    """Сериализованная страница для версии данных и ее сжатые варианты (заполняются по мере запросов)"""
+
+    key: str
+    version: int
+    body: bytes
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(variant) for variant in self.encoded.values())
+
+
+@dataclass
+class PageCache:
+    """LRU страниц в памяти процесса: ключ - отпечаток параметров запроса, актуальность - по версии данных"""
+
+    name: str
+    max_entries: int
+    max_bytes: int
+    compression: CompressionConfig = COMPRESSION
+    _pages: "OrderedDict[str, CachedPage]" = field(default_factory=OrderedDict, repr=False)
+    _bytes: int = field(default=0, repr=False)
+
+    @classmethod
+    def from_config(cls, name: str, config: PageCacheConfig = PageCacheConfig()) -> "PageCache":
+        return cls(name=name, max_entries=config.MAX_ENTRIES, max_bytes=config.MAX_BYTES)
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        page: Optional[CachedPage] = self._pages.get(key)
+        if page is None:
+            METRICS.inc("page_cache_total", cache=self.name, result="miss")
+            return None
+
+        self._pages.move_to_end(key)
+        METRICS.inc("page_cache_total", cache=self.name, result="hit")
+        return page
+
+    def put(self, key: str, version: int, body: bytes) -> CachedPage:
+        """Страница отставшей реплики не заменяет более новую - возвращается закэшированная"""
+        page: CachedPage = CachedPage(key=key, version=version, body=body)
+        if self.max_entries <= 0:
+            return page
+
+        previous: Optional[CachedPage] = self._pages.get(key)
+        if previous is not None and previous.version > version:
+            self._pages.move_to_end(key)
+            return previous
+        if previous is not None:
+            del self._pages[key]
+            self._bytes -= previous.size
+        self._pages[key] = page
+        self._bytes += page.size
+        self._evict()
+
+        return page
+
+    async def encoded(self, page: CachedPage, encoding: str) -> bytes:
+        """Сжатый вариант страницы: считается один раз и дальше отдается из кэша"""
+        variant: Optional[bytes] = page.encoded.get(encoding)
+        if variant is not None:
+            return variant
+
+        variant = await compress(page.body, encoding, self.compression)
+        if encoding not in page.encoded:
+            page.encoded[encoding] = variant
+            if self._pages.get(page.key) is page:
+                self._bytes += len(variant)
+                self._evict()
+
+        return page.encoded[encoding]
+
+    async def response(
+            self,
+            page: CachedPage,
+            accept_encoding: Optional[str],
+            headers: Dict[str, str],
+            status_code: int = status.HTTP_200_OK
+    ) -> Response:
+        response_headers: Dict[str, str] = {**headers, "Vary": "Accept-Encoding"}
+        encoding: Optional[str] = None
+        if len(page.body) >= self.compression.MIN_SIZE:
+            encoding = negotiate(accept_encoding)
+
+        body: bytes = page.body
+        if encoding is not None:
+            body = await self.encoded(page, encoding)
+            response_headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=body,
+            status_code=status_code,
+            headers=response_headers,
+            media_type="application/json"
+        )
+
+    def _evict(self) -> None:
+        while self._pages and (len(self._pages) > self.max_entries or self._bytes > self.max_bytes):
+            _, page = self._pages.popitem(last=False)
+            self._bytes -= page.size
+            METRICS.inc("page_cache_total", cache=self.name, result="evict")
+
+        METRICS.set("page_cache_bytes", self._bytes, cache=self.name)
+
+
+PVZ_INFO_PAGES: PageCache = PageCache.from_config("pvz_info")
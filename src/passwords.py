@@ -0,0 +1,33 @@
+from asyncio import to_thread
+from dataclasses import dataclass
+from os import getenv
+
+from bcrypt import checkpw, gensalt, hashpw
+
+
+@dataclass(frozen=True)
+class PasswordConfig:
+    # Стоимость bcrypt (2^ROUNDS итераций); хеши с другой стоимостью пересчитываются при следующем входе
+    BCRYPT_ROUNDS: int = int(getenv("BCRYPT_ROUNDS", default=12))
+
+
+def hash_password(password: str, rounds: int = PasswordConfig.BCRYPT_ROUNDS) -> str:
+    return hashpw(password.encode("utf-8"), gensalt(rounds=rounds)).decode("utf-8")
+
+
+def hash_rounds(hashed: str) -> int:
+    """$2b$12$<соль и хеш> -> 12"""
+    return int(hashed.split("$")[2])
+
+
+def needs_rehash(hashed: str, rounds: int = PasswordConfig.BCRYPT_ROUNDS) -> bool:
+    return hash_rounds(hashed) != rounds
+
+
+async def check_password(password: str, hashed: str) -> bool:
+    """bcrypt занимает сотни миллисекунд CPU и отпускает GIL - считаем в потоке, не блокируя event loop"""
+    return await to_thread(checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def rehash_password(password: str, rounds: int = PasswordConfig.BCRYPT_ROUNDS) -> str:
+    return await to_thread(hash_password, password, rounds)
@@ -0,0 +1,151 @@
+from cProfile import Profile
+from dataclasses import dataclass
+from datetime import datetime
+from hmac import compare_digest
+from io import StringIO
+from os import getenv
+from pathlib import Path
+from pstats import SortKey, Stats
+from time import perf_counter
+from types import coroutine
+from typing import Any, Coroutine, Generator, List, Optional, TypeVar
+from uuid import uuid4
+
+from starlette import status
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import METRICS
+
+METRICS.describe("profiled_requests_total", "counter", "Запросы, выполненные под cProfile (output: report, store)")
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    # Пустой токен - профилирование выключено, middleware не подключается вовсе
+    TOKEN: str = getenv("PROFILING_TOKEN", default="")
+    OUTPUT_DIR: str = getenv("PROFILING_OUTPUT_DIR", default="")
+    TOP: int = int(getenv("PROFILING_TOP", default=40))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.TOKEN)
+
+
+PROFILING: ProfilingConfig = ProfilingConfig()
+
+
+@coroutine
+def profiled(awaitable: Coroutine[Any, Any, T], profiler: Profile) -> Generator[Any, Any, T]:
+    """
+        Выполняет корутину по шагам и включает профилировщик только на время шага - синхронного кода между
+        await. Пока корутина ждет, event loop выполняет другие запросы: они не попадают в профиль и не
+        замедляются им. Задачи, порожденные обработчиком (create_task, gather), тоже не профилируются
+    """
+    value: Any = None
+    error: Optional[BaseException] = None
+    while True:
+        profiler.enable()
+        try:
+            yielded: Any = awaitable.throw(error) if error is not None else awaitable.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            profiler.disable()
+
+        value, error = None, None
+        try:
+            value = yield yielded
+        except GeneratorExit:
+            awaitable.close()
+            raise
+        except BaseException as thrown:
+            # Отмена и исключения, брошенные в задачу, доставляются корутине на следующем шаге
+            error = thrown
+
+
+class ProfilingMiddleware:
+    """
+        Профилирует запрос под cProfile, если передан токен администратора (заголовок X-Profile-Token или
+        параметр profile_token). output=report (по умолчанию) - вместо тела ответа отдается отчет pstats,
+        output=store - ответ не меняется, .prof сохраняется в PROFILING_OUTPUT_DIR (snakeviz, flameprof)
+    """
+
+    def __init__(self, app: ASGIApp, config: ProfilingConfig = PROFILING) -> None:
+        self.app: ASGIApp = app
+        self.config: ProfilingConfig = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers: Headers = Headers(scope=scope)
+        query: QueryParams = QueryParams(scope["query_string"])
+        token: Optional[str] = headers.get("x-profile-token") or query.get("profile_token")
+        if token is None or not compare_digest(token.encode("utf-8"), self.config.TOKEN.encode("utf-8")):
+            await self.app(scope, receive, send)
+            return
+
+        output: str = headers.get("x-profile-output") or query.get("profile_output") or "report"
+        if output not in ("report", "store") or (output == "store" and not self.config.OUTPUT_DIR):
+            response: JSONResponse = JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"errors": "Некорректный режим профилирования: report или store (нужен PROFILING_OUTPUT_DIR)"}
+            )
+            await response(scope, receive, send)
+            return
+
+        messages: List[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        profiler: Profile = Profile()
+        started: float = perf_counter()
+        await profiled(self.app(scope, receive, capture), profiler)  # type: ignore[arg-type]
+        wall_ms: float = (perf_counter() - started) * 1000
+
+        METRICS.inc("profiled_requests_total", output=output)
+        if output == "store":
+            await self._send_stored(profiler, scope, messages, wall_ms, send)
+            return
+
+        report: PlainTextResponse = PlainTextResponse(
+            content=self._report(profiler, scope, wall_ms),
+            headers={
+                "X-Profile-Wall-Ms": f"{wall_ms:.2f}",
+                "X-Profiled-Status": str(messages[0]["status"]) if messages else "",
+            }
+        )
+        await report(scope, receive, send)
+
+    def _report(self, profiler: Profile, scope: Scope, wall_ms: float) -> str:
+        stream: StringIO = StringIO()
+        stream.write(f"{scope['method']} {scope['path']} wall={wall_ms:.2f} ms\n")
+        # Профилируются только шаги запроса: разница между wall и суммой времени - ожидание БД, сети и других задач
+        Stats(profiler, stream=stream).strip_dirs().sort_stats(SortKey.CUMULATIVE).print_stats(self.config.TOP)
+        return stream.getvalue()
+
+    async def _send_stored(
+            self,
+            profiler: Profile,
+            scope: Scope,
+            messages: List[Message],
+            wall_ms: float,
+            send: Send
+    ) -> None:
+        route: str = scope["path"].strip("/").replace("/", "_") or "root"
+        path: Path = Path(self.config.OUTPUT_DIR) / f"{datetime.now():%Y%m%dT%H%M%S}-{route}-{uuid4().hex[:8]}.prof"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+
+        for message in messages:
+            if message["type"] == "http.response.start":
+                response_headers: MutableHeaders = MutableHeaders(scope=message)
+                response_headers["X-Profile-File"] = path.name
+                response_headers["X-Profile-Wall-Ms"] = f"{wall_ms:.2f}"
+            await send(message)
@@ -0,0 +1,40 @@
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+from functools import cache
+from json import dumps
+from typing import Any, Dict, Tuple
+
+from starlette.responses import JSONResponse
+
+
+@cache
+def field_names(cls: type) -> Tuple[str, ...]:
+    """Поля с metadata={"serialize": False} (например, заголовки кэширования) в тело ответа не попадают"""
+    return tuple(field.name for field in fields(cls) if field.metadata.get("serialize", True))
+
+
+def encode_record(value: Any) -> Any:
+    """default-хук json.dumps: slots-DTO и строки БД сериализуются без промежуточных копий в __dict__"""
+    if is_dataclass(value) and not isinstance(value, type):
+        record: Dict[str, Any] = {name: getattr(value, name) for name in field_names(type(value))}
+        return record
+    if isinstance(value, datetime):
+        return str(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_record(content: Any) -> bytes:
+    return dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=encode_record,
+    ).encode("utf-8")
+
+
+class RecordJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return render_record(content)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from os import getenv
+
+
+@dataclass(frozen=True)
+class GRPCConfig:
+    """Отдельно от сервера: main решает, запускать ли gRPC, не загружая grpc и protobuf"""
+    # Порт без TLS и без admission control - включается явно, а не появляется при обновлении
+    ENABLED: bool = getenv("GRPC_ENABLED", default="false").lower() == "true"
+    HOST: str = getenv("GRPC_HOST", default="[::]")
+    PORT: int = int(getenv("GRPC_PORT", default=50051))
+    MAX_CONCURRENT_RPCS: int = int(getenv("GRPC_MAX_CONCURRENT_RPCS", default=32))
+    MAX_STREAM_BATCH: int = int(getenv("GRPC_MAX_STREAM_BATCH", default=500))
+    SHUTDOWN_GRACE: float = float(getenv("GRPC_SHUTDOWN_GRACE", default=5))
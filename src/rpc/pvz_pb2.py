@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: src/rpc/pvz.proto
+# Protobuf Python Version: 7.35.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    7,
+    35,
+    1,
+    '',
+    'src/rpc/pvz.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11src/rpc/pvz.proto\x12\x06pvz.v1\x1a\x1fgoogle/protobuf/timestamp.proto\"j\n\x07Product\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x14\n\x0c\x61\x63\x63\x65pting_id\x18\x02 \x01(\x03\x12/\n\x0b\x61\x63\x63\x65pted_at\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0c\n\x04type\x18\x04 \x01(\t\"\x9f\x01\n\tReception\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x0e\n\x06pvz_id\x18\x02 \x01(\x03\x12.\n\ncreated_at\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x13\n\x0bproduct_ids\x18\x05 \x03(\x03\x12!\n\x08products\x18\x06 \x03(\x0b\x32\x0f.pvz.v1.Product\"y\n\x03PVZ\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x0c\n\x04\x63ity\x18\x02 \x01(\t\x12\x31\n\rregistered_at\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12%\n\nreceptions\x18\x04 \x03(\x0b\x32\x11.pvz.v1.Reception\"\x8f\x01\n\x0eListPVZRequest\x12.\n\nstart_date\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_date\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0c\n\x04page\x18\x03 \x01(\x05\x12\x11\n\tpage_size\x18\x04 \x01(\x05\"q\n\x0fListPVZResponse\x12\x1d\n\x08pvz_list\x18\x01 \x03(\x0b\x32\x0b.pvz.v1.PVZ\x12\r\n\x05total\x18\x02 \x01(\x03\x12\x0c\n\x04page\x18\x03 \x01(\x05\x12\x11\n\tpage_size\x18\x04 \x01(\x05\x12\x0f\n\x07version\x18\x05 \x01(\x03\"\x84\x01\n\x10StreamPVZRequest\x12.\n\nstart_date\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_date\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x12\n\nbatch_size\x18\x03 \x01(\x05\x32~\n\nPVZService\x12:\n\x07ListPVZ\x12\x16.pvz.v1.ListPVZRequest\x1a\x17.pvz.v1.ListPVZResponse\x12\x34\n\tStreamPVZ\x12\x18.pvz.v1.StreamPVZRequest\x1a\x0b.pvz.v1.PVZ0\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'src.rpc.pvz_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_PRODUCT']._serialized_start=62
+  _globals['_PRODUCT']._serialized_end=168
+  _globals['_RECEPTION']._serialized_start=171
+  _globals['_RECEPTION']._serialized_end=330
+  _globals['_PVZ']._serialized_start=332
+  _globals['_PVZ']._serialized_end=453
+  _globals['_LISTPVZREQUEST']._serialized_start=456
+  _globals['_LISTPVZREQUEST']._serialized_end=599
+  _globals['_LISTPVZRESPONSE']._serialized_start=601
+  _globals['_LISTPVZRESPONSE']._serialized_end=714
+  _globals['_STREAMPVZREQUEST']._serialized_start=717
+  _globals['_STREAMPVZREQUEST']._serialized_end=849
+  _globals['_PVZSERVICE']._serialized_start=851
+  _globals['_PVZSERVICE']._serialized_end=977
+# @@protoc_insertion_point(module_scope)
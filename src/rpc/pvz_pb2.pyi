@@ -0,0 +1,86 @@
+import datetime
+
+from google.protobuf import timestamp_pb2 as _timestamp_pb2
+from google.protobuf.internal import containers as _containers
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from collections.abc import Iterable as _Iterable, Mapping as _Mapping
+from typing import ClassVar as _ClassVar, Optional as _Optional, Union as _Union
+
+DESCRIPTOR: _descriptor.FileDescriptor
+
+class Product(_message.Message):
+    __slots__ = ("id", "accepting_id", "accepted_at", "type")
+    ID_FIELD_NUMBER: _ClassVar[int]
+    ACCEPTING_ID_FIELD_NUMBER: _ClassVar[int]
+    ACCEPTED_AT_FIELD_NUMBER: _ClassVar[int]
+    TYPE_FIELD_NUMBER: _ClassVar[int]
+    id: int
+    accepting_id: int
+    accepted_at: _timestamp_pb2.Timestamp
+    type: str
+    def __init__(self, id: _Optional[int] = ..., accepting_id: _Optional[int] = ..., accepted_at: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., type: _Optional[str] = ...) -> None: ...
+
+class Reception(_message.Message):
+    __slots__ = ("id", "pvz_id", "created_at", "status", "product_ids", "products")
+    ID_FIELD_NUMBER: _ClassVar[int]
+    PVZ_ID_FIELD_NUMBER: _ClassVar[int]
+    CREATED_AT_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    PRODUCT_IDS_FIELD_NUMBER: _ClassVar[int]
+    PRODUCTS_FIELD_NUMBER: _ClassVar[int]
+    id: int
+    pvz_id: int
+    created_at: _timestamp_pb2.Timestamp
+    status: str
+    product_ids: _containers.RepeatedScalarFieldContainer[int]
+    products: _containers.RepeatedCompositeFieldContainer[Product]
+    def __init__(self, id: _Optional[int] = ..., pvz_id: _Optional[int] = ..., created_at: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., status: _Optional[str] = ..., product_ids: _Optional[_Iterable[int]] = ..., products: _Optional[_Iterable[_Union[Product, _Mapping]]] = ...) -> None: ...
+
+class PVZ(_message.Message):
+    __slots__ = ("id", "city", "registered_at", "receptions")
+    ID_FIELD_NUMBER: _ClassVar[int]
+    CITY_FIELD_NUMBER: _ClassVar[int]
+    REGISTERED_AT_FIELD_NUMBER: _ClassVar[int]
+    RECEPTIONS_FIELD_NUMBER: _ClassVar[int]
+    id: int
+    city: str
+    registered_at: _timestamp_pb2.Timestamp
+    receptions: _containers.RepeatedCompositeFieldContainer[Reception]
+    def __init__(self, id: _Optional[int] = ..., city: _Optional[str] = ..., registered_at: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., receptions: _Optional[_Iterable[_Union[Reception, _Mapping]]] = ...) -> None: ...
+
+class ListPVZRequest(_message.Message):
+    __slots__ = ("start_date", "end_date", "page", "page_size")
+    START_DATE_FIELD_NUMBER: _ClassVar[int]
+    END_DATE_FIELD_NUMBER: _ClassVar[int]
+    PAGE_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    start_date: _timestamp_pb2.Timestamp
+    end_date: _timestamp_pb2.Timestamp
+    page: int
+    page_size: int
+    def __init__(self, start_date: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., end_date: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., page: _Optional[int] = ..., page_size: _Optional[int] = ...) -> None: ...
+
+class ListPVZResponse(_message.Message):
+    __slots__ = ("pvz_list", "total", "page", "page_size", "version")
+    PVZ_LIST_FIELD_NUMBER: _ClassVar[int]
+    TOTAL_FIELD_NUMBER: _ClassVar[int]
+    PAGE_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    VERSION_FIELD_NUMBER: _ClassVar[int]
+    pvz_list: _containers.RepeatedCompositeFieldContainer[PVZ]
+    total: int
+    page: int
+    page_size: int
+    version: int
+    def __init__(self, pvz_list: _Optional[_Iterable[_Union[PVZ, _Mapping]]] = ..., total: _Optional[int] = ..., page: _Optional[int] = ..., page_size: _Optional[int] = ..., version: _Optional[int] = ...) -> None: ...
+
+class StreamPVZRequest(_message.Message):
+    __slots__ = ("start_date", "end_date", "batch_size")
+    START_DATE_FIELD_NUMBER: _ClassVar[int]
+    END_DATE_FIELD_NUMBER: _ClassVar[int]
+    BATCH_SIZE_FIELD_NUMBER: _ClassVar[int]
+    start_date: _timestamp_pb2.Timestamp
+    end_date: _timestamp_pb2.Timestamp
+    batch_size: int
+    def __init__(self, start_date: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., end_date: _Optional[_Union[datetime.datetime, _timestamp_pb2.Timestamp, _Mapping]] = ..., batch_size: _Optional[int] = ...) -> None: ...
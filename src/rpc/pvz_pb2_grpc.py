@@ -0,0 +1,148 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+from src.rpc import pvz_pb2 as src_dot_rpc_dot_pvz__pb2
+
+GRPC_GENERATED_VERSION = '1.84.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + ' but the generated code in src/rpc/pvz_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class PVZServiceStub:
+    """Чтение списка ПВЗ для внутренних сервисов - те же данные, что GET /pvz-info, без JSON.
+    Авторизация - JWT из /login в метаданных: "authorization: Bearer <token>" (роль client или moderator).
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.ListPVZ = channel.unary_unary(
+                '/pvz.v1.PVZService/ListPVZ',
+                request_serializer=src_dot_rpc_dot_pvz__pb2.ListPVZRequest.SerializeToString,
+                response_deserializer=src_dot_rpc_dot_pvz__pb2.ListPVZResponse.FromString,
+                _registered_method=True)
+        self.StreamPVZ = channel.unary_stream(
+                '/pvz.v1.PVZService/StreamPVZ',
+                request_serializer=src_dot_rpc_dot_pvz__pb2.StreamPVZRequest.SerializeToString,
+                response_deserializer=src_dot_rpc_dot_pvz__pb2.PVZ.FromString,
+                _registered_method=True)
+
+
+class PVZServiceServicer:
+    """Чтение списка ПВЗ для внутренних сервисов - те же данные, что GET /pvz-info, без JSON.
+    Авторизация - JWT из /login в метаданных: "authorization: Bearer <token>" (роль client или moderator).
+    """
+
+    def ListPVZ(self, request, context):
+        """Одна страница, как в /pvz-info
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamPVZ(self, request, context):
+        """Все ПВЗ за период: сервер выбирает страницы по batch_size и отправляет ПВЗ по одному
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_PVZServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'ListPVZ': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListPVZ,
+                    request_deserializer=src_dot_rpc_dot_pvz__pb2.ListPVZRequest.FromString,
+                    response_serializer=src_dot_rpc_dot_pvz__pb2.ListPVZResponse.SerializeToString,
+            ),
+            'StreamPVZ': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamPVZ,
+                    request_deserializer=src_dot_rpc_dot_pvz__pb2.StreamPVZRequest.FromString,
+                    response_serializer=src_dot_rpc_dot_pvz__pb2.PVZ.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'pvz.v1.PVZService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('pvz.v1.PVZService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class PVZService:
+    """Чтение списка ПВЗ для внутренних сервисов - те же данные, что GET /pvz-info, без JSON.
+    Авторизация - JWT из /login в метаданных: "authorization: Bearer <token>" (роль client или moderator).
+    """
+
+    @staticmethod
+    def ListPVZ(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/pvz.v1.PVZService/ListPVZ',
+            src_dot_rpc_dot_pvz__pb2.ListPVZRequest.SerializeToString,
+            src_dot_rpc_dot_pvz__pb2.ListPVZResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamPVZ(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/pvz.v1.PVZService/StreamPVZ',
+            src_dot_rpc_dot_pvz__pb2.StreamPVZRequest.SerializeToString,
+            src_dot_rpc_dot_pvz__pb2.PVZ.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,165 @@
+from datetime import UTC, datetime
+from typing import Any, AsyncIterator, Dict, List, NoReturn, Optional, Tuple, Union
+
+from fastapi import Response
+from google.protobuf.timestamp_pb2 import Timestamp
+from grpc import StatusCode, aio
+
+from postgres.dto import PVZInfoRow, PVZInfoVersionRow
+from postgres.sql.mutation import GetPVZInfo
+from src.metrics import METRICS
+from src.rpc.config import GRPCConfig
+from src.rpc.pvz_pb2 import PVZ, ListPVZRequest, ListPVZResponse, Product, Reception, StreamPVZRequest
+from src.rpc.pvz_pb2_grpc import PVZServiceServicer, add_PVZServiceServicer_to_server
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dependencies import get_current_user
+from src.sso.dto import GetCurrentUserResponse
+
+METRICS.describe("grpc_requests_total", "counter", "Вызовы gRPC (method, code)")
+
+
+def timestamp(value: Union[str, datetime]) -> Timestamp:
+    """receptions приходят из json_agg - даты внутри них строки ISO"""
+    result: Timestamp = Timestamp()
+    result.FromDatetime(value if isinstance(value, datetime) else datetime.fromisoformat(value))
+    return result
+
+
+def pvz_message(row: PVZInfoRow) -> PVZ:
+    receptions: List[Reception] = []
+    for reception in row.receptions:
+        products: List[Dict[str, Any]] = reception["products"]
+        receptions.append(Reception(
+            id=reception["id"],
+            pvz_id=reception["pvz_id"],
+            created_at=timestamp(reception["datetime"]),
+            status=reception["status"],
+            product_ids=reception["product_ids"] or [],
+            products=[
+                Product(
+                    id=product["id"],
+                    accepting_id=product["accepting_id"],
+                    accepted_at=timestamp(product["datetime"]),
+                    type=product["type"]
+                )
+                for product in products
+            ]
+        ))
+
+    return PVZ(id=row.id, city=row.city, registered_at=timestamp(row.registered_at), receptions=receptions)
+
+
+class PVZServicer(PVZServiceServicer):
+    """Те же GetPVZInfo и пул соединений, что у /pvz-info; сервер работает в event loop приложения"""
+
+    def __init__(self, config: GRPCConfig = GRPCConfig()) -> None:
+        self.config: GRPCConfig = config
+
+    async def ListPVZ(self, request: ListPVZRequest, context: aio.ServicerContext) -> ListPVZResponse:
+        await self._authorize(context, "ListPVZ")
+        start_date, end_date = await self._period(request, context, "ListPVZ")
+        page: int = request.page or 1
+        page_size: int = request.page_size or 10
+        if page < 1 or not 1 <= page_size <= 100:
+            await self._abort(context, "ListPVZ", StatusCode.INVALID_ARGUMENT, "page >= 1, 1 <= page_size <= 100")
+
+        pvz_data: Optional[List[PVZInfoRow]]
+        total: int
+        version: PVZInfoVersionRow
+        pvz_data, total, version = await GetPVZInfo(
+            page=page,
+            page_size=page_size,
+            start_date=start_date,
+            end_date=end_date
+        ).get()
+
+        METRICS.inc("grpc_requests_total", method="ListPVZ", code=StatusCode.OK.name)
+        return ListPVZResponse(
+            pvz_list=[pvz_message(row) for row in pvz_data or []],
+            total=total,
+            page=page,
+            page_size=page_size,
+            version=version.version
+        )
+
+    async def StreamPVZ(self, request: StreamPVZRequest, context: aio.ServicerContext) -> AsyncIterator[PVZ]:
+        """
+            Страницы выбираются по мере отправки по ключу (id > последнего отправленного), без OFFSET и count:
+            в памяти одновременно не больше batch_size ПВЗ, а вставки во время потока не дают пропусков и повторов
+        """
+        await self._authorize(context, "StreamPVZ")
+        start_date, end_date = await self._period(request, context, "StreamPVZ")
+        batch_size: int = min(request.batch_size or 100, self.config.MAX_STREAM_BATCH)
+
+        last_id: int = 0
+        while True:
+            pvz_data: List[PVZInfoRow] = await GetPVZInfo(
+                page=1,
+                page_size=batch_size,
+                start_date=start_date,
+                end_date=end_date
+            ).after(last_id)
+            for row in pvz_data:
+                yield pvz_message(row)
+
+            if len(pvz_data) < batch_size:
+                break
+            last_id = pvz_data[-1].id
+
+        METRICS.inc("grpc_requests_total", method="StreamPVZ", code=StatusCode.OK.name)
+
+    async def _authorize(self, context: aio.ServicerContext, method: str) -> None:
+        """Та же проверка токена, что в HTTP-зависимости get_current_user"""
+        metadata: Dict[str, Any] = dict(context.invocation_metadata() or ())
+        token: str = str(metadata.get("authorization", "")).removeprefix("Bearer ").strip()
+
+        current_user: GetCurrentUserResponse = await get_current_user(response=Response(), token=token)
+        if current_user.errors or current_user.role is None:
+            await self._abort(
+                context, method, StatusCode.UNAUTHENTICATED, current_user.errors or "Токен доступа протух или не найден")
+        if current_user.role not in [VALID_USER_TYPES.get("client"), VALID_USER_TYPES.get("moderator")]:
+            await self._abort(
+                context, method, StatusCode.PERMISSION_DENIED,
+                "У вас недостаточно прав - необходимая роль: client или moderator"
+            )
+
+    async def _period(
+            self,
+            request: Union[ListPVZRequest, StreamPVZRequest],
+            context: aio.ServicerContext,
+            method: str
+    ) -> Tuple[datetime, datetime]:
+        if not request.HasField("start_date") or not request.HasField("end_date"):
+            await self._abort(context, method, StatusCode.INVALID_ARGUMENT, "Нужны start_date и end_date")
+
+        return request.start_date.ToDatetime(tzinfo=UTC), request.end_date.ToDatetime(tzinfo=UTC)
+
+    @staticmethod
+    async def _abort(context: aio.ServicerContext, method: str, code: StatusCode, details: str) -> NoReturn:
+        METRICS.inc("grpc_requests_total", method=method, code=code.name)
+        await context.abort(code, details)
+
+
+class GRPCServer:
+    def __init__(self, config: GRPCConfig = GRPCConfig()) -> None:
+        self.config: GRPCConfig = config
+        self.port: Optional[int] = None
+        self._server: Optional[aio.Server] = None
+
+    async def start(self) -> None:
+        if not self.config.ENABLED or self._server is not None:
+            return
+
+        server: aio.Server = aio.server(maximum_concurrent_rpcs=self.config.MAX_CONCURRENT_RPCS)
+        add_PVZServiceServicer_to_server(PVZServicer(self.config), server)
+        self.port = server.add_insecure_port(f"{self.config.HOST}:{self.config.PORT}")
+        await server.start()
+        self._server = server
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            await self._server.stop(grace=self.config.SHUTDOWN_GRACE)
+            self._server = None
+
+
+GRPC_SERVER: GRPCServer = GRPCServer()
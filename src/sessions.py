@@ -0,0 +1,55 @@
+from asyncio import CancelledError, Task, create_task, sleep
+from logging import Logger, getLogger
+from typing import Optional
+
+from postgres.sql.mutation import SweepExpiredSessions
+from src.metrics import METRICS
+from src.tokens import SessionsConfig
+
+logger: Logger = getLogger(__name__)
+
+METRICS.describe("sessions_swept_total", "counter", "Удаленные истекшие сессии")
+METRICS.describe("sessions_sweeps_total", "counter", "Запуски уборки истекших сессий (status)")
+
+
+class SessionSweeper:
+    """Истекшие сессии и так не проходят проверку (expires_at > NOW()) - уборщик только не дает таблице расти"""
+
+    def __init__(self, config: SessionsConfig = SessionsConfig()) -> None:
+        self.config: SessionsConfig = config
+        self._task: Optional[Task] = None
+
+    def start(self) -> None:
+        if not self.config.SWEEPER_ENABLED or self._task is not None:
+            return
+
+        self._task = create_task(self._run(), name="session-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        try:
+            deleted: int = await SweepExpiredSessions(batch_size=self.config.SWEEP_BATCH_SIZE).sweep()
+        except Exception:
+            METRICS.inc("sessions_sweeps_total", status="error")
+            logger.exception("Уборка истекших сессий завершилась ошибкой")
+            return 0
+
+        METRICS.inc("sessions_sweeps_total", status="ok")
+        METRICS.inc("sessions_swept_total", deleted)
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await sleep(self.config.SWEEP_INTERVAL)
+
+
+SESSION_SWEEPER: SessionSweeper = SessionSweeper()
@@ -0,0 +1,81 @@
+from asyncio import CancelledError, Task, create_task, shield
+from dataclasses import dataclass
+from os import getenv
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from postgres.dto import PVZInfoRow, PVZInfoVersionRow
+from src.metrics import METRICS
+
+METRICS.describe("single_flight_calls_total", "counter", "Обращения к single-flight (call, role: leader, follower)")
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SingleFlightConfig:
+    ENABLED: bool = getenv("SINGLE_FLIGHT_ENABLED", default="true").lower() == "true"
+
+
+@dataclass
+class InFlight(Generic[T]):
+    task: "Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+        Одинаковые одновременные вызовы (по ключу) разделяют один запрос к БД и его результат или исключение.
+        Результат не кэшируется: следующий вызов после завершения снова идет в БД. Отмена одного ожидающего
+        не прерывает общий вызов, пока его ждут другие; ушел последний - вызов отменяется
+    """
+
+    def __init__(self, name: str, config: SingleFlightConfig = SingleFlightConfig()) -> None:
+        self.name: str = name
+        self.config: SingleFlightConfig = config
+        self._calls: Dict[Hashable, InFlight[T]] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        if not self.config.ENABLED:
+            return await call()
+
+        flight: InFlight[T]
+        if key in self._calls:
+            flight = self._calls[key]
+            METRICS.inc("single_flight_calls_total", call=self.name, role="follower")
+        else:
+            flight = InFlight(task=create_task(self._run(call)))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            METRICS.inc("single_flight_calls_total", call=self.name, role="leader")
+
+        flight.waiters += 1
+        try:
+            return await shield(flight.task)
+        except CancelledError:
+            if flight.waiters == 1:
+                flight.task.cancel()
+                # Отмененная задача завершится только на следующей итерации - новые вызовы начинают свой
+                self._forget(key, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    @staticmethod
+    async def _run(call: Callable[[], Awaitable[T]]) -> T:
+        return await call()
+
+    def _forget(self, key: Hashable, flight: InFlight[T]) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+
+# Проверка токена: параллельные запросы дашборда с одним токеном - один GetMe
+AUTH_LOOKUPS: SingleFlight[Optional[bytes]] = SingleFlight("GetMe")
+# Перепроверка на primary - по email и хешу предъявленного токена: всплеск с отозванным или устаревшим токеном
+# делит один запрос, а новый токен после /login не присоединяется к вызову, начатому до коммита входа
+AUTH_PRIMARY_LOOKUPS: SingleFlight[Optional[bytes]] = SingleFlight("GetMePrimary")
+# Одинаковые страницы /pvz-info (параметры и известная версия) - одна агрегация на всплеск
+PVZ_INFO_QUERIES: SingleFlight[Tuple[Optional[List[PVZInfoRow]], int, PVZInfoVersionRow]] = SingleFlight("GetPVZInfo")
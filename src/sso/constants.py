@@ -32,10 +32,25 @@ ERRORS_MAPPING: Dict[str, str] = {
         "Нельзя создать активную приемку на несуществующий ПВЗ",
 
     "invalid input value for enum product_type:":
-        "Некорректный тип товара, нужен - Электроника, Одежда, Обувь"
+        "Некорректный тип товара, нужен - Электроника, Одежда, Обувь",
+
+    "canceling statement due to statement timeout":
+        "Запрос выполнялся слишком долго, сузьте диапазон или повторите позже"
 }
 
 VALID_USER_TYPES: Dict[str, str] = {
     "client": "client",
     "moderator": "moderator",
 }
+
+VALID_CITIES: Dict[str, str] = {
+    "Москва": "Москва",
+    "Казань": "Казань",
+    "Санкт-Петербург": "Санкт-Петербург",
+}
+
+VALID_PRODUCT_TYPES: Dict[str, str] = {
+    "электроника": "электроника",
+    "одежда": "одежда",
+    "обувь": "обувь",
+}
@@ -1,14 +1,15 @@
 from datetime import timedelta, datetime
-from typing import Annotated, Any, Union, Dict, List, Tuple
-from fastapi import Form, Depends, Query, Response, Path
+from hmac import compare_digest
+from typing import Annotated, Optional, Dict, List
+from fastapi import Form, Depends, Header, Query, Request, Response, Path
 from jose import jwt, ExpiredSignatureError
 
 from postgres.sql.mutation import (
     UserRegisterMutation,
     UserLoginMutation,
-    UpdateAccessTokenMutation,
     GetMe,
     PVZ,
+    ImportPVZ,
     CheckActiveAccepting,
     InitReceptions,
     CheckAcceptingStatus,
@@ -16,22 +17,46 @@ from postgres.sql.mutation import (
     GetActiveAccepting,
     DeleteLastProduct,
     CloseReception,
-    GetPVZInfo
+    GetPVZInfo,
+    SearchProducts
 )
-from src.dto import JWTTokenResponse
-from src.sso.constants import ERRORS_MAPPING, VALID_USER_TYPES
+from postgres.dto import (
+    RegisteredUserRow,
+    PVZRow,
+    ReceptionRow,
+    ActiveReceptionRow,
+    ProductRow,
+    ProductSearchRow,
+    PVZInfoRow,
+    PVZInfoVersionRow,
+)
+from postgres.events import PVZ_EVENTS, SUBSCRIBERS_LIMIT_ERROR
+from src.dto import JWTTokenResponse, CacheValidators
+from src.page_cache import PVZ_INFO_PAGES, CachedPage
+from src.responses import render_record
+from src.single_flight import AUTH_LOOKUPS, AUTH_PRIMARY_LOOKUPS, PVZ_INFO_QUERIES
+from src.sso.constants import ERRORS_MAPPING, VALID_PRODUCT_TYPES, VALID_USER_TYPES
+from src.sso.etag import params_digest, make_etag, etag_version
+from src.sso.pagination import decode_cursor, encode_cursor
+from src.sso.pvz_import import iter_cities
+from src.stale_receptions import StaleReceptionsConfig, close_stale_receptions as close_stale
 from src.sso.dto import (
     GetCurrentUserResponse,
     RegisterUserResponse,
     LoginUserResponse,
     InitPVZResponse,
+    ImportPVZResponse,
     InitActiveReceptionsResponse,
     AddProductResponse,
     DeleteProductResponse,
     CloseReceptionResponse,
-    PVZInfoResponse
+    CloseStaleReceptionsResponse,
+    ProductSearchResponse,
+    ExportProductsResponse,
+    PVZInfoResponse,
+    PVZEventsResponse
 )
-from src.tokens import create_access_token, JWTConfig
+from src.tokens import create_access_token, JWTConfig, token_digest
 from fastapi.security import OAuth2PasswordBearer
 
 OAUTH2_SCHEME: OAuth2PasswordBearer = OAuth2PasswordBearer(tokenUrl="/login", auto_error=False)
@@ -56,11 +81,23 @@ async def get_current_user(
         user_role: str = payload.get("role")  # type: ignore[assignment]
         user_email: str = payload.get("sub")  # type: ignore[assignment]
 
-        db_token: str = await GetMe(
+        digest: bytes = token_digest(token)
+        db_digest: Optional[bytes] = await AUTH_LOOKUPS.do(user_email, GetMe(
             email=user_email,
-        ).get()
-
-        if not db_token or db_token != token:
+        ).get)
+
+        if db_digest != digest:
+            """
+                Реплика могла еще не получить токен (или саму сессию после истечения прежней), выданный только
+                что на /login. Запросы к primary объединяются только с тем же токеном: вызов, начатый до коммита
+                входа, вернул бы уже замененный токен
+            """
+            db_digest = await AUTH_PRIMARY_LOOKUPS.do((user_email, digest), GetMe(
+                email=user_email,
+                use_primary=True,
+            ).get)
+
+        if not db_digest or not compare_digest(db_digest, digest):
             result.errors = "Некорректный токен"
             return result
 
@@ -103,7 +140,7 @@ async def register(
             data={"sub": email, "role": user_type},
             expires_delta=timedelta(minutes=JWTConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
         )
-        sql_query: Tuple = await UserRegisterMutation(  # type: ignore[assignment]
+        registered_user: RegisteredUserRow = await UserRegisterMutation(  # type: ignore[assignment]
             username=username,
             user_type=user_type,
             password=password,
@@ -114,9 +151,9 @@ async def register(
         return RegisterUserResponse(
             result={"success": True},
             user={
-                "id": sql_query[0],
-                "username": sql_query[1],
-                "email": sql_query[3]
+                "id": registered_user.id,
+                "username": registered_user.username,
+                "email": registered_user.email
             }
         )
 
@@ -131,20 +168,20 @@ async def register(
 async def login(
         username: Annotated[str, Form(description="Указанный никнейм при регистрации")],
         password: Annotated[str, Form(description="Указанный пароль при регистрации")],
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
 ) -> LoginUserResponse:
     result: LoginUserResponse = LoginUserResponse()
 
     try:
-        process_login: Tuple = await UserLoginMutation(  # type: ignore[assignment]
+        # Тот же (закэшированный FastAPI) get_current_user, что у маршрута: уже вошедшему токен не перевыпускается
+        if current_user.message == "Authorization successful":
+            raise Exception("Вы уже авторизованы")
+
+        new_token: str = await UserLoginMutation(
             username=username,
             password=password
         ).login()
 
-        new_token: str = await UpdateAccessTokenMutation(  # type: ignore[assignment]
-            email=process_login[3],
-            user_type=process_login[2]
-        ).update()
-
         return LoginUserResponse(
             result={"success": True},
             token=new_token
@@ -173,14 +210,46 @@ async def init_pvz(
         if current_user.role != VALID_USER_TYPES.get("moderator"):
             raise Exception("У вас недостаточно прав - необходимая роль: moderator")
 
-        sql_query: Tuple = await PVZ(  # type: ignore[assignment]
+        pvz: PVZRow = await PVZ(  # type: ignore[assignment]
             city=city
         ).create()
 
         return InitPVZResponse(
-            id=sql_query[0],
-            city=sql_query[1],
-            registered_at=sql_query[2],
+            id=pvz.id,
+            city=pvz.city,
+            registered_at=pvz.registered_at,
+            result={"status": True}
+        )
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
+async def import_pvz(
+        request: Request,
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> ImportPVZResponse:
+    result: ImportPVZResponse = ImportPVZResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role != VALID_USER_TYPES.get("moderator"):
+            raise Exception("У вас недостаточно прав - необходимая роль: moderator")
+
+        created: List[int] = await ImportPVZ(  # type: ignore[assignment]
+            cities=iter_cities(request.stream(), content_type=request.headers.get("content-type", "text/csv"))
+        ).load()
+
+        return ImportPVZResponse(
+            ids=created,
+            total=len(created),
             result={"status": True}
         )
 
@@ -208,14 +277,16 @@ async def receptions(
 
         await CheckActiveAccepting(pvz_id=pvz_id).check()
 
-        sql_query: Tuple = await InitReceptions(  # type: ignore[assignment]
+        reception: ReceptionRow = await InitReceptions(  # type: ignore[assignment]
             pvz_id=pvz_id,
         ).init()
 
         return InitActiveReceptionsResponse(
-            receptions_id=sql_query[0],
-            pvz_id=sql_query[1],
-            status=sql_query[2],
+            receptions_id=reception.id,
+            pvz_id=reception.pvz_id,
+            status=reception.status,
+            product_count=reception.product_count,
+            product_counts=reception.product_counts,
             result={"status": True}
         )
 
@@ -244,16 +315,16 @@ async def add_product(
 
         await CheckAcceptingStatus(accepting_id=accepting_id).check()
 
-        sql_query: Tuple = await AddProduct(  # type: ignore[assignment]
+        product: ProductRow = await AddProduct(  # type: ignore[assignment]
             accepting_id=accepting_id,
             product_type=product_type.lower(),
         ).add()
 
         return AddProductResponse(
-            product_id=sql_query[0],
-            accepting_id=sql_query[1],
-            type=sql_query[2],
-            datetime=str(sql_query[3]),
+            product_id=product.id,
+            accepting_id=product.accepting_id,
+            type=product.type,
+            datetime=str(product.datetime),
             result={"status": True}
         )
 
@@ -279,9 +350,9 @@ async def delete_last_product(
         if current_user.role != VALID_USER_TYPES.get("client"):
             raise Exception("У вас недостаточно прав - необходимая роль: client")
 
-        active_accepting: Tuple = await GetActiveAccepting(pvz_id=pvz_id).get()  # type: ignore[assignment]
-        accepting_id: int = active_accepting[0]
-        product_ids: List[int] = active_accepting[1]
+        active_accepting: ActiveReceptionRow = await GetActiveAccepting(pvz_id=pvz_id).get()  # type: ignore[assignment]
+        accepting_id: int = active_accepting.id
+        product_ids: Optional[List[int]] = active_accepting.product_id
 
         if not product_ids:
             raise Exception("В приемке нет товаров для удаления")
@@ -289,16 +360,16 @@ async def delete_last_product(
         # Определяем последний добавленный товар (LIFO)
         last_product_id = product_ids[-1]
 
-        deleted_product: Tuple = await DeleteLastProduct(  # type: ignore[assignment]
+        deleted_product: ProductRow = await DeleteLastProduct(  # type: ignore[assignment]
             accepting_id=accepting_id,
             product_id=last_product_id,
         ).delete()
 
         return DeleteProductResponse(
-            product_id=deleted_product[0],
-            accepting_id=deleted_product[1],
-            type=deleted_product[2],
-            datetime=str(deleted_product[3]),
+            product_id=deleted_product.id,
+            accepting_id=deleted_product.accepting_id,
+            type=deleted_product.type,
+            datetime=str(deleted_product.datetime),
             result={"status": True}
         )
 
@@ -324,12 +395,14 @@ async def close_last_reception(
         if current_user.role != VALID_USER_TYPES.get("client"):
             raise Exception("У вас недостаточно прав - необходимая роль: client")
 
-        close_reception: Tuple = await CloseReception(pvz_id=pvz_id).close()  # type: ignore[assignment]
+        close_reception: ReceptionRow = await CloseReception(pvz_id=pvz_id).close()  # type: ignore[assignment]
 
         return CloseReceptionResponse(
-            reception_id=close_reception[0],
-            pvz_id=close_reception[1],
-            status=close_reception[2],
+            reception_id=close_reception.id,
+            pvz_id=close_reception.pvz_id,
+            status=close_reception.status,
+            product_count=close_reception.product_count,
+            product_counts=close_reception.product_counts,
             result={"status": True}
         )
 
@@ -340,11 +413,117 @@ async def close_last_reception(
     return result
 
 
+async def search_products(
+        start_date: Annotated[str, Query(description="Введите начальную дату в формате ISO - 2025-04-01T00:00:00")],
+        end_date: Annotated[str, Query(description="Введите конечную дату в формате ISO - 2025-04-30T23:59:59")],
+        type: Annotated[Optional[str], Query(description="Тип товара: электроника, одежда, обувь")] = None,
+        pvz_id: Annotated[Optional[int], Query(description="ID ПВЗ")] = None,
+        limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+        cursor: Annotated[Optional[str], Query(description="next_cursor предыдущей страницы")] = None,
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> ProductSearchResponse:
+    result: ProductSearchResponse = ProductSearchResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role not in [VALID_USER_TYPES.get("client"), VALID_USER_TYPES.get("moderator")]:
+            raise Exception("У вас недостаточно прав - необходимая роль: client или moderator")
+        if type is not None and type.lower() not in VALID_PRODUCT_TYPES:
+            raise Exception("Некорректный тип товара, нужен - Электроника, Одежда, Обувь")
+
+        products: List[ProductSearchRow] = await SearchProducts(
+            start_date=datetime.fromisoformat(start_date.replace("Z", "+00:00")),
+            end_date=datetime.fromisoformat(end_date.replace("Z", "+00:00")),
+            limit=limit,
+            product_type=VALID_PRODUCT_TYPES[type.lower()] if type is not None else None,
+            pvz_id=pvz_id,
+            after=decode_cursor(cursor) if cursor else None
+        ).search()
+
+        # Неполная страница - последняя; иначе курсор указывает на последнюю отданную строку
+        next_cursor: Optional[str] = None
+        if len(products) == limit:
+            next_cursor = encode_cursor(products[-1].datetime, products[-1].id)
+
+        return ProductSearchResponse(products=products, next_cursor=next_cursor, result={"status": True})
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
+async def export_products(
+        start_date: Annotated[str, Query(description="Введите начальную дату в формате ISO - 2025-04-01T00:00:00")],
+        end_date: Annotated[str, Query(description="Введите конечную дату в формате ISO - 2025-04-30T23:59:59")],
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> ExportProductsResponse:
+    result: ExportProductsResponse = ExportProductsResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role != VALID_USER_TYPES.get("moderator"):
+            raise Exception("У вас недостаточно прав - необходимая роль: moderator")
+
+        start_dt: datetime = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+        end_dt: datetime = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+        if start_dt > end_dt:
+            raise Exception("Начальная дата позже конечной")
+
+        # Сама выгрузка - в ответе: соединение занимается, только когда клиент начинает читать поток
+        return ExportProductsResponse(start_date=start_dt, end_date=end_dt, result={"status": True})
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
+async def close_stale_receptions(
+        max_age_hours: Annotated[Optional[float], Form(gt=0, description="Закрыть приемки старше N часов")] = None,
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> CloseStaleReceptionsResponse:
+    result: CloseStaleReceptionsResponse = CloseStaleReceptionsResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role != VALID_USER_TYPES.get("moderator"):
+            raise Exception("У вас недостаточно прав - необходимая роль: moderator")
+
+        config: StaleReceptionsConfig = StaleReceptionsConfig()
+        hours: float = max_age_hours if max_age_hours is not None else config.MAX_AGE_HOURS
+        closed: int = await close_stale(timedelta(hours=hours), config.BATCH_SIZE, trigger="manual")
+
+        return CloseStaleReceptionsResponse(closed=closed, max_age_hours=hours, result={"status": True})
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
 async def get_pvz_info(
         start_date: Annotated[str, Query(description="Введите начальную дату в формате ISO - 2025-04-01T00:00:00")],
         end_date: Annotated[str, Query(description="Введите конечную дату в формате ISO - 2025-04-30T23:59:59")],
         page: Annotated[int, Query(ge=1)] = 1,
         page_size: Annotated[int, Query(ge=1, le=100)] = 10,
+        summary: Annotated[bool, Query(description="Только счетчики товаров приемок, без списков товаров")] = False,
+        if_none_match: Annotated[Optional[str], Header(description="ETag предыдущего ответа")] = None,
         current_user: GetCurrentUserResponse = Depends(get_current_user),
 ) -> PVZInfoResponse:
     result: PVZInfoResponse = PVZInfoResponse()
@@ -361,22 +540,107 @@ async def get_pvz_info(
         start_dt: datetime = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
         end_dt: datetime = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
 
-        pvz_data: List[Union[Dict[str, str], List[Union[Dict[str, Union[str, Any]]]]]]
+        digest: str = params_digest(page, page_size, start_dt.isoformat(), end_dt.isoformat(), summary)
+
+        """
+            Сверяемся с более новой из версий клиента и закэшированной страницы (версия только растет): если
+            данные не менялись, агрегация не выполняется - отдается 304 или готовое (в том числе уже сжатое) тело.
+            Устаревший If-None-Match не обходит актуальный кэш
+        """
+        client_version: Optional[int] = etag_version(if_none_match, digest)
+        cached_page: Optional[CachedPage] = PVZ_INFO_PAGES.get(digest)
+        known_version: Optional[int] = client_version
+        if cached_page is not None and (known_version is None or cached_page.version > known_version):
+            known_version = cached_page.version
+
+        pvz_data: Optional[List[PVZInfoRow]]
         total: int
-        pvz_data, total = await GetPVZInfo(
+        version: PVZInfoVersionRow
+        pvz_data, total, version = await PVZ_INFO_QUERIES.do((digest, known_version), GetPVZInfo(
             page=page,
             page_size=page_size,
             start_date=start_dt,
-            end_date=end_dt
-        ).get()
+            end_date=end_dt,
+            known_version=known_version,
+            summary=summary
+        ).get)
+
+        validators: CacheValidators = CacheValidators(
+            etag=make_etag(version.version, digest),
+            last_modified=version.changed_at,
+            not_modified=pvz_data is None and version.version == client_version
+        )
+        if validators.not_modified:
+            return PVZInfoResponse(validators=validators, result={"status": True})
+        if pvz_data is None:
+            return PVZInfoResponse(validators=validators, result={"status": True}, cached_page=cached_page)
 
-        return PVZInfoResponse(
+        response: PVZInfoResponse = PVZInfoResponse(
             pvz_list=pvz_data,
             total=total,
             page=page,
             page_size=page_size,
-            result={"status": True}
+            result={"status": True},
+            validators=validators
+        )
+        body: bytes = render_record(response)
+        cached: CachedPage = PVZ_INFO_PAGES.put(digest, version.version, body)
+        # В кэше уже более новая страница - этот ответ отдается со своим телом, согласованным с его ETag
+        response.cached_page = cached if cached.version == version.version else CachedPage(
+            key=digest, version=version.version, body=body
         )
+        return response
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
+async def pvz_events(
+        pvz_id: int = Path(description="ID ПВЗ, события которого нужно получать"),
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> PVZEventsResponse:
+    result: PVZEventsResponse = PVZEventsResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role not in [VALID_USER_TYPES.get("client"), VALID_USER_TYPES.get("moderator")]:
+            raise Exception("У вас недостаточно прав - необходимая роль: client или moderator")
+        if not PVZ_EVENTS.has_capacity():
+            raise Exception(SUBSCRIBERS_LIMIT_ERROR)
+
+        return PVZEventsResponse(pvz_id=pvz_id, result={"status": True})
+
+    except Exception as err:
+        error_message = str(err).split("\"")[0].strip()
+        result.errors = ERRORS_MAPPING.get(error_message, str(err))
+
+    return result
+
+
+async def all_pvz_events(
+        current_user: GetCurrentUserResponse = Depends(get_current_user),
+) -> PVZEventsResponse:
+    result: PVZEventsResponse = PVZEventsResponse()
+
+    try:
+        if current_user.errors == "Токен авторизации протух, войдите заново":
+            result.errors = "Токен авторизации протух, войдите заново"
+            return result
+        if current_user.email is None or current_user.role is None:
+            raise Exception("Токен доступа протух или не найден")
+        if current_user.role not in [VALID_USER_TYPES.get("client"), VALID_USER_TYPES.get("moderator")]:
+            raise Exception("У вас недостаточно прав - необходимая роль: client или moderator")
+        if not PVZ_EVENTS.has_capacity():
+            raise Exception(SUBSCRIBERS_LIMIT_ERROR)
+
+        return PVZEventsResponse(result={"status": True})
 
     except Exception as err:
         error_message = str(err).split("\"")[0].strip()
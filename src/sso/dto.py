@@ -1,40 +1,51 @@
-from dataclasses import dataclass
-from typing import Dict, Optional, Any, List
-from src.dto import BaseResponse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, List, Union
+from postgres.dto import ProductSearchRow, PVZInfoRow
+from src.dto import BaseResponse, CacheValidators
+from src.page_cache import CachedPage
 
 
-@dataclass
+@dataclass(slots=True)
 class GetCurrentUserResponse(BaseResponse):
     message: Optional[str] = None
     email: Optional[str] = None
     role: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RegisterUserResponse(BaseResponse):
-    user: Optional[Dict[str, str]] = None
+    user: Optional[Dict[str, Union[int, str]]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class LoginUserResponse(BaseResponse):
     token: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class InitPVZResponse(BaseResponse):
-    id: Optional[str] = None
+    id: Optional[int] = None
     city: Optional[str] = None
-    registered_at: Optional[str] = None
+    registered_at: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
+class ImportPVZResponse(BaseResponse):
+    ids: Optional[List[int]] = None
+    total: Optional[int] = None
+
+
+@dataclass(slots=True)
 class InitActiveReceptionsResponse(BaseResponse):
-    receptions_id: Optional[str] = None
-    pvz_id: Optional[str] = None
+    receptions_id: Optional[int] = None
+    pvz_id: Optional[int] = None
     status: Optional[str] = None
+    product_count: Optional[int] = None
+    product_counts: Optional[Dict[str, int]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AddProductResponse(BaseResponse):
     product_id: Optional[int] = None
     accepting_id: Optional[int] = None
@@ -42,7 +53,7 @@ class AddProductResponse(BaseResponse):
     datetime: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DeleteProductResponse(BaseResponse):
     product_id: Optional[int] = None
     accepting_id: Optional[int] = None
@@ -50,16 +61,43 @@ class DeleteProductResponse(BaseResponse):
     datetime: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CloseReceptionResponse(BaseResponse):
     reception_id: Optional[int] = None
     pvz_id: Optional[int] = None
     status: Optional[str] = None
+    product_count: Optional[int] = None
+    product_counts: Optional[Dict[str, int]] = None
+
+
+@dataclass(slots=True)
+class ProductSearchResponse(BaseResponse):
+    products: Optional[List[ProductSearchRow]] = None
+    next_cursor: Optional[str] = None
+
 
+@dataclass(slots=True)
+class ExportProductsResponse(BaseResponse):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
 
-@dataclass
+
+@dataclass(slots=True)
+class CloseStaleReceptionsResponse(BaseResponse):
+    closed: Optional[int] = None
+    max_age_hours: Optional[float] = None
+
+
+@dataclass(slots=True)
 class PVZInfoResponse(BaseResponse):
-    pvz_list: Optional[List[Dict[str, str] | List[Dict[str, str | Any]]]] = None
+    pvz_list: Optional[List[PVZInfoRow]] = None
     total: Optional[int] = None
     page: Optional[int] = None
     page_size: Optional[int] = None
+    validators: Optional[CacheValidators] = field(default=None, metadata={"serialize": False})
+    cached_page: Optional[CachedPage] = field(default=None, metadata={"serialize": False})
+
+
+@dataclass(slots=True)
+class PVZEventsResponse(BaseResponse):
+    pvz_id: Optional[int] = None
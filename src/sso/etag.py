@@ -0,0 +1,25 @@
+from hashlib import blake2b
+from typing import Optional
+
+
+def params_digest(*params: object) -> str:
+    return blake2b(":".join(map(str, params)).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def make_etag(version: int, digest: str) -> str:
+    """Слабый ETag: версия данных (водяной знак pvz_info_version) + отпечаток параметров запроса"""
+    return f'W/"{version}-{digest}"'
+
+
+def etag_version(if_none_match: Optional[str], digest: str) -> Optional[int]:
+    """Версия из If-None-Match, выданного для тех же параметров запроса; иначе None"""
+    if not if_none_match:
+        return None
+
+    for tag in if_none_match.split(","):
+        value: str = tag.strip().removeprefix("W/").strip('"')
+        version, _, tag_digest = value.partition("-")
+        if tag_digest == digest and version.isdigit():
+            return int(version)
+
+    return None
@@ -0,0 +1,43 @@
+from asyncio import wait_for
+from dataclasses import asdict, dataclass
+from json import dumps
+from os import getenv
+from typing import AsyncIterator, Optional
+
+from postgres.dto import PVZEvent
+from postgres.events import PVZ_EVENTS, PVZEventHub
+
+
+@dataclass(frozen=True)
+class SSEConfig:
+    # Комментарий-пинг не дает прокси закрыть простаивающее соединение
+    KEEPALIVE: float = float(getenv("SSE_KEEPALIVE", default=15))
+    # Через сколько миллисекунд браузерный EventSource переподключается после обрыва
+    RETRY_MS: int = int(getenv("SSE_RETRY_MS", default=3000))
+
+
+def sse_message(event: PVZEvent) -> bytes:
+    data: str = dumps({key: value for key, value in asdict(event).items() if value is not None}, ensure_ascii=False)
+    return f"event: {event.event}\ndata: {data}\n\n".encode()
+
+
+async def pvz_event_stream(
+        pvz_id: Optional[int] = None,
+        hub: PVZEventHub = PVZ_EVENTS,
+        config: SSEConfig = SSEConfig()
+) -> AsyncIterator[bytes]:
+    """
+        Подписка живет ровно столько, сколько генератор: при отключении клиента Starlette отменяет
+        отправку тела, и контекст subscribe снимает очередь с хаба
+    """
+    async with hub.subscribe(pvz_id) as queue:
+        # subscribe возвращает очередь после LISTEN: с события ready клиент получает все изменения
+        yield f"retry: {config.RETRY_MS}\n\n".encode()
+        yield f"event: ready\ndata: {dumps({'pvz_id': pvz_id})}\n\n".encode()
+        while True:
+            try:
+                event: PVZEvent = await wait_for(queue.get(), timeout=config.KEEPALIVE)
+            except TimeoutError:
+                yield b": ping\n\n"
+                continue
+            yield sse_message(event)
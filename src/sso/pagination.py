@@ -0,0 +1,18 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Непрозрачный курсор keyset-пагинации: позиция (datetime, id) последней отданной строки"""
+    return urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw: str = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, _, row_id = raw.rpartition("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise Exception("Некорректный курсор пагинации")
@@ -0,0 +1,58 @@
+from csv import reader as csv_reader
+from json import loads, JSONDecodeError
+from typing import AsyncIterator, Optional
+
+from src.sso.constants import VALID_CITIES
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Построчное чтение тела запроса без загрузки файла в память целиком"""
+    buffer: bytes = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+def parse_city(line: str, ndjson: bool) -> Optional[str]:
+    if not line.strip():
+        return None
+
+    if ndjson:
+        try:
+            city = loads(line).get("city")
+        except (JSONDecodeError, AttributeError):
+            raise Exception("Некорректная строка NDJSON, ожидается объект вида {\"city\": \"Москва\"}")
+    else:
+        city = next(csv_reader([line]))[0]
+
+    if not isinstance(city, str):
+        raise Exception("Не указан город")
+
+    return city.strip()
+
+
+async def iter_cities(stream: AsyncIterator[bytes], content_type: str) -> AsyncIterator[str]:
+    """CSV (один город в первой колонке, заголовок city опционален) или NDJSON ({"city": ...} на строку)"""
+    ndjson: bool = "json" in content_type
+    line_number: int = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        try:
+            city: Optional[str] = parse_city(line, ndjson=ndjson)
+        except Exception as error:
+            raise Exception(f"Строка {line_number}: {error}")
+
+        if city is None or (line_number == 1 and not ndjson and city == "city"):
+            continue
+
+        if city not in VALID_CITIES.values():
+            raise Exception(
+                f"Строка {line_number}: Создать ПВЗ можно только в городах - {', '.join(VALID_CITIES.values())}"
+            )
+
+        yield city
@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, Response
+from typing import Annotated, Dict, Optional
+from fastapi import APIRouter, Depends, Header, Response
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
+from postgres.events import SUBSCRIBERS_LIMIT_ERROR
+from postgres.sql.mutation import ExportProducts
+from src.dto import CacheValidators
+from src.page_cache import PVZ_INFO_PAGES
+from src.responses import RecordJSONResponse
 from src.sso.auth_error_handler import auth_error
+from src.sso.events import pvz_event_stream
 from src.sso.dependencies import (
     register as register_dependency,
     get_current_user as get_current_user_dependency,
     login as login_dependency,
     init_pvz as init_pvz_dependency,
+    import_pvz as import_pvz_dependency,
     receptions as receptions_dependency,
     add_product as add_product_dependency,
     delete_last_product as delete_last_product_dependency,
     close_last_reception as close_last_reception_dependency,
+    close_stale_receptions as close_stale_receptions_dependency,
+    search_products as search_products_dependency,
+    export_products as export_products_dependency,
     get_pvz_info as get_pvz_info_dependency,
+    pvz_events as pvz_events_dependency,
+    all_pvz_events as all_pvz_events_dependency,
 )
 from src.sso.dto import (
     GetCurrentUserResponse,
     RegisterUserResponse,
     LoginUserResponse,
     InitPVZResponse,
+    ImportPVZResponse,
     InitActiveReceptionsResponse,
     AddProductResponse,
     DeleteProductResponse,
     CloseReceptionResponse,
-    PVZInfoResponse
+    CloseStaleReceptionsResponse,
+    ProductSearchResponse,
+    ExportProductsResponse,
+    PVZInfoResponse,
+    PVZEventsResponse
 )
 
 sso_router = APIRouter()
@@ -38,23 +56,23 @@ async def register(
         result: RegisterUserResponse = Depends(register_dependency),
 ):
     if current_user.message == "Authorization successful":
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_403_FORBIDDEN,
-            content=RegisterUserResponse(errors="Вы уже авторизованы").__dict__
+            content=RegisterUserResponse(errors="Вы уже авторизованы")
         )
 
     expired_token_error = auth_error(result=current_user)
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=RegisterUserResponse(errors=result.errors).__dict__
+            content=RegisterUserResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_201_CREATED,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -70,18 +88,18 @@ async def login(
         result: LoginUserResponse = Depends(login_dependency),
 ):
     if current_user.message == "Authorization successful":
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_403_FORBIDDEN,
-            content=LoginUserResponse(errors="Вы уже авторизованы").__dict__
+            content=LoginUserResponse(errors="Вы уже авторизованы")
         )
 
     expired_token_error = auth_error(result=current_user)
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=LoginUserResponse(errors=result.errors).__dict__
+            content=LoginUserResponse(errors=result.errors)
         )
 
     response.headers["Authorization"] = f"Bearer {result.token}"
@@ -101,14 +119,14 @@ async def token_checker(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=GetCurrentUserResponse(errors=result.errors).__dict__
+            content=GetCurrentUserResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -130,14 +148,46 @@ async def init_pvz(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=InitPVZResponse(errors=result.errors).__dict__
+            content=InitPVZResponse(errors=result.errors)
         )
 
     return result
 
 
+@sso_router.post(
+    path="/pvz/import",
+    response_class=JSONResponse,
+    name="Массовое создание ПВЗ из файла (Только для - moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        Тело запроса - поток городов, загружается в БД через COPY одной транзакцией:\n
+          - text/csv: один город в строке (заголовок city опционален);
+          - application/x-ndjson: {"city": "Москва"} в строке;
+          - Города: Москва, Казань, Санкт-Петербург - при ошибке не создается ни один ПВЗ
+    """
+)
+async def import_pvz(
+        result: ImportPVZResponse = Depends(import_pvz_dependency)
+):
+    expired_token_error = auth_error(result=result)
+    if expired_token_error:
+        return expired_token_error
+    if result.errors:
+        return RecordJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=ImportPVZResponse(errors=result.errors)
+        )
+
+    return RecordJSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content=result
+    )
+
+
 @sso_router.post(
     path="/receptions",
     response_class=JSONResponse,
@@ -159,14 +209,14 @@ async def receptions(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=InitActiveReceptionsResponse(errors=result.errors).__dict__
+            content=InitActiveReceptionsResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_201_CREATED,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -191,14 +241,14 @@ async def add_product(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=AddProductResponse(errors=result.errors).__dict__
+            content=AddProductResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_201_CREATED,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -224,14 +274,14 @@ async def delete_last_product(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=DeleteProductResponse(errors=result.errors).__dict__
+            content=DeleteProductResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -256,14 +306,114 @@ async def close_last_reception(
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=CloseReceptionResponse(errors=result.errors)
+        )
+
+    return RecordJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=result
+    )
+
+
+@sso_router.get(
+    path="/products/search",
+    response_class=JSONResponse,
+    name="Поиск товаров по времени приемки (Только для - client и moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        Плоский список товаров за период без агрегации по ПВЗ и приемкам.\n
+        Условия:\n
+          - Пользователь должен иметь роль client или moderator;
+          - Необязательные фильтры: type, pvz_id;
+          - Сортировка по времени приемки товара; следующая страница - по next_cursor из ответа
+    """
+)
+async def search_products(
+        result: ProductSearchResponse = Depends(search_products_dependency),
+):
+    expired_token_error = auth_error(result=result)
+    if expired_token_error:
+        return expired_token_error
+    if result.errors:
+        return RecordJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=ProductSearchResponse(errors=result.errors)
+        )
+
+    return RecordJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=result
+    )
+
+
+@sso_router.get(
+    path="/export/products.csv",
+    response_class=StreamingResponse,
+    name="Выгрузка товаров в CSV (Только для - moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        Плоские строки товаров: product_id, type, datetime, reception_id, pvz_id, city.\n
+        Условия:\n
+          - Пользователь должен иметь роль moderator;
+          - Фильтр по времени приемки товара: start_date, end_date;
+          - CSV формирует Postgres (COPY TO STDOUT) и отдает потоком - размер выгрузки не ограничен памятью
+    """
+)
+async def export_products(
+        result: ExportProductsResponse = Depends(export_products_dependency),
+):
+    expired_token_error = auth_error(result=result)
+    if expired_token_error:
+        return expired_token_error
+    if result.errors or result.start_date is None or result.end_date is None:
+        return RecordJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=ExportProductsResponse(errors=result.errors)
+        )
+
+    filename: str = f"products_{result.start_date:%Y%m%d}_{result.end_date:%Y%m%d}.csv"
+    return StreamingResponse(
+        content=ExportProducts(start_date=result.start_date, end_date=result.end_date).stream(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+    )
+
+
+@sso_router.post(
+    path="/receptions/close_stale",
+    response_class=JSONResponse,
+    name="Закрытие всех зависших приемок (Только для - moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        Закрывает все незакрытые приемки старше max_age_hours (по умолчанию STALE_RECEPTIONS_MAX_AGE_HOURS).\n
+        Условия:\n
+          - Пользователь должен иметь роль moderator;
+          - Приемки закрываются пачками по STALE_RECEPTIONS_BATCH_SIZE, в ответе - сколько закрыто
+    """
+)
+async def close_stale_receptions(
+        result: CloseStaleReceptionsResponse = Depends(close_stale_receptions_dependency),
+):
+    expired_token_error = auth_error(result=result)
+    if expired_token_error:
+        return expired_token_error
+    if result.errors:
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=CloseReceptionResponse(errors=result.errors).__dict__
+            content=CloseStaleReceptionsResponse(errors=result.errors)
         )
 
-    return JSONResponse(
+    return RecordJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=result.__dict__
+        content=result
     )
 
 
@@ -279,22 +429,93 @@ async def close_last_reception(
         Условия:\n
           - Пользователь должен иметь роль client или moderator;
           - Поддерживает пагинацию (параметры page и page_size);
-          - Поддерживает фильтрацию по диапазону дат приемки (start_date и end_date)
+          - Поддерживает фильтрацию по диапазону дат приемки (start_date и end_date);
+          - Возвращает ETag/Last-Modified, на совпадающий If-None-Match отвечает 304 без выборки данных;
+          - Большие ответы сжимаются по Accept-Encoding (zstd, br, gzip), сжатые варианты кэшируются вместе со страницей
     """
 )
 async def get_pvz_info(
+        accept_encoding: Annotated[Optional[str], Header(include_in_schema=False)] = None,
         result: PVZInfoResponse = Depends(get_pvz_info_dependency),
 ):
     expired_token_error = auth_error(result=result)
     if expired_token_error:
         return expired_token_error
     if result.errors:
-        return JSONResponse(
+        return RecordJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=PVZInfoResponse(errors=result.errors).__dict__
+            content=PVZInfoResponse(errors=result.errors)
         )
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=result.__dict__
+    validators: Optional[CacheValidators] = result.validators
+    if validators is not None and validators.not_modified:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=validators.headers()
+        )
+
+    headers: Dict[str, str] = validators.headers() if validators is not None else {}
+    if result.cached_page is None:
+        return RecordJSONResponse(status_code=status.HTTP_200_OK, content=result, headers=headers)
+
+    return await PVZ_INFO_PAGES.response(page=result.cached_page, accept_encoding=accept_encoding, headers=headers)
+
+
+def event_stream_response(result: PVZEventsResponse):
+    expired_token_error = auth_error(result=result)
+    if expired_token_error:
+        return expired_token_error
+    if result.errors:
+        return RecordJSONResponse(
+            status_code=(
+                status.HTTP_503_SERVICE_UNAVAILABLE if result.errors == SUBSCRIBERS_LIMIT_ERROR
+                else status.HTTP_400_BAD_REQUEST
+            ),
+            content=PVZEventsResponse(errors=result.errors)
+        )
+
+    return StreamingResponse(
+        content=pvz_event_stream(result.pvz_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+@sso_router.get(
+    path="/pvz/events",
+    response_class=StreamingResponse,
+    name="Поток событий приемок и товаров всех ПВЗ (Только для - client и moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        Server-Sent Events: reception_created, product_added, product_deleted, reception_closed.\n
+        Условия:\n
+          - Пользователь должен иметь роль client или moderator;
+          - События приходят из LISTEN/NOTIFY и видны при любом числе воркеров;
+          - Истории нет: после переподключения актуальное состояние берется из /pvz-info
+    """
+)
+async def all_pvz_events(
+        result: PVZEventsResponse = Depends(all_pvz_events_dependency),
+):
+    return event_stream_response(result)
+
+
+@sso_router.get(
+    path="/pvz/{pvz_id}/events",
+    response_class=StreamingResponse,
+    name="Поток событий приемок и товаров ПВЗ (Только для - client и moderator)",
+    tags=["ПВЗ"],
+    description=
+    """
+        --------------------------------------------------------\n
+        То же, что /pvz/events, но только события указанного ПВЗ.\n
+        Условия:\n
+          - Пользователь должен иметь роль client или moderator
+    """
+)
+async def pvz_events(
+        result: PVZEventsResponse = Depends(pvz_events_dependency),
+):
+    return event_stream_response(result)
@@ -0,0 +1,84 @@
+from asyncio import CancelledError, Task, create_task, gather, sleep
+from dataclasses import dataclass
+from datetime import timedelta
+from logging import Logger, getLogger
+from os import getenv
+from typing import List, Optional
+
+from postgres.config import SHARDS
+from postgres.sql.mutation import CloseStaleReceptions
+from src.metrics import METRICS
+
+logger: Logger = getLogger(__name__)
+
+METRICS.describe("stale_receptions_closed_total", "counter", "Приемки, закрытые автоматически по возрасту (trigger)")
+METRICS.describe("stale_receptions_runs_total", "counter", "Запуски автозакрытия приемок (status)")
+
+
+@dataclass(frozen=True)
+class StaleReceptionsConfig:
+    ENABLED: bool = getenv("STALE_RECEPTIONS_ENABLED", default="true").lower() == "true"
+    # Приемки, открытые дольше MAX_AGE_HOURS, закрываются
+    MAX_AGE_HOURS: float = float(getenv("STALE_RECEPTIONS_MAX_AGE_HOURS", default=24))
+    INTERVAL: float = float(getenv("STALE_RECEPTIONS_INTERVAL", default=3600))
+    BATCH_SIZE: int = int(getenv("STALE_RECEPTIONS_BATCH_SIZE", default=500))
+
+    @property
+    def max_age(self) -> timedelta:
+        return timedelta(hours=self.MAX_AGE_HOURS)
+
+
+async def close_stale_receptions(max_age: timedelta, batch_size: int, trigger: str) -> int:
+    """Шарды независимы - закрываются параллельно, каждый своими пачками"""
+    closed: List[int] = await gather(*(
+        CloseStaleReceptions(max_age=max_age, batch_size=batch_size, shard=shard).close() for shard in SHARDS.shards()
+    ))
+    METRICS.inc("stale_receptions_closed_total", sum(closed), trigger=trigger)
+    return sum(closed)
+
+
+class StaleReceptionsJob:
+    """
+        Периодически закрывает зависшие приемки. Задача запускается в каждом воркере: строки выбираются
+        с SKIP LOCKED, поэтому параллельные запуски делят работу, а не закрывают одно и то же дважды
+    """
+
+    def __init__(self, config: StaleReceptionsConfig = StaleReceptionsConfig()) -> None:
+        self.config: StaleReceptionsConfig = config
+        self._task: Optional[Task] = None
+
+    def start(self) -> None:
+        if not self.config.ENABLED or self._task is not None:
+            return
+
+        self._task = create_task(self._run(), name="stale-receptions-job")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        try:
+            closed: int = await close_stale_receptions(self.config.max_age, self.config.BATCH_SIZE, trigger="schedule")
+        except Exception:
+            METRICS.inc("stale_receptions_runs_total", status="error")
+            logger.exception("Автозакрытие приемок завершилось ошибкой")
+            return 0
+
+        METRICS.inc("stale_receptions_runs_total", status="ok")
+        if closed:
+            logger.info("Автоматически закрыто приемок: %d", closed)
+        return closed
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await sleep(self.config.INTERVAL)
+
+
+STALE_RECEPTIONS: StaleReceptionsJob = StaleReceptionsJob()
@@ -1,12 +1,13 @@
 from dataclasses import dataclass
-from dotenv import load_dotenv, find_dotenv
+from hashlib import sha256
 from os import getenv
 from datetime import datetime, timedelta, UTC
 from jose import jwt
 from typing import Optional, Union
 from src.dto import JWTTokenResponse
+from src.env import load_env
 
-load_dotenv(find_dotenv(".env.jwt.local"))
+load_env()
 
 
 @dataclass(frozen=True)
@@ -16,6 +17,24 @@ class JWTConfig:
     ACCESS_TOKEN_EXPIRE_MINUTES: float = float(getenv("ACCESS_TOKEN_EXPIRE_MINUTES", default=30))
 
 
+@dataclass(frozen=True)
+class SessionsConfig:
+    # UNLOGGED-таблица не пишет WAL (дешевле вход), но очищается после сбоя и недоступна на репликах
+    UNLOGGED: bool = getenv("SESSIONS_UNLOGGED", default="false").lower() == "true"
+    SWEEPER_ENABLED: bool = getenv("SESSIONS_SWEEPER_ENABLED", default="true").lower() == "true"
+    SWEEP_INTERVAL: float = float(getenv("SESSIONS_SWEEP_INTERVAL", default=600))
+    SWEEP_BATCH_SIZE: int = int(getenv("SESSIONS_SWEEP_BATCH_SIZE", default=1000))
+
+
+def token_digest(token: str) -> bytes:
+    """В sessions хранится только SHA-256 токена: 32 байта вместо JWT, и утечка таблицы не дает входа"""
+    return sha256(token.encode("utf-8")).digest()
+
+
+def session_expires_at() -> datetime:
+    return datetime.now(UTC) + timedelta(minutes=JWTConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> Union[JWTTokenResponse, Exception]:
     try:
         to_encode = data.copy()
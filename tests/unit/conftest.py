@@ -0,0 +1,43 @@
+import pytest
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Optional
+from postgres.config import DEFAULT_SHARD
+from src.sso.dto import GetCurrentUserResponse
+
+
+@dataclass
+class Checkouts:
+    """Сколько раз мутация брала соединение primary и держит ли она его сейчас"""
+    total: int = 0
+    held: bool = False
+
+
+@pytest.fixture
+def patch_primary(monkeypatch: pytest.MonkeyPatch) -> Callable[[Any], Checkouts]:
+    """Подменяет primary() мутаций: каждый вызов отдает переданное фейковое соединение"""
+    def patch_with(connection: Any) -> Checkouts:
+        checkouts: Checkouts = Checkouts()
+
+        @asynccontextmanager
+        async def primary(budget: Optional[str] = None, shard: int = DEFAULT_SHARD) -> AsyncIterator[Any]:
+            checkouts.total += 1
+            checkouts.held = True
+            try:
+                yield connection
+            finally:
+                checkouts.held = False
+
+        monkeypatch.setattr("postgres.sql.mutation.primary", primary)
+        return checkouts
+
+    return patch_with
+
+
+@pytest.fixture
+def user() -> Callable[[str], GetCurrentUserResponse]:
+    """Результат get_current_user для авторизованного пользователя с ролью role"""
+    def authorized(role: str) -> GetCurrentUserResponse:
+        return GetCurrentUserResponse(message="Authorization successful", email="test@example.com", role=role)
+
+    return authorized
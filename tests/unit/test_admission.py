@@ -0,0 +1,138 @@
+import pytest
+from asyncio import Event, create_task, sleep
+from typing import Any, Dict, Optional
+from unittest.mock import MagicMock
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from starlette import status
+from starlette.routing import Match
+from src.admission import (
+    AdmissionConfig,
+    AdmissionControlMiddleware,
+    RouteBudget,
+    RouteLimiter,
+    parse_route_budgets,
+    route_path,
+)
+from src.metrics import METRICS
+
+
+def build_app(budgets: Dict[str, RouteBudget], release: Event) -> FastAPI:
+    app: FastAPI = FastAPI()
+
+    @app.get("/heavy/{item_id}")
+    async def heavy(item_id: int) -> Dict[str, int]:
+        await release.wait()
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    async def metrics() -> Dict[str, bool]:
+        return {"status": True}
+
+    app.add_middleware(AdmissionControlMiddleware, config=AdmissionConfig(ROUTE_BUDGETS=budgets, RETRY_AFTER_SECONDS=3))
+    return app
+
+
+class TestParseRouteBudgets:
+    def test_parse_route_budgets(self) -> None:
+        budgets: Dict[str, RouteBudget] = parse_route_budgets("/pvz-info=8:2.0:32; /authorization-checker=200:0.05:400;")
+
+        assert budgets["/pvz-info"] == RouteBudget(limit=8, queue_timeout=2.0, max_queue=32)
+        assert budgets["/authorization-checker"] == RouteBudget(limit=200, queue_timeout=0.05, max_queue=400)
+
+    def test_parse_route_budgets_empty(self) -> None:
+        assert parse_route_budgets("") == {}
+
+    def test_default_budget_for_unknown_route(self) -> None:
+        config: AdmissionConfig = AdmissionConfig(ROUTE_BUDGETS={})
+
+        assert config.budget("/login") == RouteBudget(
+            limit=config.DEFAULT_LIMIT,
+            queue_timeout=config.DEFAULT_QUEUE_TIMEOUT,
+            max_queue=config.DEFAULT_MAX_QUEUE
+        )
+
+
+class TestRouteLimiter:
+    @pytest.mark.asyncio
+    async def test_queue_full_is_rejected_immediately(self) -> None:
+        limiter: RouteLimiter = RouteLimiter("/limiter-full", RouteBudget(limit=1, queue_timeout=10.0, max_queue=0))
+
+        assert await limiter.acquire() is None
+        assert await limiter.acquire() == "queue_full"
+        assert METRICS.get("admission_rejected_total", route="/limiter-full", reason="queue_full") == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self) -> None:
+        limiter: RouteLimiter = RouteLimiter("/limiter-timeout", RouteBudget(limit=1, queue_timeout=0.01, max_queue=5))
+
+        assert await limiter.acquire() is None
+        assert await limiter.acquire() == "queue_timeout"
+        assert limiter.queued == 0
+        assert METRICS.get("admission_rejected_total", route="/limiter-timeout", reason="queue_timeout") == 1
+
+    @pytest.mark.asyncio
+    async def test_queued_request_gets_slot_after_release(self) -> None:
+        limiter: RouteLimiter = RouteLimiter("/limiter-release", RouteBudget(limit=1, queue_timeout=1.0, max_queue=5))
+        await limiter.acquire()
+
+        waiter = create_task(limiter.acquire())
+        await sleep(0)
+        assert limiter.queued == 1
+
+        limiter.release()
+
+        assert await waiter is None
+        assert limiter.in_flight == 1
+        assert METRICS.get("admission_admitted_total", route="/limiter-release") == 2
+
+
+class TestAdmissionControlMiddleware:
+    @pytest.mark.asyncio
+    async def test_over_budget_returns_503_with_retry_after(self) -> None:
+        release: Event = Event()
+        app: FastAPI = build_app({"/heavy/{item_id}": RouteBudget(limit=1, queue_timeout=0.01, max_queue=0)}, release)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = create_task(client.get("/heavy/1"))
+            await sleep(0.05)
+
+            rejected = await client.get("/heavy/2")
+            release.set()
+            accepted = await first
+
+        assert rejected.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert rejected.headers["Retry-After"] == "3"
+        assert rejected.json() == {"errors": "Сервис перегружен, повторите запрос позже"}
+        assert accepted.status_code == status.HTTP_200_OK
+
+    @pytest.mark.asyncio
+    async def test_exempt_and_unknown_routes_are_not_limited(self) -> None:
+        release: Event = Event()
+        app: FastAPI = build_app({"/metrics": RouteBudget(limit=0, queue_timeout=0.0, max_queue=0)}, release)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/metrics")).status_code == status.HTTP_200_OK
+            assert (await client.get("/unknown")).status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestRoutePath:
+    def test_route_is_resolved_once_per_request(self) -> None:
+        route: MagicMock = MagicMock(path="/pvz/{pvz_id}/events")
+        route.matches.return_value = (Match.FULL, {})
+        scope: Dict[str, Any] = {"type": "http", "path": "/pvz/1/events", "app": MagicMock()}
+        scope["app"].router.routes = [route]
+
+        # Admission control и дедлайны спрашивают маршрут одного и того же запроса
+        assert route_path(scope) == route_path(scope) == "/pvz/{pvz_id}/events"
+        route.matches.assert_called_once()
+
+    def test_unknown_route_is_cached_too(self) -> None:
+        route: MagicMock = MagicMock(path="/pvz")
+        route.matches.return_value = (Match.NONE, {})
+        scope: Dict[str, Any] = {"type": "http", "path": "/unknown", "app": MagicMock()}
+        scope["app"].router.routes = [route]
+
+        missing: Optional[str] = route_path(scope)
+        assert missing is None and route_path(scope) is None
+        route.matches.assert_called_once()
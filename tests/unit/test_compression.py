@@ -0,0 +1,110 @@
+import pytest
+from gzip import decompress
+from typing import Callable, Dict
+from unittest.mock import patch
+from starlette.responses import Response
+from src.compression import CompressionConfig, compress, negotiate
+from src.page_cache import CachedPage, PageCache
+
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "zstd": lambda body: body,
+    "br": lambda body: body,
+    "gzip": lambda body: body,
+}
+
+
+def build_cache(max_entries: int = 8, max_bytes: int = 1024 * 1024, min_size: int = 16) -> PageCache:
+    return PageCache(
+        name="test",
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        compression=CompressionConfig(MIN_SIZE=min_size, OFFLOAD_SIZE=1024 * 1024),
+    )
+
+
+class TestNegotiate:
+    def test_highest_quality_wins(self) -> None:
+        assert negotiate("gzip;q=1.0, br;q=0.5", ENCODERS) == "gzip"
+
+    def test_server_preference_on_equal_quality(self) -> None:
+        assert negotiate("gzip, br, zstd", ENCODERS) == "zstd"
+
+    def test_rejected_and_unknown_codings(self) -> None:
+        assert negotiate("zstd;q=0, br;q=0, deflate", ENCODERS) is None
+        assert negotiate(None, ENCODERS) is None
+
+    def test_wildcard(self) -> None:
+        assert negotiate("*;q=0.1, zstd;q=0", ENCODERS) == "br"
+
+
+class TestCompress:
+    @pytest.mark.asyncio
+    async def test_large_bodies_are_offloaded(self) -> None:
+        body: bytes = b'{"pvz_list":[]}' * 100
+
+        with patch("src.compression.to_thread") as to_thread:
+            await compress(body, "gzip", CompressionConfig(OFFLOAD_SIZE=len(body) + 1))
+            to_thread.assert_not_called()
+
+        offloaded: bytes = await compress(body, "gzip", CompressionConfig(OFFLOAD_SIZE=len(body)))
+        assert decompress(offloaded) == body
+
+
+class TestPageCache:
+    def test_lru_eviction_by_entries(self) -> None:
+        cache: PageCache = build_cache(max_entries=2)
+        cache.put("a", 1, b"a")
+        cache.put("b", 1, b"b")
+        cache.get("a")
+        cache.put("c", 1, b"c")
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_older_version_does_not_replace_newer_page(self) -> None:
+        cache: PageCache = build_cache()
+        newer: CachedPage = cache.put("a", 5, b"newer")
+
+        assert cache.put("a", 4, b"older") is newer
+        assert cache.get("a") is newer
+        assert cache.put("a", 6, b"newest").body == b"newest"
+        assert cache._bytes == len(b"newest")
+
+    @pytest.mark.asyncio
+    async def test_variants_count_towards_byte_budget(self) -> None:
+        cache: PageCache = build_cache(max_bytes=150)
+        page: CachedPage = cache.put("a", 1, b"x" * 100)
+        cache.put("b", 1, b"y" * 40)
+
+        with patch("src.page_cache.compress", return_value=b"z" * 20) as compressed:
+            assert await cache.encoded(page, "gzip") == b"z" * 20
+            assert await cache.encoded(page, "gzip") == b"z" * 20
+            compressed.assert_called_once()
+
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+
+    @pytest.mark.asyncio
+    async def test_response_negotiates_encoding(self) -> None:
+        cache: PageCache = build_cache()
+        body: bytes = b'{"pvz_list":[]}' * 10
+        page: CachedPage = cache.put("a", 1, body)
+
+        response: Response = await cache.response(page, "br;q=0, gzip", {"ETag": 'W/"1-a"'})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == 'W/"1-a"'
+        assert decompress(response.body) == body
+        assert "gzip" in page.encoded
+
+    @pytest.mark.asyncio
+    async def test_small_bodies_are_not_compressed(self) -> None:
+        cache: PageCache = build_cache(min_size=1024)
+        page: CachedPage = cache.put("a", 1, b"{}")
+
+        response: Response = await cache.response(page, "gzip", {})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.body == b"{}"
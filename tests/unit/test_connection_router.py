@@ -0,0 +1,192 @@
+import pytest
+from contextlib import asynccontextmanager
+from contextvars import Token
+from typing import Any, AsyncIterator, Dict, List, Optional
+from unittest.mock import AsyncMock, MagicMock
+from psycopg.sql import Composable
+from postgres.config import REQUEST_STATEMENT_TIMEOUT, ConnectionRouter, replica_conninfos
+
+
+class FakeConnection:
+    def __init__(self, name: str, lag: float = 0.0) -> None:
+        self.name: str = name
+        self.lag: float = lag
+        self.broken: bool = False
+        self.rollback: AsyncMock = AsyncMock()
+        self.autocommit: bool = False
+        self.settings: List[str] = []
+
+    async def set_autocommit(self, value: bool) -> None:
+        self.autocommit = value
+
+    async def execute(self, query: Any) -> MagicMock:
+        if isinstance(query, Composable) or "statement_timeout" in query:
+            assert self.autocommit
+            self.settings.append(query.as_string(None) if isinstance(query, Composable) else query)
+        cursor: MagicMock = MagicMock()
+        cursor.fetchone = AsyncMock(return_value=(self.lag,))
+        return cursor
+
+    async def __aenter__(self) -> "FakeConnection":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+
+class FakePool:
+    def __init__(self, connection: FakeConnection, unavailable: bool = False) -> None:
+        self.connection_object: FakeConnection = connection
+        self.unavailable: bool = unavailable
+        self.open: AsyncMock = AsyncMock()
+        self.close: AsyncMock = AsyncMock()
+        self.putconn: AsyncMock = AsyncMock()
+        self.getconn_calls: int = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[FakeConnection]:
+        yield self.connection_object
+
+    async def getconn(self, timeout: Optional[float] = None) -> FakeConnection:
+        self.getconn_calls += 1
+        if self.unavailable:
+            raise Exception("PoolTimeout")
+        return self.connection_object
+
+
+def build_router(
+        pools: Dict[str, FakePool],
+        replicas: List[str],
+        max_lag: float = 5.0,
+        statement_budgets: Optional[Dict[str, float]] = None
+) -> ConnectionRouter:
+    return ConnectionRouter(
+        primary_conninfo="primary",
+        replica_conninfos=replicas,
+        max_lag=max_lag,
+        lag_check_interval=60.0,
+        acquire_timeout=0.1,
+        pool_factory=lambda conninfo: pools[conninfo],  # type: ignore[arg-type,return-value]
+        statement_budgets=statement_budgets or {},
+    )
+
+
+class TestReplicaConninfos:
+    def test_replica_dsns_are_split_and_get_timezone(self) -> None:
+        config: MagicMock = MagicMock(REPLICA_DSNS="host=r1 port=5433; ;host=r2", DB_TIMEZONE="Europe/Moscow")
+
+        conninfos: List[str] = replica_conninfos(config)
+
+        assert len(conninfos) == 2
+        assert conninfos[0].startswith("host=r1 port=5433")
+        assert "timezone=Europe/Moscow" in conninfos[1]
+
+
+class TestConnectionRouter:
+    @pytest.mark.asyncio
+    async def test_writes_go_to_primary(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1"))}
+        router: ConnectionRouter = build_router(pools, ["r1"])
+
+        async with router.primary() as connection:
+            assert connection.name == "primary"  # type: ignore[attr-defined]
+
+        assert pools["r1"].getconn_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_reads_round_robin_over_replicas(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1")),
+                                      "r2": FakePool(FakeConnection("r2"))}
+        router: ConnectionRouter = build_router(pools, ["r1", "r2"])
+
+        used: List[str] = []
+        for _ in range(4):
+            async with router.replica() as connection:
+                used.append(connection.name)  # type: ignore[attr-defined]
+
+        assert used == ["r1", "r2", "r1", "r2"]
+        assert pools["r1"].putconn.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1", lag=30.0))}
+        router: ConnectionRouter = build_router(pools, ["r1"], max_lag=5.0)
+
+        async with router.replica() as connection:
+            assert connection.name == "primary"  # type: ignore[attr-defined]
+        pools["r1"].connection_object.rollback.assert_awaited_once()
+        pools["r1"].putconn.assert_awaited_once()
+
+        # Отставание закешировано до следующей проверки - реплика не запрашивается повторно
+        async with router.replica() as connection:
+            assert connection.name == "primary"  # type: ignore[attr-defined]
+        assert pools["r1"].getconn_calls == 1
+
+        # Чтение с большей допустимой задержкой может использовать ту же реплику
+        async with router.replica(max_lag=60.0) as connection:
+            assert connection.name == "r1"  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_unavailable_replica_falls_back_to_primary(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1"), unavailable=True)}
+        router: ConnectionRouter = build_router(pools, ["r1"])
+
+        async with router.replica() as connection:
+            assert connection.name == "primary"  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_open_and_close_all_pools(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1"))}
+        router: ConnectionRouter = build_router(pools, ["r1"])
+
+        await router.open()
+        await router.open()
+        await router.close()
+
+        for pool in pools.values():
+            pool.open.assert_awaited_once()
+            pool.close.assert_awaited_once()
+
+
+class TestStatementTimeout:
+    @pytest.mark.asyncio
+    async def test_set_only_when_budget_changes(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary"))}
+        router: ConnectionRouter = build_router(pools, [], statement_budgets={"SearchProducts": 30.0})
+        connection: FakeConnection = pools["primary"].connection_object
+
+        async with router.primary():
+            pass
+        assert connection.settings == []
+
+        for _ in range(2):
+            async with router.primary(budget="SearchProducts"):
+                assert not connection.autocommit
+        assert connection.settings == ["SET statement_timeout = 30000"]
+
+        async with router.primary():
+            pass
+        assert connection.settings == ["SET statement_timeout = 30000", "RESET statement_timeout"]
+
+    @pytest.mark.asyncio
+    async def test_request_deadline_caps_budget(self) -> None:
+        pools: Dict[str, FakePool] = {"primary": FakePool(FakeConnection("primary")),
+                                      "r1": FakePool(FakeConnection("r1"))}
+        router: ConnectionRouter = build_router(pools, ["r1"], statement_budgets={"GetPVZInfo": 10.0})
+
+        token: Token = REQUEST_STATEMENT_TIMEOUT.set(2.5)
+        try:
+            assert router.statement_timeout("GetPVZInfo") == 2.5
+            async with router.replica(budget="GetPVZInfo") as connection:
+                assert connection.name == "r1"  # type: ignore[attr-defined]
+        finally:
+            REQUEST_STATEMENT_TIMEOUT.reset(token)
+
+        assert pools["r1"].connection_object.settings == ["SET statement_timeout = 2500"]
+        assert router.statement_timeout("GetPVZInfo") == 10.0
+        assert router.statement_timeout() is None
@@ -0,0 +1,105 @@
+import pytest
+from asyncio import CancelledError, Event, sleep, wait_for
+from typing import Dict, List, Optional
+from fastapi import BackgroundTasks, FastAPI
+from httpx import ASGITransport, AsyncClient, Response
+from starlette import status
+from starlette.types import Message
+from postgres.config import REQUEST_STATEMENT_TIMEOUT
+from src.deadlines import DeadlineConfig, RequestDeadlineMiddleware
+from src.metrics import METRICS
+
+
+class Probe:
+    def __init__(self) -> None:
+        self.statement_timeout: Optional[float] = None
+        self.cancelled: Event = Event()
+        self.background_done: Event = Event()
+
+
+def build_app(probe: Probe, config: DeadlineConfig) -> FastAPI:
+    app: FastAPI = FastAPI()
+
+    @app.get("/pvz-info")
+    async def pvz_info(delay: float = 0.0) -> Dict[str, bool]:
+        probe.statement_timeout = REQUEST_STATEMENT_TIMEOUT.get()
+        try:
+            await sleep(delay)
+        except CancelledError:
+            probe.cancelled.set()
+            raise
+        return {"status": True}
+
+    @app.get("/pvz")
+    async def pvz(background_tasks: BackgroundTasks) -> Dict[str, bool]:
+        async def after_response() -> None:
+            await sleep(0.01)
+            probe.background_done.set()
+
+        background_tasks.add_task(after_response)
+        return {"status": True}
+
+    app.add_middleware(RequestDeadlineMiddleware, config=config)
+    return app
+
+
+def build_client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+class TestRequestDeadlineMiddleware:
+    @pytest.mark.asyncio
+    async def test_route_budget_becomes_statement_timeout(self) -> None:
+        probe: Probe = Probe()
+        async with build_client(build_app(probe, DeadlineConfig(ROUTE_DEADLINES={"/pvz-info": 2.0}))) as client:
+            response: Response = await client.get("/pvz-info")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert probe.statement_timeout == 2.0
+        assert REQUEST_STATEMENT_TIMEOUT.get() is None
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_504(self) -> None:
+        probe: Probe = Probe()
+        before: float = METRICS.get("requests_cancelled_total", route="/pvz-info", reason="deadline")
+        async with build_client(build_app(probe, DeadlineConfig(ROUTE_DEADLINES={"/pvz-info": 0.05}))) as client:
+            response: Response = await client.get("/pvz-info", params={"delay": 5})
+
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        assert probe.cancelled.is_set()
+        assert METRICS.get("requests_cancelled_total", route="/pvz-info", reason="deadline") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_request(self) -> None:
+        probe: Probe = Probe()
+        app: FastAPI = build_app(probe, DeadlineConfig(ROUTE_DEADLINES={}))
+        incoming: List[Message] = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent: List[Message] = []
+
+        async def receive() -> Message:
+            if incoming:
+                return incoming.pop(0)
+            await sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            sent.append(message)
+
+        scope: Dict = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/pvz-info", "raw_path": b"/pvz-info", "query_string": b"delay=5", "root_path": "",
+            "headers": [], "server": ("test", 80), "client": ("test", 1234), "app": app,
+        }
+        await wait_for(app(scope, receive, send), timeout=1)
+
+        assert probe.cancelled.is_set()
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_background_tasks_survive_normal_disconnect(self) -> None:
+        probe: Probe = Probe()
+        async with build_client(build_app(probe, DeadlineConfig())) as client:
+            response: Response = await client.get("/pvz")
+
+        assert response.status_code == status.HTTP_200_OK
+        await wait_for(probe.background_done.wait(), timeout=1)
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
-from typing import Generator, Dict, List, Any
+from asyncio import gather, sleep
+from typing import Generator, Dict, List, Any, Optional
 from fastapi import Response
 from datetime import datetime
 from jose import ExpiredSignatureError
@@ -9,6 +10,7 @@ from src.sso.dependencies import (
     register,
     login,
     init_pvz,
+    import_pvz,
     receptions,
     add_product,
     delete_last_product,
@@ -20,6 +22,7 @@ from src.sso.dto import (
     RegisterUserResponse,
     LoginUserResponse,
     InitPVZResponse,
+    ImportPVZResponse,
     InitActiveReceptionsResponse,
     AddProductResponse,
     DeleteProductResponse,
@@ -27,13 +30,23 @@ from src.sso.dto import (
     PVZInfoResponse
 )
 from src.sso.constants import ERRORS_MAPPING, VALID_USER_TYPES
-from src.tokens import JWTConfig
+from src.sso.etag import params_digest
+from src.page_cache import CachedPage, PageCache
+from postgres.dto import (
+    PVZInfoVersionRow,
+    RegisteredUserRow,
+    PVZRow,
+    ReceptionRow,
+    ActiveReceptionRow,
+    ProductRow,
+)
+from src.tokens import JWTConfig, token_digest
 from postgres.sql.mutation import (
     UserRegisterMutation,
     UserLoginMutation,
-    UpdateAccessTokenMutation,
     GetMe,
     PVZ,
+    ImportPVZ,
     CheckActiveAccepting,
     InitReceptions,
     CheckAcceptingStatus,
@@ -75,12 +88,6 @@ def mock_user_login_mutation() -> Generator[AsyncMock, None, None]:
         yield mock
 
 
-@pytest.fixture
-def mock_update_access_token_mutation() -> Generator[AsyncMock, None, None]:
-    with patch.object(UpdateAccessTokenMutation, "update", new_callable=AsyncMock) as mock:
-        yield mock
-
-
 @pytest.fixture
 def mock_get_me() -> Generator[AsyncMock, None, None]:
     with patch.object(GetMe, "get", new_callable=AsyncMock) as mock:
@@ -93,6 +100,19 @@ def mock_pvz_create() -> Generator[AsyncMock, None, None]:
         yield mock
 
 
+@pytest.fixture
+def mock_import_pvz() -> Generator[AsyncMock, None, None]:
+    with patch.object(ImportPVZ, "load", new_callable=AsyncMock) as mock:
+        yield mock
+
+
+@pytest.fixture
+def mock_import_request() -> Generator[MagicMock, None, None]:
+    request: MagicMock = MagicMock()
+    request.headers = {"content-type": "text/csv"}
+    yield request
+
+
 @pytest.fixture
 def mock_check_active_accepting() -> Generator[AsyncMock, None, None]:
     with patch.object(CheckActiveAccepting, "check", new_callable=AsyncMock) as mock:
@@ -141,6 +161,13 @@ def mock_get_pvz_info() -> Generator[MagicMock, None, None]:
         yield mock
 
 
+@pytest.fixture
+def pvz_info_pages() -> Generator[PageCache, None, None]:
+    pages: PageCache = PageCache(name="test", max_entries=8, max_bytes=1024 * 1024)
+    with patch("src.sso.dependencies.PVZ_INFO_PAGES", pages):
+        yield pages
+
+
 class TestGetCurrentUser:
     @pytest.mark.asyncio
     async def test_get_current_user_success(
@@ -152,7 +179,7 @@ class TestGetCurrentUser:
         token: str = "valid_token"
         payload: Dict[str, str] = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
         mock_jwt_decode.return_value = payload
-        mock_get_me.return_value = token
+        mock_get_me.return_value = token_digest(token)
 
         result: GetCurrentUserResponse = await get_current_user(mock_response, token)
 
@@ -169,6 +196,106 @@ class TestGetCurrentUser:
         assert result.result == {"status": True}
         assert result.errors is None
 
+    @pytest.mark.asyncio
+    async def test_get_current_user_stale_replica_token_rechecked_on_primary(
+        self,
+        mock_jwt_decode: MagicMock,
+        mock_get_me: AsyncMock,
+        mock_response: MagicMock
+    ) -> None:
+        payload: Dict[str, str] = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
+        mock_jwt_decode.return_value = payload
+        mock_get_me.side_effect = [token_digest("previous_token"), token_digest("valid_token")]
+
+        result: GetCurrentUserResponse = await get_current_user(mock_response, "valid_token")
+
+        assert mock_get_me.await_count == 2
+        assert result.message == "Authorization successful"
+        assert result.errors is None
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_session_missing_on_replica_rechecked_on_primary(
+        self,
+        mock_jwt_decode: MagicMock,
+        mock_get_me: AsyncMock,
+        mock_response: MagicMock
+    ) -> None:
+        payload: Dict[str, str] = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
+        mock_jwt_decode.return_value = payload
+        used_primary: List[bool] = []
+
+        async def get_me(self: GetMe) -> Optional[bytes]:
+            used_primary.append(self.use_primary)
+            return token_digest("valid_token") if self.use_primary else None
+
+        with patch.object(GetMe, "get", get_me):
+            result: GetCurrentUserResponse = await get_current_user(mock_response, "valid_token")
+
+        assert used_primary == [False, True]
+        assert result.message == "Authorization successful"
+        assert result.errors is None
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_stale_token_burst_shares_primary_recheck(
+        self,
+        mock_jwt_decode: MagicMock,
+        mock_response: MagicMock
+    ) -> None:
+        mock_jwt_decode.return_value = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
+        used_primary: List[bool] = []
+
+        async def get_me(self: GetMe) -> Optional[bytes]:
+            used_primary.append(self.use_primary)
+            await sleep(0.01)
+            return token_digest("current_token")
+
+        with patch.object(GetMe, "get", get_me):
+            results: List[GetCurrentUserResponse] = await gather(
+                *(get_current_user(mock_response, "revoked_token") for _ in range(5))
+            )
+
+        assert used_primary == [False, True]
+        assert all(result.errors == "Некорректный токен" for result in results)
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_new_token_does_not_join_primary_recheck(
+        self,
+        mock_jwt_decode: MagicMock,
+        mock_response: MagicMock
+    ) -> None:
+        mock_jwt_decode.return_value = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
+        used_primary: List[bool] = []
+
+        async def get_me(self: GetMe) -> Optional[bytes]:
+            used_primary.append(self.use_primary)
+            # Первое обращение к primary начато до коммита входа и видит прежний токен
+            session: Optional[bytes] = token_digest("old_token" if used_primary.count(True) == 1 else "new_token")
+            await sleep(0.01)
+            return session if self.use_primary else None
+
+        with patch.object(GetMe, "get", get_me):
+            stale, fresh = await gather(
+                get_current_user(mock_response, "old_token"), get_current_user(mock_response, "new_token")
+            )
+
+        assert used_primary.count(True) == 2
+        assert (stale.message, fresh.message) == ("Authorization successful", "Authorization successful")
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_no_session(
+        self,
+        mock_jwt_decode: MagicMock,
+        mock_get_me: AsyncMock,
+        mock_response: MagicMock
+    ) -> None:
+        mock_jwt_decode.return_value = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
+        mock_get_me.return_value = None
+
+        result: GetCurrentUserResponse = await get_current_user(mock_response, "valid_token")
+
+        assert mock_get_me.await_count == 2
+        assert result.errors == "Некорректный токен"
+
     @pytest.mark.asyncio
     async def test_get_current_user_no_token(
         self,
@@ -202,7 +329,7 @@ class TestGetCurrentUser:
     ) -> None:
         payload: Dict[str, str] = {"sub": "test@example.com", "role": VALID_USER_TYPES["client"]}
         mock_jwt_decode.return_value = payload
-        mock_get_me.return_value = "different_token"
+        mock_get_me.return_value = token_digest("different_token")
 
         result: GetCurrentUserResponse = await get_current_user(mock_response, "invalid_token")
 
@@ -218,7 +345,7 @@ class TestGetCurrentUser:
     ) -> None:
         payload: Dict[str, str] = {"sub": "test@example.com", "role": "invalid_role"}
         mock_jwt_decode.return_value = payload
-        mock_get_me.return_value = "valid_token"
+        mock_get_me.return_value = token_digest("valid_token")
 
         result: GetCurrentUserResponse = await get_current_user(mock_response, "valid_token")
 
@@ -234,7 +361,8 @@ class TestRegister:
         mock_create_access_token: MagicMock
     ) -> None:
         mock_create_access_token.return_value = MagicMock(access_token="new_token")
-        mock_user_register_mutation.return_value = (1, "testuser", VALID_USER_TYPES["client"], "test@example.com")
+        mock_user_register_mutation.return_value = RegisteredUserRow(
+            id=1, user_type=VALID_USER_TYPES["client"], username="testuser", email="test@example.com")
 
         result: RegisterUserResponse = await register(
             username="testuser",
@@ -274,17 +402,15 @@ class TestLogin:
     @pytest.mark.asyncio
     async def test_login_success(
         self,
-        mock_user_login_mutation: AsyncMock,
-        mock_update_access_token_mutation: AsyncMock
+        mock_user_login_mutation: AsyncMock
     ) -> None:
-        mock_user_login_mutation.return_value = (
-            "testuser", "hashed_password", VALID_USER_TYPES["client"], "test@example.com")
-        mock_update_access_token_mutation.return_value = "new_token"
+        mock_user_login_mutation.return_value = "new_token"
 
-        result: LoginUserResponse = await login(username="testuser", password="password123")
+        result: LoginUserResponse = await login(
+            username="testuser", password="password123",
+            current_user=GetCurrentUserResponse(errors="Токен авторизации не был найден"))
 
         mock_user_login_mutation.assert_called_once()
-        mock_update_access_token_mutation.assert_called_once()
         assert result.result == {"success": True}
         assert result.token == "new_token"
         assert result.errors is None
@@ -296,11 +422,26 @@ class TestLogin:
     ) -> None:
         mock_user_login_mutation.side_effect = Exception("Пользователь не найден")
 
-        result: LoginUserResponse = await login(username="testuser", password="password123")
+        result: LoginUserResponse = await login(
+            username="testuser", password="password123",
+            current_user=GetCurrentUserResponse(errors="Токен авторизации не был найден"))
 
         assert result.errors == "Пользователь не найден"
         assert result.result is None
 
+    @pytest.mark.asyncio
+    async def test_already_authorized_does_not_reissue_token(
+        self,
+        mock_user_login_mutation: AsyncMock
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful", email="test@example.com", role=VALID_USER_TYPES["client"])
+
+        result: LoginUserResponse = await login(username="testuser", password="password123", current_user=current_user)
+
+        assert result.errors == "Вы уже авторизованы"
+        mock_user_login_mutation.assert_not_called()
+
 
 class TestInitPVZ:
     @pytest.mark.asyncio
@@ -314,14 +455,15 @@ class TestInitPVZ:
             role=VALID_USER_TYPES["moderator"],
             result={"status": True}
         )
-        mock_pvz_create.return_value = (1, "Москва", "2025-04-21T10:00:00+03:00")
+        registered_at: datetime = datetime.fromisoformat("2025-04-21T10:00:00+03:00")
+        mock_pvz_create.return_value = PVZRow(id=1, city="Москва", registered_at=registered_at)
 
         result: InitPVZResponse = await init_pvz(city="Москва", current_user=current_user)
 
         mock_pvz_create.assert_called_once()
         assert result.id == 1
         assert result.city == "Москва"
-        assert result.registered_at == "2025-04-21T10:00:00+03:00"
+        assert result.registered_at == registered_at
         assert result.result == {"status": True}
         assert result.errors is None
 
@@ -358,6 +500,69 @@ class TestInitPVZ:
         assert result.registered_at is None
 
 
+class TestImportPVZ:
+    @pytest.mark.asyncio
+    async def test_import_pvz_success(
+        self,
+        mock_import_pvz: AsyncMock,
+        mock_import_request: MagicMock
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["moderator"],
+            result={"status": True}
+        )
+        mock_import_pvz.return_value = [1, 2, 3]
+
+        result: ImportPVZResponse = await import_pvz(request=mock_import_request, current_user=current_user)
+
+        mock_import_pvz.assert_called_once()
+        mock_import_request.stream.assert_called_once()
+        assert result.ids == [1, 2, 3]
+        assert result.total == 3
+        assert result.result == {"status": True}
+        assert result.errors is None
+
+    @pytest.mark.asyncio
+    async def test_import_pvz_insufficient_role(
+        self,
+        mock_import_pvz: AsyncMock,
+        mock_import_request: MagicMock
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["client"],
+            result={"status": True}
+        )
+
+        result: ImportPVZResponse = await import_pvz(request=mock_import_request, current_user=current_user)
+
+        mock_import_pvz.assert_not_called()
+        assert result.errors == "У вас недостаточно прав - необходимая роль: moderator"
+        assert result.ids is None
+
+    @pytest.mark.asyncio
+    async def test_import_pvz_invalid_city(
+        self,
+        mock_import_pvz: AsyncMock,
+        mock_import_request: MagicMock
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["moderator"],
+            result={"status": True}
+        )
+        mock_import_pvz.side_effect = Exception("invalid input value for enum city_type: \"Омск\"")
+
+        result: ImportPVZResponse = await import_pvz(request=mock_import_request, current_user=current_user)
+
+        assert result.errors == ERRORS_MAPPING["invalid input value for enum city_type:"]
+        assert result.ids is None
+
+
 class TestReceptions:
     @pytest.mark.asyncio
     async def test_receptions_success(
@@ -372,7 +577,7 @@ class TestReceptions:
             result={"status": True}
         )
         mock_check_active_accepting.return_value = None
-        mock_init_receptions.return_value = (1, 1, "in_progress")
+        mock_init_receptions.return_value = ReceptionRow(id=1, pvz_id=1, status="in_progress")
 
         result: InitActiveReceptionsResponse = await receptions(pvz_id=1, current_user=current_user)
 
@@ -381,6 +586,7 @@ class TestReceptions:
         assert result.receptions_id == 1
         assert result.pvz_id == 1
         assert result.status == "in_progress"
+        assert result.product_count == 0
         assert result.result == {"status": True}
         assert result.errors is None
 
@@ -431,7 +637,8 @@ class TestAddProduct:
             result={"status": True}
         )
         mock_check_accepting_status.return_value = None
-        mock_add_product.return_value = (1, 1, "электроника", "2025-04-21T10:00:00+03:00")
+        mock_add_product.return_value = ProductRow(
+            id=1, accepting_id=1, type="электроника", datetime=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
 
         result: AddProductResponse = await add_product(
             accepting_id=1, product_type="электроника", current_user=current_user)
@@ -441,7 +648,7 @@ class TestAddProduct:
         assert result.product_id == 1
         assert result.accepting_id == 1
         assert result.type == "электроника"
-        assert result.datetime == "2025-04-21T10:00:00+03:00"
+        assert result.datetime == "2025-04-21 10:00:00+03:00"
         assert result.result == {"status": True}
         assert result.errors is None
 
@@ -495,8 +702,9 @@ class TestDeleteLastProduct:
             role=VALID_USER_TYPES["client"],
             result={"status": True}
         )
-        mock_get_active_accepting.return_value = (1, [1, 2, 3])
-        mock_delete_last_product.return_value = (3, 1, "электроника", "2025-04-21T10:00:00+03:00")
+        mock_get_active_accepting.return_value = ActiveReceptionRow(id=1, product_id=[1, 2, 3])
+        mock_delete_last_product.return_value = ProductRow(
+            id=3, accepting_id=1, type="электроника", datetime=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
 
         result: DeleteProductResponse = await delete_last_product(pvz_id=1, current_user=current_user)
 
@@ -505,7 +713,7 @@ class TestDeleteLastProduct:
         assert result.product_id == 3
         assert result.accepting_id == 1
         assert result.type == "электроника"
-        assert result.datetime == "2025-04-21T10:00:00+03:00"
+        assert result.datetime == "2025-04-21 10:00:00+03:00"
         assert result.result == {"status": True}
         assert result.errors is None
 
@@ -520,7 +728,7 @@ class TestDeleteLastProduct:
             role=VALID_USER_TYPES["client"],
             result={"status": True}
         )
-        mock_get_active_accepting.return_value = (1, [])
+        mock_get_active_accepting.return_value = ActiveReceptionRow(id=1, product_id=[])
 
         result: DeleteProductResponse = await delete_last_product(pvz_id=1, current_user=current_user)
 
@@ -559,7 +767,10 @@ class TestCloseLastReception:
             role=VALID_USER_TYPES["client"],
             result={"status": True}
         )
-        mock_close_reception.return_value = (1, 1, "close")
+        mock_close_reception.return_value = ReceptionRow(
+            id=1, pvz_id=1, status="close", product_count=3,
+            product_counts={"электроника": 1, "одежда": 2, "обувь": 0}
+        )
 
         result: CloseReceptionResponse = await close_last_reception(pvz_id=1, current_user=current_user)
 
@@ -567,6 +778,8 @@ class TestCloseLastReception:
         assert result.reception_id == 1
         assert result.pvz_id == 1
         assert result.status == "close"
+        assert result.product_count == 3
+        assert result.product_counts == {"электроника": 1, "одежда": 2, "обувь": 0}
         assert result.result == {"status": True}
         assert result.errors is None
 
@@ -607,7 +820,8 @@ class TestGetPVZInfo:
     @pytest.mark.asyncio
     async def test_get_pvz_info_success(
         self,
-        mock_get_pvz_info: MagicMock
+        mock_get_pvz_info: MagicMock,
+        pvz_info_pages: PageCache
     ) -> None:
         current_user: GetCurrentUserResponse = GetCurrentUserResponse(
             message="Authorization successful",
@@ -619,7 +833,9 @@ class TestGetPVZInfo:
             {"id": 1, "city": "Москва", "registered_at": "2025-04-21T10:00:00+03:00", "receptions": []}]
         total: int = 1
 
-        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(pvz_data, total))
+        version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=42, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(pvz_data, total, version))
 
         start_date_str: str = "2025-04-01T00:00:00"
         end_date_str: str = "2025-04-30T23:59:59"
@@ -638,7 +854,9 @@ class TestGetPVZInfo:
             page=1,
             page_size=10,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            known_version=None,
+            summary=False
         )
         mock_get_pvz_info.return_value.get.assert_called_once()
 
@@ -648,6 +866,142 @@ class TestGetPVZInfo:
         assert result.page_size == 10
         assert result.result == {"status": True}
         assert result.errors is None
+        assert result.validators is not None
+        assert result.validators.etag.startswith('W/"42-')
+        assert result.validators.not_modified is False
+        assert result.cached_page is not None
+        assert result.cached_page.version == 42
+        assert b'"pvz_list":[{"id":1' in result.cached_page.body
+
+    @pytest.mark.asyncio
+    async def test_get_pvz_info_served_from_page_cache(
+        self,
+        mock_get_pvz_info: MagicMock,
+        pvz_info_pages: PageCache
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["client"],
+            result={"status": True}
+        )
+        digest: str = params_digest(1, 10, "2025-04-01T00:00:00", "2025-04-30T23:59:59", False)
+        cached_page: CachedPage = pvz_info_pages.put(digest, 42, b'{"pvz_list":[]}')
+        version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=42, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(None, 0, version))
+
+        result: PVZInfoResponse = await get_pvz_info(
+            start_date="2025-04-01T00:00:00",
+            end_date="2025-04-30T23:59:59",
+            page=1,
+            page_size=10,
+            current_user=current_user
+        )
+
+        assert mock_get_pvz_info.call_args.kwargs["known_version"] == 42
+        assert result.validators is not None
+        assert result.validators.not_modified is False
+        assert result.cached_page is cached_page
+
+    @pytest.mark.asyncio
+    async def test_get_pvz_info_lagging_replica_keeps_newer_cached_page(
+        self,
+        mock_get_pvz_info: MagicMock,
+        pvz_info_pages: PageCache
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["client"],
+            result={"status": True}
+        )
+        digest: str = params_digest(1, 10, "2025-04-01T00:00:00", "2025-04-30T23:59:59", False)
+        cached_page: CachedPage = pvz_info_pages.put(digest, 43, b'{"pvz_list":[]}')
+        pvz_data: List[Dict[str, Any]] = [
+            {"id": 1, "city": "Москва", "registered_at": "2025-04-21T10:00:00+03:00", "receptions": []}]
+        version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=41, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(pvz_data, 1, version))
+
+        result: PVZInfoResponse = await get_pvz_info(
+            start_date="2025-04-01T00:00:00",
+            end_date="2025-04-30T23:59:59",
+            page=1,
+            page_size=10,
+            current_user=current_user
+        )
+
+        assert pvz_info_pages.get(digest) is cached_page
+        assert result.validators is not None
+        assert result.validators.etag.startswith('W/"41-')
+        assert result.cached_page is not None
+        assert result.cached_page.version == 41
+        assert b'"pvz_list":[{"id":1' in result.cached_page.body
+
+    @pytest.mark.asyncio
+    async def test_get_pvz_info_stale_etag_served_from_page_cache(
+        self,
+        mock_get_pvz_info: MagicMock,
+        pvz_info_pages: PageCache
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["client"],
+            result={"status": True}
+        )
+        digest: str = params_digest(1, 10, "2025-04-01T00:00:00", "2025-04-30T23:59:59", False)
+        cached_page: CachedPage = pvz_info_pages.put(digest, 42, b'{"pvz_list":[]}')
+        version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=42, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(None, 0, version))
+
+        result: PVZInfoResponse = await get_pvz_info(
+            start_date="2025-04-01T00:00:00",
+            end_date="2025-04-30T23:59:59",
+            page=1,
+            page_size=10,
+            if_none_match=f'W/"41-{digest}"',
+            current_user=current_user
+        )
+
+        assert mock_get_pvz_info.call_args.kwargs["known_version"] == 42
+        assert result.validators is not None
+        assert result.validators.not_modified is False
+        assert result.cached_page is cached_page
+
+    @pytest.mark.asyncio
+    async def test_get_pvz_info_not_modified(
+        self,
+        mock_get_pvz_info: MagicMock,
+        pvz_info_pages: PageCache
+    ) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful",
+            email="test@example.com",
+            role=VALID_USER_TYPES["moderator"],
+            result={"status": True}
+        )
+        digest: str = params_digest(1, 10, "2025-04-01T00:00:00", "2025-04-30T23:59:59", False)
+        version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=42, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+        mock_get_pvz_info.return_value.get = AsyncMock(return_value=(None, 0, version))
+
+        result: PVZInfoResponse = await get_pvz_info(
+            start_date="2025-04-01T00:00:00",
+            end_date="2025-04-30T23:59:59",
+            page=1,
+            page_size=10,
+            if_none_match=f'W/"42-{digest}"',
+            current_user=current_user
+        )
+
+        assert mock_get_pvz_info.call_args.kwargs["known_version"] == 42
+        assert result.validators is not None
+        assert result.validators.not_modified is True
+        assert result.validators.etag == f'W/"42-{digest}"'
+        assert result.pvz_list is None
 
     @pytest.mark.asyncio
     async def test_get_pvz_info_unauthorized(
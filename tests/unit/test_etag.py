@@ -0,0 +1,39 @@
+from datetime import datetime
+from src.dto import CacheValidators
+from src.sso.etag import params_digest, make_etag, etag_version
+
+
+class TestETag:
+    def test_digest_depends_on_params(self) -> None:
+        assert params_digest(1, 10, "a", "b") == params_digest(1, 10, "a", "b")
+        assert params_digest(1, 10, "a", "b") != params_digest(2, 10, "a", "b")
+
+    def test_etag_version_roundtrip(self) -> None:
+        digest: str = params_digest(1, 10, "a", "b")
+
+        assert etag_version(make_etag(7, digest), digest) == 7
+
+    def test_etag_version_from_list(self) -> None:
+        digest: str = params_digest(1, 10, "a", "b")
+        header: str = f'"other", W/"3-{params_digest(2, 10, "a", "b")}", {make_etag(5, digest)}'
+
+        assert etag_version(header, digest) == 5
+
+    def test_etag_version_for_other_params(self) -> None:
+        assert etag_version(make_etag(7, params_digest(2)), params_digest(1)) is None
+
+    def test_etag_version_without_header(self) -> None:
+        assert etag_version(None, params_digest(1)) is None
+        assert etag_version("*", params_digest(1)) is None
+
+
+class TestCacheValidators:
+    def test_headers(self) -> None:
+        validators: CacheValidators = CacheValidators(
+            etag='W/"1-abc"', last_modified=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+
+        assert validators.headers() == {
+            "ETag": 'W/"1-abc"',
+            "Cache-Control": "private, no-cache",
+            "Last-Modified": "Mon, 21 Apr 2025 07:00:00 GMT",
+        }
@@ -0,0 +1,112 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Generator, List, Optional
+from unittest.mock import MagicMock, patch
+from postgres.config import DEFAULT_SHARD
+from postgres.sql.mutation import ExportProducts
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dependencies import export_products
+from src.sso.dto import ExportProductsResponse, GetCurrentUserResponse
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+
+
+class FakeCopy:
+    """COPY TO STDOUT: по сообщению протокола на строку CSV"""
+
+    def __init__(self, rows: List[bytes]) -> None:
+        self.rows: List[bytes] = rows
+
+    async def __aenter__(self) -> "FakeCopy":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+    async def __aiter__(self) -> AsyncIterator[memoryview]:
+        for row in self.rows:
+            yield memoryview(row)
+
+
+@pytest.fixture
+def statements() -> Generator[List[str], None, None]:
+    sent: List[str] = []
+    rows: List[bytes] = [b"product_id,type,datetime,reception_id,pvz_id,city\n"] + [
+        f"{index},обувь,2025-04-21 10:00:00+03,1,1,Москва\n".encode() for index in range(10)
+    ]
+
+    def copy(query: Any) -> FakeCopy:
+        sent.append(query.as_string())
+        return FakeCopy(rows)
+
+    cursor: MagicMock = MagicMock()
+    cursor.copy = copy
+
+    @asynccontextmanager
+    async def cursor_context() -> AsyncIterator[MagicMock]:
+        yield cursor
+
+    connection: MagicMock = MagicMock()
+    connection.cursor = cursor_context
+
+    @asynccontextmanager
+    async def replica(budget: Optional[str] = None, shard: int = DEFAULT_SHARD) -> AsyncIterator[MagicMock]:
+        yield connection
+
+    with patch("postgres.sql.mutation.replica", replica):
+        yield sent
+
+
+class TestExportProducts:
+    @pytest.mark.asyncio
+    async def test_rows_are_glued_into_chunks(self, statements: List[str]) -> None:
+        chunks: List[bytes] = [
+            chunk async for chunk in ExportProducts(start_date=START, end_date=END, chunk_size=128).stream()
+        ]
+
+        body: bytes = b"".join(chunks)
+        assert body.startswith(b"product_id,type,datetime,reception_id,pvz_id,city\n")
+        assert body.count(b"\n") == 11
+        assert len(chunks) < 11
+        assert all(len(chunk) >= 128 for chunk in chunks[:-1])
+
+    @pytest.mark.asyncio
+    async def test_dates_are_inlined_into_copy(self, statements: List[str]) -> None:
+        [_ async for _ in ExportProducts(start_date=START, end_date=END).stream()]
+
+        assert "TO STDOUT WITH (FORMAT csv, HEADER true)" in statements[0]
+        assert "'2025-04-01 00:00:00+03:00'::timestamptz" in statements[0]
+        assert "ORDER BY" not in statements[0]
+
+
+class TestExportProductsDependency:
+    @pytest.mark.asyncio
+    async def test_moderator_gets_parsed_range(self, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: ExportProductsResponse = await export_products(
+            start_date="2025-04-01T00:00:00+03:00",
+            end_date="2025-04-30T23:59:59+03:00",
+            current_user=user(VALID_USER_TYPES["moderator"])
+        )
+
+        assert (result.start_date, result.end_date, result.errors) == (START, END, None)
+
+    @pytest.mark.asyncio
+    async def test_client_is_forbidden(self, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: ExportProductsResponse = await export_products(
+            start_date="2025-04-01T00:00:00", end_date="2025-04-30T23:59:59",
+            current_user=user(VALID_USER_TYPES["client"])
+        )
+
+        assert result.errors == "У вас недостаточно прав - необходимая роль: moderator"
+        assert result.start_date is None
+
+    @pytest.mark.asyncio
+    async def test_reversed_range_is_rejected(self, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: ExportProductsResponse = await export_products(
+            start_date="2025-05-01T00:00:00", end_date="2025-04-01T00:00:00",
+            current_user=user(VALID_USER_TYPES["moderator"])
+        )
+
+        assert result.errors == "Начальная дата позже конечной"
@@ -15,7 +15,7 @@ def mock_getenv() -> Generator[MagicMock, None, None]:
 
 @pytest.fixture
 def mock_load_dotenv() -> Generator[MagicMock, None, None]:
-    with patch("src.tokens.load_dotenv") as mock:
+    with patch("src.tokens.load_env") as mock:
         yield mock
 
 
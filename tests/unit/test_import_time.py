@@ -0,0 +1,74 @@
+import pytest
+import sys
+from os import getenv
+from pathlib import Path
+from subprocess import run
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+from src.env import find_env_files, load_env
+
+ROOT: Path = Path(__file__).resolve().parents[2]
+# Бюджет импорта приложения (кумулятивное время src.main по -X importtime); на медленном CI задается окружением
+IMPORT_BUDGET_MS: float = float(getenv("IMPORT_TIME_BUDGET_MS", default=2000))
+# Загружаются только в lifespan или под __main__
+LAZY_MODULES: Tuple[str, ...] = ("uvicorn", "grpc", "google.protobuf")
+
+
+@pytest.fixture(scope="module")
+def app_import() -> Tuple[Dict[str, int], List[str]]:
+    """Отдельный интерпретатор: в процессе pytest приложение уже импортировано тестами"""
+    completed = run(
+        [
+            sys.executable, "-X", "importtime", "-c",
+            "import sys, src.main; print(' '.join(sys.modules))"
+        ],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line.split("|")
+        cumulative[name.strip()] = int(total)
+
+    return cumulative, completed.stdout.split()
+
+
+class TestImportTime:
+    def test_app_import_fits_budget(self, app_import: Tuple[Dict[str, int], List[str]]) -> None:
+        cumulative, _ = app_import
+        slowest: List[Tuple[int, str]] = sorted(
+            ((total, name) for name, total in cumulative.items() if "." not in name), reverse=True
+        )[:5]
+
+        assert cumulative["src.main"] / 1000 <= IMPORT_BUDGET_MS, f"Самые тяжелые импорты (мкс): {slowest}"
+
+    def test_optional_servers_are_not_imported(self, app_import: Tuple[Dict[str, int], List[str]]) -> None:
+        _, modules = app_import
+        assert [name for name in LAZY_MODULES if name in modules] == []
+
+
+class TestEnvFiles:
+    def test_nearest_file_wins_in_single_walk(self, tmp_path: Path) -> None:
+        nested: Path = tmp_path / "project" / "src"
+        nested.mkdir(parents=True)
+        (tmp_path / ".env.jwt.local").write_text("")
+        (tmp_path / ".env.postgres.local").write_text("")
+        (tmp_path / "project" / ".env.jwt.local").write_text("")
+
+        assert find_env_files(str(nested)) == (
+            str(tmp_path / "project" / ".env.jwt.local"),
+            str(tmp_path / ".env.postgres.local"),
+        )
+
+    def test_missing_files_are_skipped(self, tmp_path: Path) -> None:
+        assert find_env_files(str(tmp_path), (".env.missing.local",)) == ()
+
+    def test_env_is_loaded_once(self) -> None:
+        load_env.cache_clear()
+        with patch("dotenv.load_dotenv") as mock_load_dotenv:
+            first: Tuple[str, ...] = load_env()
+            second: Tuple[str, ...] = load_env()
+
+        assert first is second
+        assert mock_load_dotenv.call_count == len(first)
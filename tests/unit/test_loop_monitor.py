@@ -0,0 +1,51 @@
+import pytest
+from asyncio import sleep
+from logging import WARNING
+from time import sleep as blocking_sleep
+from src.loop_monitor import LoopLagMonitor, LoopMonitorConfig
+from src.metrics import METRICS
+
+
+def verify_password_on_loop() -> None:
+    blocking_sleep(0.3)
+
+
+class TestLoopLagMonitor:
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_measured(self) -> None:
+        monitor: LoopLagMonitor = LoopLagMonitor(LoopMonitorConfig(ENABLED=True, INTERVAL=0.02, BLOCK_THRESHOLD=0.1))
+        blocked_before: float = METRICS.get("event_loop_blocked_total")
+
+        monitor.start()
+        await sleep(0.05)
+        verify_password_on_loop()
+        await sleep(0.05)
+        await monitor.stop()
+
+        assert monitor.max_lag >= 0.2
+        assert METRICS.get("event_loop_blocked_total") == blocked_before + 1
+        assert METRICS.get("event_loop_lag_samples_total") > 0
+
+    @pytest.mark.asyncio
+    async def test_debug_mode_logs_blocking_stack(self, caplog: pytest.LogCaptureFixture) -> None:
+        monitor: LoopLagMonitor = LoopLagMonitor(
+            LoopMonitorConfig(ENABLED=True, INTERVAL=0.02, BLOCK_THRESHOLD=0.1, DEBUG=True))
+
+        with caplog.at_level(WARNING, logger="src.loop_monitor"):
+            monitor.start()
+            await sleep(0.05)
+            verify_password_on_loop()
+            await sleep(0.05)
+            await monitor.stop()
+
+        assert len(caplog.records) == 1
+        assert "verify_password_on_loop" in caplog.records[0].getMessage()
+
+    @pytest.mark.asyncio
+    async def test_disabled_monitor_does_not_start(self) -> None:
+        monitor: LoopLagMonitor = LoopLagMonitor(LoopMonitorConfig(ENABLED=False))
+
+        monitor.start()
+        await monitor.stop()
+
+        assert monitor.max_lag == 0.0
@@ -0,0 +1,48 @@
+import pytest
+from typing import Generator
+from unittest.mock import patch
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from starlette import status
+from src.metrics import METRICS, MetricsConfig, metrics_router
+
+METRICS.describe("metrics_test_total", "counter", "Счетчик для проверки /metrics")
+
+
+@pytest.fixture
+def app() -> Generator[FastAPI, None, None]:
+    application: FastAPI = FastAPI()
+    application.include_router(metrics_router)
+    with patch("src.metrics.METRICS_CONFIG", MetricsConfig(TOKEN="scrape-secret")):
+        yield application
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.asyncio
+    async def test_scrape_with_token(self, app: FastAPI) -> None:
+        METRICS.inc("metrics_test_total")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "metrics_test_total 1.0" in response.text
+
+    @pytest.mark.asyncio
+    async def test_missing_or_wrong_token_is_rejected(self, app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            missing = await client.get("/metrics")
+            wrong = await client.get("/metrics", headers={"Authorization": "Bearer guess"})
+
+        assert missing.status_code == wrong.status_code == status.HTTP_401_UNAUTHORIZED
+        assert wrong.headers["WWW-Authenticate"] == "Bearer"
+        assert "metrics_test_total" not in wrong.text
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_token(self) -> None:
+        application: FastAPI = FastAPI()
+        application.include_router(metrics_router)
+        with patch("src.metrics.METRICS_CONFIG", MetricsConfig(TOKEN="")):
+            async with AsyncClient(transport=ASGITransport(app=application), base_url="http://test") as client:
+                response = await client.get("/metrics", headers={"Authorization": "Bearer "})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
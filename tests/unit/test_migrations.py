@@ -0,0 +1,193 @@
+import pytest
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Set
+from unittest.mock import AsyncMock, MagicMock, patch
+from psycopg.errors import LockNotAvailable
+from psycopg.sql import SQL
+from postgres.dto import InitTableResponse
+from postgres.sql.init_tables import Tables
+from postgres.sql.migrations import (
+    Backfill,
+    ConcurrentIndex,
+    Migration,
+    MigrationRunner,
+    MigrationsConfig,
+    Statement,
+)
+
+CONFIG: MigrationsConfig = MigrationsConfig(
+    LOCK_TIMEOUT=1, LOCK_RETRIES=2, LOCK_RETRY_DELAY=0, BACKFILL_BATCH_SIZE=100, BACKFILL_PAUSE=0
+)
+
+
+class FakeConnection:
+    """Запоминает выполненный SQL; транзакции отмечаются BEGIN/COMMIT"""
+
+    def __init__(
+            self,
+            applied: Optional[Set[int]] = None,
+            index_valid: Optional[bool] = None,
+            rowcounts: Optional[List[int]] = None,
+            lock_failures: int = 0
+    ) -> None:
+        self.applied: Set[int] = applied or set()
+        self.index_valid: Optional[bool] = index_valid
+        self.rowcounts: List[int] = rowcounts or []
+        self.lock_failures: int = lock_failures
+        self.broken: bool = False
+        self.executed: List[str] = []
+
+    async def __aenter__(self) -> "FakeConnection":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.executed.append("CLOSE")
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        self.executed.append("BEGIN")
+        yield
+        self.executed.append("COMMIT")
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        text: str = " ".join((query if isinstance(query, str) else query.as_string(None)).split())
+        self.executed.append(text)
+        cursor: MagicMock = MagicMock()
+        cursor.fetchall = AsyncMock(return_value=[(version,) for version in sorted(self.applied)])
+        cursor.fetchone = AsyncMock(return_value=None if self.index_valid is None else (self.index_valid,))
+        if "ALTER TABLE" in text and self.lock_failures:
+            self.lock_failures -= 1
+            raise LockNotAvailable("canceling statement due to lock timeout")
+        if text.startswith("INSERT INTO schema_migrations"):
+            self.applied.add(params[0])
+        if "UPDATE" in text:
+            cursor.rowcount = self.rowcounts.pop(0)
+        return cursor
+
+
+def runner(connection: FakeConnection, *migrations: Migration) -> MigrationRunner:
+    return MigrationRunner(migrations=migrations, config=CONFIG, connect=AsyncMock(return_value=connection))
+
+
+ADD_COLUMN: Migration = Migration(1, "add_column", (Statement(SQL("ALTER TABLE pvz_list ADD COLUMN note TEXT")),))
+ADD_INDEX: Migration = Migration(2, "add_index", (ConcurrentIndex("pvz_list_city", "pvz_list", "(city)"),))
+
+
+class TestMigrationRunner:
+    @pytest.mark.asyncio
+    async def test_pending_migrations_run_in_order_under_lock(self) -> None:
+        connection: FakeConnection = FakeConnection()
+        assert await runner(connection, ADD_COLUMN, ADD_INDEX).run() == [1, 2]
+
+        executed: List[str] = connection.executed
+        assert executed[0] == "SELECT pg_advisory_lock(hashtext(%s))"
+        assert executed[-2:] == ["SELECT pg_advisory_unlock(hashtext(%s))", "CLOSE"]
+        assert executed.index("ALTER TABLE pvz_list ADD COLUMN note TEXT") < executed.index(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "pvz_list_city" ON "pvz_list" (city)'
+        )
+        assert connection.applied == {1, 2}
+
+    @pytest.mark.asyncio
+    async def test_applied_migrations_are_skipped(self) -> None:
+        connection: FakeConnection = FakeConnection(applied={1})
+        assert await runner(connection, ADD_COLUMN, ADD_INDEX).run() == [2]
+        assert not any("ALTER TABLE" in query for query in connection.executed)
+
+    @pytest.mark.asyncio
+    async def test_lock_is_released_on_error(self) -> None:
+        connection: FakeConnection = FakeConnection(lock_failures=CONFIG.LOCK_RETRIES + 1)
+        with pytest.raises(LockNotAvailable):
+            await runner(connection, ADD_COLUMN, ADD_INDEX).run()
+
+        assert connection.executed[-2] == "SELECT pg_advisory_unlock(hashtext(%s))"
+        assert connection.applied == set()
+
+    @pytest.mark.asyncio
+    async def test_baseline_runs_under_lock_before_migrations(self) -> None:
+        connection: FakeConnection = FakeConnection()
+
+        async def baseline() -> InitTableResponse:
+            connection.executed.append("BASELINE")
+            return InitTableResponse(result={"status": True})
+
+        migrations: MigrationRunner = runner(connection, ADD_COLUMN)
+        migrations.baseline = baseline
+        await migrations.run()
+
+        assert connection.executed[:2] == ["SELECT pg_advisory_lock(hashtext(%s))", "BASELINE"]
+        assert connection.applied == {1}
+
+    @pytest.mark.asyncio
+    async def test_lock_is_released_on_baseline_error(self) -> None:
+        connection: FakeConnection = FakeConnection()
+        migrations: MigrationRunner = runner(connection, ADD_COLUMN)
+        migrations.baseline = AsyncMock(return_value=InitTableResponse(errors="relation already exists"))
+        with pytest.raises(Exception, match="relation already exists"):
+            await migrations.run()
+
+        assert connection.executed[-2] == "SELECT pg_advisory_unlock(hashtext(%s))"
+        assert connection.applied == set()
+
+    def test_versions_must_increase(self) -> None:
+        with pytest.raises(Exception, match="строго возрастать"):
+            MigrationRunner(migrations=(ADD_INDEX, ADD_COLUMN))
+
+
+class TestSteps:
+    @pytest.mark.asyncio
+    async def test_statement_retries_on_lock_timeout(self) -> None:
+        connection: FakeConnection = FakeConnection(lock_failures=2)
+        await ADD_COLUMN.steps[0].apply(connection, CONFIG)  # type: ignore[arg-type]
+
+        assert connection.executed.count("SET LOCAL lock_timeout = '1000ms'") == 3
+        assert connection.executed[-1] == "COMMIT"
+
+    @pytest.mark.asyncio
+    async def test_valid_index_is_kept(self) -> None:
+        connection: FakeConnection = FakeConnection(index_valid=True)
+        await ADD_INDEX.steps[0].apply(connection, CONFIG)  # type: ignore[arg-type]
+        assert not any("INDEX CONCURRENTLY" in query for query in connection.executed)
+
+    @pytest.mark.asyncio
+    async def test_invalid_index_is_rebuilt(self) -> None:
+        connection: FakeConnection = FakeConnection(index_valid=False)
+        await ADD_INDEX.steps[0].apply(connection, CONFIG)  # type: ignore[arg-type]
+
+        assert connection.executed[1:] == [
+            'DROP INDEX CONCURRENTLY IF EXISTS "pvz_list_city"',
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "pvz_list_city" ON "pvz_list" (city)',
+        ]
+        assert "BEGIN" not in connection.executed
+
+    @pytest.mark.asyncio
+    async def test_backfill_runs_until_partial_batch(self) -> None:
+        connection: FakeConnection = FakeConnection(rowcounts=[100, 100, 7])
+        backfill: Backfill = Backfill(SQL("UPDATE pvz_list SET note = '' WHERE id IN (SELECT id LIMIT %(batch_size)s)"))
+        await backfill.apply(connection, CONFIG)  # type: ignore[arg-type]
+
+        assert connection.executed.count("BEGIN") == 3
+        assert connection.rowcounts == []
+
+
+class TestBaseline:
+    @pytest.mark.asyncio
+    async def test_init_has_no_blocking_ddl_on_existing_tables(self) -> None:
+        """Триггеры, индексы, ALTER TABLE и пересчеты на заполненных таблицах - только в версионированных миграциях"""
+        cursor: MagicMock = MagicMock()
+        cursor.execute = AsyncMock()
+        cursor.__aenter__ = AsyncMock(return_value=cursor)
+        cursor.__aexit__ = AsyncMock(return_value=None)
+        connection: MagicMock = MagicMock()
+        connection.cursor = MagicMock(return_value=cursor)
+        connection.__aenter__ = AsyncMock(return_value=connection)
+        connection.__aexit__ = AsyncMock(return_value=None)
+        with patch("postgres.sql.init_tables.connect", AsyncMock(return_value=connection)):
+            assert (await Tables.init()).errors is None
+
+        executed: List[str] = [
+            call.args[0] if isinstance(call.args[0], str) else call.args[0].as_string(None)
+            for call in cursor.execute.await_args_list
+        ]
+        assert not any(
+            ddl in query for query in executed for ddl in ("CREATE INDEX", "ALTER TABLE", "TRIGGER", "FUNCTION")
+        )
@@ -0,0 +1,121 @@
+import pytest
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+from jose import jwt
+from postgres.dto import UserCredentialsRow
+from postgres.sql.mutation import UserLoginMutation, UserRegisterMutation
+from src.passwords import check_password, hash_password, hash_rounds, needs_rehash
+from src.tokens import JWTConfig, token_digest
+
+STORED_HASH: str = hash_password("password123", rounds=4)
+
+
+class FakeConnection:
+    def __init__(self, user: Optional[UserCredentialsRow]) -> None:
+        cursor: MagicMock = MagicMock()
+        cursor.__aenter__ = AsyncMock(return_value=cursor)
+        cursor.__aexit__ = AsyncMock(return_value=None)
+        cursor.execute = AsyncMock()
+        cursor.fetchone = AsyncMock(return_value=user)
+        self.select_cursor: MagicMock = cursor
+        self.updates: List[Dict[str, Any]] = []
+        # Checkouts из conftest: сколько раз взято соединение и держится ли оно сейчас
+        self.checkouts: Any = None
+
+    def cursor(self, row_factory: Any) -> MagicMock:
+        return self.select_cursor
+
+    async def execute(self, query: str, params: Dict[str, Any]) -> MagicMock:
+        self.updates.append(params)
+        update_cursor: MagicMock = MagicMock()
+        update_cursor.fetchone = AsyncMock(return_value=(params["user_id"],))
+        return update_cursor
+
+
+def credentials(password: str = STORED_HASH) -> UserCredentialsRow:
+    return UserCredentialsRow(
+        id=1, username="testuser", password=password, user_type="client", email="test@example.com")
+
+
+@pytest.fixture
+def connection(patch_primary: Callable[[Any], Any]) -> FakeConnection:
+    fake: FakeConnection = FakeConnection(credentials())
+    fake.checkouts = patch_primary(fake)
+    return fake
+
+
+class TestPasswords:
+    def test_rounds_are_read_from_hash(self) -> None:
+        assert hash_rounds(STORED_HASH) == 4
+        assert needs_rehash(STORED_HASH, rounds=5)
+        assert not needs_rehash(STORED_HASH, rounds=4)
+
+    @pytest.mark.asyncio
+    async def test_check_password(self) -> None:
+        assert await check_password("password123", STORED_HASH)
+        assert not await check_password("wrong-password", STORED_HASH)
+
+
+class TestUserLoginMutation:
+    @pytest.mark.asyncio
+    async def test_token_is_stored_with_one_update(self, connection: FakeConnection) -> None:
+        with patch("postgres.sql.mutation.needs_rehash", return_value=False):
+            token: str = await UserLoginMutation(username="testuser", password="password123").login()
+
+        claims: Dict[str, Any] = jwt.decode(token, JWTConfig.SECRET_KEY, algorithms=[JWTConfig.ALGORITHM])
+        assert (claims["sub"], claims["role"]) == ("test@example.com", "client")
+        assert len(connection.updates) == 1
+        assert connection.updates[0]["new_hash"] == connection.updates[0]["old_hash"] == STORED_HASH
+        assert connection.updates[0]["token_digest"] == token_digest(token)
+        # Чтение хеша и запись сессии - два коротких обращения к пулу, bcrypt между ними без соединения
+        assert connection.checkouts.total == 2
+
+    @pytest.mark.asyncio
+    async def test_connection_is_released_during_bcrypt(self, connection: FakeConnection) -> None:
+        held: List[bool] = []
+
+        async def check(password: str, hashed: str) -> bool:
+            held.append(connection.checkouts.held)
+            return True
+
+        with patch("postgres.sql.mutation.check_password", check):
+            await UserLoginMutation(username="testuser", password="password123").login()
+
+        assert held == [False]
+        assert connection.checkouts.total == 2
+
+    @pytest.mark.asyncio
+    async def test_rehash_when_cost_changed(self, connection: FakeConnection) -> None:
+        with patch("postgres.sql.mutation.rehash_password", AsyncMock(return_value="$2b$05$rehashed")):
+            await UserLoginMutation(username="testuser", password="password123").login()
+
+        assert connection.updates[0]["new_hash"] == "$2b$05$rehashed"
+        assert connection.updates[0]["old_hash"] == STORED_HASH
+        # Пересчитанный хеш пишется тем же запросом, что и сессия
+        assert connection.checkouts.total == 2
+
+    @pytest.mark.asyncio
+    async def test_wrong_password_does_not_update(self, connection: FakeConnection) -> None:
+        with pytest.raises(Exception, match="Некорректный пароль"):
+            await UserLoginMutation(username="testuser", password="wrong-password").login()
+
+        assert connection.updates == []
+        assert connection.checkouts.total == 1
+
+
+class TestUserRegisterMutation:
+    @pytest.mark.asyncio
+    async def test_password_is_hashed_off_loop_before_checkout(self, connection: FakeConnection) -> None:
+        held: List[bool] = []
+
+        async def rehash(password: str) -> str:
+            held.append(connection.checkouts.held)
+            return "$2b$05$hashed"
+
+        with patch("postgres.sql.mutation.rehash_password", rehash):
+            await UserRegisterMutation(
+                username="testuser", user_type="client", password="password123", email="test@example.com", uuid="uuid"
+            ).register()
+
+        assert held == [False]
+        assert connection.select_cursor.execute.await_args.kwargs["params"][2] == "$2b$05$hashed"
@@ -0,0 +1,124 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Generator, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.config import DEFAULT_SHARD
+from postgres.dto import ProductSearchRow
+from postgres.sql.mutation import SearchProducts
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dependencies import search_products
+from src.sso.dto import GetCurrentUserResponse, ProductSearchResponse
+from src.sso.pagination import decode_cursor, encode_cursor
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+
+
+def product(product_id: int) -> ProductSearchRow:
+    return ProductSearchRow(
+        id=product_id, accepting_id=10, pvz_id=1, type="обувь",
+        datetime=datetime.fromisoformat(f"2025-04-21T10:{product_id:02d}:00+03:00")
+    )
+
+
+@pytest.fixture
+def executed() -> Generator[List[Dict[str, Any]], None, None]:
+    """Запросы, отправленные SearchProducts: текст и параметры"""
+    calls: List[Dict[str, Any]] = []
+    cursor: MagicMock = MagicMock()
+    cursor.__aenter__ = AsyncMock(return_value=cursor)
+    cursor.__aexit__ = AsyncMock(return_value=None)
+    cursor.fetchall = AsyncMock(return_value=[product(1)])
+
+    async def execute(query: Any, params: Dict[str, Any]) -> None:
+        calls.append({"query": query.as_string(), "params": params})
+
+    cursor.execute = execute
+    connection: MagicMock = MagicMock()
+    connection.cursor.return_value = cursor
+
+    @asynccontextmanager
+    async def replica(budget: Optional[str] = None, shard: int = DEFAULT_SHARD) -> AsyncIterator[MagicMock]:
+        yield connection
+
+    with patch("postgres.sql.mutation.replica", replica):
+        yield calls
+
+
+@pytest.fixture
+def search() -> Generator[MagicMock, None, None]:
+    with patch("src.sso.dependencies.SearchProducts", new_callable=MagicMock) as mock:
+        yield mock
+
+
+class TestCursor:
+    def test_roundtrip(self) -> None:
+        cursor: str = encode_cursor(START, 42)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (START, 42)
+
+    def test_invalid_cursor(self) -> None:
+        with pytest.raises(Exception, match="Некорректный курсор пагинации"):
+            decode_cursor("not-a-cursor")
+
+
+class TestSearchProducts:
+    @pytest.mark.asyncio
+    async def test_only_given_filters_are_added(self, executed: List[Dict[str, Any]]) -> None:
+        rows: List[ProductSearchRow] = await SearchProducts(start_date=START, end_date=END, limit=50).search()
+
+        assert rows == [product(1)]
+        assert "%(product_type)s" not in executed[0]["query"]
+        assert "%(pvz_id)s" not in executed[0]["query"]
+        assert executed[0]["params"] == {"start_date": START, "end_date": END, "limit": 50}
+
+    @pytest.mark.asyncio
+    async def test_keyset_condition(self, executed: List[Dict[str, Any]]) -> None:
+        await SearchProducts(
+            start_date=START, end_date=END, limit=50, product_type="обувь", pvz_id=3, after=(START, 7)
+        ).search()
+
+        query: str = executed[0]["query"]
+        assert "p.type = %(product_type)s" in query
+        assert "ap.pvz_id = %(pvz_id)s" in query
+        assert "(p.datetime, p.id) > (%(after_datetime)s, %(after_id)s)" in query
+        assert executed[0]["params"]["after_id"] == 7
+
+
+class TestSearchProductsDependency:
+    @pytest.mark.asyncio
+    async def test_full_page_returns_next_cursor(self, search: MagicMock, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        search.return_value.search = AsyncMock(return_value=[product(1), product(2)])
+
+        result: ProductSearchResponse = await search_products(
+            start_date=START.isoformat(), end_date=END.isoformat(), type="Обувь", pvz_id=None, limit=2,
+            cursor=encode_cursor(START, 5), current_user=user(VALID_USER_TYPES["client"])
+        )
+
+        assert result.errors is None
+        assert decode_cursor(result.next_cursor) == (product(2).datetime, 2)  # type: ignore[arg-type]
+        assert search.call_args.kwargs["product_type"] == "обувь"
+        assert search.call_args.kwargs["after"] == (START, 5)
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, search: MagicMock, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        search.return_value.search = AsyncMock(return_value=[product(1)])
+
+        result: ProductSearchResponse = await search_products(
+            start_date=START.isoformat(), end_date=END.isoformat(), type=None, pvz_id=1, limit=2, cursor=None,
+            current_user=user(VALID_USER_TYPES["moderator"])
+        )
+
+        assert result.products == [product(1)]
+        assert result.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_invalid_type(self, search: MagicMock, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: ProductSearchResponse = await search_products(
+            start_date=START.isoformat(), end_date=END.isoformat(), type="мебель", pvz_id=None, limit=2,
+            cursor=None, current_user=user(VALID_USER_TYPES["client"])
+        )
+
+        assert result.errors == "Некорректный тип товара, нужен - Электроника, Одежда, Обувь"
+        search.assert_not_called()
@@ -0,0 +1,94 @@
+import pytest
+from asyncio import gather, sleep
+from pathlib import Path
+from pstats import Stats
+from typing import Dict
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient, Response
+from starlette import status
+from src.profiling import ProfilingConfig, ProfilingMiddleware
+
+
+def reformat_rows() -> Dict[str, int]:
+    return {"total": sum(range(1000))}
+
+
+def concurrent_rows() -> Dict[str, int]:
+    return {"total": sum(range(10))}
+
+
+def build_app(config: ProfilingConfig) -> FastAPI:
+    app: FastAPI = FastAPI()
+
+    @app.get("/pvz-info")
+    async def pvz_info() -> Dict[str, int]:
+        await sleep(0.02)
+        return reformat_rows()
+
+    @app.get("/concurrent")
+    async def concurrent() -> Dict[str, int]:
+        await sleep(0.01)
+        return concurrent_rows()
+
+    app.add_middleware(ProfilingMiddleware, config=config)
+    return app
+
+
+def build_client(config: ProfilingConfig) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=build_app(config)), base_url="http://test")
+
+
+class TestProfilingMiddleware:
+    def test_disabled_without_token(self) -> None:
+        assert ProfilingConfig(TOKEN="").enabled is False
+        assert ProfilingConfig(TOKEN="secret").enabled is True
+
+    @pytest.mark.asyncio
+    async def test_request_without_valid_token_is_not_profiled(self) -> None:
+        async with build_client(ProfilingConfig(TOKEN="secret")) as client:
+            plain: Response = await client.get("/pvz-info")
+            wrong: Response = await client.get("/pvz-info", headers={"X-Profile-Token": "guess"})
+
+        for response in (plain, wrong):
+            assert response.json() == {"total": 499500}
+            assert "X-Profile-Wall-Ms" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_report_replaces_body(self) -> None:
+        async with build_client(ProfilingConfig(TOKEN="secret")) as client:
+            response: Response = await client.get("/pvz-info", params={"profile_token": "secret"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["X-Profiled-Status"] == "200"
+        assert response.text.startswith("GET /pvz-info wall=")
+        assert "reformat_rows" in response.text
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_not_profiled(self) -> None:
+        async with build_client(ProfilingConfig(TOKEN="secret")) as client:
+            profiled_response, concurrent_response = await gather(
+                client.get("/pvz-info", params={"profile_token": "secret"}),
+                client.get("/concurrent"),
+            )
+
+        assert concurrent_response.json() == {"total": 45}
+        assert "reformat_rows" in profiled_response.text
+        assert "concurrent_rows" not in profiled_response.text
+
+    @pytest.mark.asyncio
+    async def test_store_keeps_response_and_writes_profile(self, tmp_path: Path) -> None:
+        async with build_client(ProfilingConfig(TOKEN="secret", OUTPUT_DIR=str(tmp_path))) as client:
+            response: Response = await client.get(
+                "/pvz-info", headers={"X-Profile-Token": "secret", "X-Profile-Output": "store"})
+
+        assert response.json() == {"total": 499500}
+        stored: Path = tmp_path / response.headers["X-Profile-File"]
+        assert "reformat_rows" in Stats(str(stored)).get_stats_profile().func_profiles
+
+    @pytest.mark.asyncio
+    async def test_store_requires_output_dir(self) -> None:
+        async with build_client(ProfilingConfig(TOKEN="secret")) as client:
+            response: Response = await client.get(
+                "/pvz-info", params={"profile_token": "secret", "profile_output": "store"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,161 @@
+import pytest
+from asyncio import Event, Queue, create_task, sleep
+from typing import AsyncIterator, Callable, List
+from unittest.mock import AsyncMock, MagicMock
+from postgres.dto import PVZEvent
+from postgres.events import LISTENER_UNAVAILABLE_ERROR, SUBSCRIBERS_LIMIT_ERROR, EventsConfig, PVZEventHub
+from src.sso.dependencies import all_pvz_events, pvz_events
+from src.sso.dto import GetCurrentUserResponse, PVZEventsResponse
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.events import SSEConfig, pvz_event_stream, sse_message
+
+
+class FakeNotify:
+    def __init__(self, payload: str) -> None:
+        self.payload: str = payload
+
+
+class FakeListenConnection:
+    def __init__(self, payloads: List[str]) -> None:
+        self.payloads: List[str] = payloads
+        self.execute: AsyncMock = AsyncMock()
+
+    async def __aenter__(self) -> "FakeListenConnection":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        return None
+
+    async def notifies(self) -> AsyncIterator[FakeNotify]:
+        # NOTIFY приходят, когда подписчики уже получили очереди
+        await sleep(0.01)
+        for payload in self.payloads:
+            yield FakeNotify(payload)
+        # Соединение остается открытым, пока хаб не закроют
+        await sleep(3600)
+
+
+def build_hub(payloads: List[str], **config: int) -> PVZEventHub:
+    connection: FakeListenConnection = FakeListenConnection(payloads)
+    return PVZEventHub(conninfo="", config=EventsConfig(**config), connect=AsyncMock(return_value=connection))
+
+
+class TestPVZEventHub:
+    @pytest.mark.asyncio
+    async def test_listen_fans_out_by_pvz(self) -> None:
+        hub: PVZEventHub = build_hub([
+            '{"event": "reception_created", "pvz_id": 1, "reception_id": 10}',
+            "not json",
+            '{"event": "product_added", "pvz_id": 2, "reception_id": 20, "product_id": 200}',
+        ])
+
+        async with hub.subscribe(1) as first, hub.subscribe() as everything:
+            await sleep(0.05)
+
+        await hub.close()
+        assert first.qsize() == 1
+        assert (await first.get()).event == "reception_created"
+        assert [(await everything.get()).pvz_id for _ in range(everything.qsize())] == [1, 2]
+        assert hub.has_capacity()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_waits_for_listen(self) -> None:
+        listened: Event = Event()
+        connection: FakeListenConnection = FakeListenConnection([])
+
+        async def listen(query: str) -> None:
+            await listened.wait()
+
+        connection.execute = AsyncMock(side_effect=listen)
+        hub: PVZEventHub = PVZEventHub(conninfo="", connect=AsyncMock(return_value=connection))
+
+        async def subscribe() -> None:
+            async with hub.subscribe():
+                pass
+
+        subscribed = create_task(subscribe())
+        await sleep(0.01)
+        assert not subscribed.done()
+
+        listened.set()
+        await subscribed
+        connection.execute.assert_awaited_once_with("LISTEN pvz_events")
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_fails_while_listener_is_down(self) -> None:
+        hub: PVZEventHub = PVZEventHub(
+            conninfo="",
+            config=EventsConfig(READY_TIMEOUT=0.02, RECONNECT_DELAY=0.01),
+            connect=AsyncMock(side_effect=OSError("connection refused"))
+        )
+        with pytest.raises(Exception, match=LISTENER_UNAVAILABLE_ERROR):
+            async with hub.subscribe():
+                pass
+
+        await hub.close()
+        assert hub.has_capacity() and not hub._subscribers
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_drops_events(self) -> None:
+        hub: PVZEventHub = build_hub([], QUEUE_SIZE=1)
+        async with hub.subscribe() as queue:
+            hub.publish(PVZEvent(event="product_added", pvz_id=1, reception_id=1, product_id=1))
+            hub.publish(PVZEvent(event="product_added", pvz_id=1, reception_id=1, product_id=2))
+            assert queue.qsize() == 1
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_subscribers_limit(self) -> None:
+        hub: PVZEventHub = build_hub([], MAX_SUBSCRIBERS=1)
+        async with hub.subscribe():
+            assert not hub.has_capacity()
+            with pytest.raises(Exception, match=SUBSCRIBERS_LIMIT_ERROR):
+                async with hub.subscribe():
+                    pass
+        await hub.close()
+
+
+class TestEventStream:
+    def test_sse_message_skips_empty_fields(self) -> None:
+        message: bytes = sse_message(PVZEvent(event="reception_closed", pvz_id=3, reception_id=7))
+        assert message == b'event: reception_closed\ndata: {"event": "reception_closed", "pvz_id": 3, "reception_id": 7}\n\n'
+
+    @pytest.mark.asyncio
+    async def test_stream_sends_retry_events_and_pings(self) -> None:
+        queue: Queue = Queue()
+        queue.put_nowait(PVZEvent(event="product_deleted", pvz_id=1, reception_id=2, product_id=3))
+        hub: MagicMock = MagicMock()
+        hub.subscribe.return_value.__aenter__ = AsyncMock(return_value=queue)
+        hub.subscribe.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        stream: AsyncIterator[bytes] = pvz_event_stream(1, hub=hub, config=SSEConfig(KEEPALIVE=0.01, RETRY_MS=500))
+        chunks: List[bytes] = [await anext(stream) for _ in range(4)]
+        await stream.aclose()  # type: ignore[attr-defined]
+
+        assert chunks[0] == b"retry: 500\n\n"
+        assert chunks[1] == b'event: ready\ndata: {"pvz_id": 1}\n\n'
+        assert chunks[2].startswith(b"event: product_deleted\n")
+        assert chunks[3] == b": ping\n\n"
+        hub.subscribe.assert_called_once_with(1)
+        hub.subscribe.return_value.__aexit__.assert_awaited_once()
+
+
+class TestEventsDependencies:
+    @pytest.mark.asyncio
+    async def test_pvz_events(self, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: PVZEventsResponse = await pvz_events(pvz_id=5, current_user=user(VALID_USER_TYPES["client"]))
+        assert result.errors is None
+        assert result.pvz_id == 5
+
+    @pytest.mark.asyncio
+    async def test_all_pvz_events_for_moderator(self, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: PVZEventsResponse = await all_pvz_events(current_user=user(VALID_USER_TYPES["moderator"]))
+        assert result.errors is None
+        assert result.pvz_id is None
+
+    @pytest.mark.asyncio
+    async def test_expired_token(self) -> None:
+        result: PVZEventsResponse = await pvz_events(
+            pvz_id=5, current_user=GetCurrentUserResponse(errors="Токен авторизации протух, войдите заново"))
+        assert result.errors == "Токен авторизации протух, войдите заново"
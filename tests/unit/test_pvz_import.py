@@ -0,0 +1,100 @@
+import pytest
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List, Tuple
+from unittest.mock import AsyncMock, MagicMock
+from postgres.sql.mutation import ImportPVZ
+from src.sso.pvz_import import iter_cities, iter_lines
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator: AsyncIterator[str]) -> List[str]:
+    return [item async for item in iterator]
+
+
+class TestIterLines:
+    @pytest.mark.asyncio
+    async def test_lines_split_across_chunks(self) -> None:
+        lines: List[str] = await collect(iter_lines(stream("Мос".encode(), "ква\r\nКа".encode(), "зань".encode())))
+
+        assert lines == ["Москва", "Казань"]
+
+
+class TestIterCities:
+    @pytest.mark.asyncio
+    async def test_csv_with_header_and_blank_lines(self) -> None:
+        body: bytes = 'city\nМосква\n\n"Санкт-Петербург"\nКазань,лишняя колонка\n'.encode()
+
+        cities: List[str] = await collect(iter_cities(stream(body), content_type="text/csv"))
+
+        assert cities == ["Москва", "Санкт-Петербург", "Казань"]
+
+    @pytest.mark.asyncio
+    async def test_ndjson(self) -> None:
+        body: bytes = '{"city": "Казань"}\n{"city": "Москва"}'.encode()
+
+        cities: List[str] = await collect(iter_cities(stream(body), content_type="application/x-ndjson"))
+
+        assert cities == ["Казань", "Москва"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_city_reports_line(self) -> None:
+        body: bytes = "Москва\nНовосибирск\n".encode()
+
+        with pytest.raises(Exception) as exc_info:
+            await collect(iter_cities(stream(body), content_type="text/csv"))
+
+        assert str(exc_info.value).startswith("Строка 2: Создать ПВЗ можно только в городах")
+
+    @pytest.mark.asyncio
+    async def test_invalid_ndjson_reports_line(self) -> None:
+        body: bytes = '{"city": "Москва"}\n[1]\n'.encode()
+
+        with pytest.raises(Exception) as exc_info:
+            await collect(iter_cities(stream(body), content_type="application/x-ndjson"))
+
+        assert str(exc_info.value).startswith("Строка 2: Некорректная строка NDJSON")
+
+
+class ImportCursor:
+    """RETURNING отдает строки не в порядке позиций - порядок ответа задает только position"""
+
+    def __init__(self) -> None:
+        self.rows: List[Tuple[int, str]] = []
+
+    async def __aenter__(self) -> "ImportCursor":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    async def execute(self, query: str) -> None:
+        pass
+
+    @asynccontextmanager
+    async def copy(self, statement: str) -> AsyncIterator[MagicMock]:
+        copy: MagicMock = MagicMock()
+        copy.write_row = AsyncMock(side_effect=self.rows.append)
+        yield copy
+
+    async def fetchall(self) -> List[Tuple[int, int]]:
+        return [(position, 100 + position) for position, _ in reversed(self.rows)]
+
+
+class TestImportPVZ:
+    @pytest.mark.asyncio
+    async def test_ids_follow_file_order(self, patch_primary: Callable[[Any], Any]) -> None:
+        connection: MagicMock = MagicMock()
+        connection.cursor = ImportCursor
+        patch_primary(connection)
+
+        async def cities() -> AsyncIterator[str]:
+            for city in ("Москва", "Казань", "Москва"):
+                yield city
+
+        created: List[int] = await ImportPVZ(cities=cities()).load()  # type: ignore[assignment]
+
+        assert created == [100, 101, 102]
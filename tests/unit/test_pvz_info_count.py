@@ -0,0 +1,170 @@
+import pytest
+from asyncio import Event, Semaphore, gather, sleep, wait_for
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.dto import PVZInfoVersionRow
+from postgres.sql.mutation import PVZ_INFO_COUNT_QUERY, GetPVZInfo
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+VERSION: PVZInfoVersionRow = PVZInfoVersionRow(version=7, changed_at=START)
+
+
+class FakeConnection:
+    """Страница отдается только после старта count - последовательное выполнение зависло бы"""
+
+    def __init__(self, name: str, count_started: Event) -> None:
+        self.name: str = name
+        self.count_started: Event = count_started
+        self.queries: List[str] = []
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[None]:
+        yield
+
+    def cursor(self, row_factory: Any = None) -> MagicMock:
+        cursor: MagicMock = MagicMock()
+
+        async def execute(query: Any, params: Any = None) -> None:
+            self.queries.append("page" if "json_agg" in str(query) else "version")
+
+        async def fetchall() -> List[Any]:
+            await self.count_started.wait()
+            return []
+
+        cursor.execute = execute
+        cursor.fetchall = fetchall
+        cursor.fetchone = AsyncMock(return_value=VERSION)
+        return cursor
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        assert query is PVZ_INFO_COUNT_QUERY
+        self.queries.append("count")
+        self.count_started.set()
+        await sleep(0)
+        cursor: MagicMock = MagicMock()
+        cursor.fetchone = AsyncMock(return_value=(12,))
+        return cursor
+
+
+def patched_replica() -> Tuple[Any, List[FakeConnection]]:
+    count_started: Event = Event()
+    checked_out: List[FakeConnection] = []
+
+    @asynccontextmanager
+    async def replica(budget: Optional[str] = None) -> AsyncIterator[FakeConnection]:
+        assert budget == "GetPVZInfo"
+        connection: FakeConnection = FakeConnection(f"conn-{len(checked_out)}", count_started)
+        checked_out.append(connection)
+        yield connection
+
+    return patch("postgres.sql.mutation.replica", replica), checked_out
+
+
+class TestPVZInfoCount:
+    @pytest.mark.asyncio
+    async def test_count_runs_on_second_connection(self) -> None:
+        replica, checked_out = patched_replica()
+        with replica:
+            pvz_data, total, version = await GetPVZInfo(
+                page=1, page_size=10, start_date=START, end_date=END, parallel_count=True, batched=False).get()
+
+        assert (pvz_data, total, version) == ([], 12, VERSION)
+        assert [connection.queries for connection in checked_out] == [["version", "page"], ["count"]]
+
+    @pytest.mark.asyncio
+    async def test_sequential_count_uses_same_connection(self) -> None:
+        replica, checked_out = patched_replica()
+        with replica:
+            _, total, _ = await GetPVZInfo(
+                page=1, page_size=10, start_date=START, end_date=END, parallel_count=False, batched=False).get()
+
+        assert total == 12
+        assert [connection.queries for connection in checked_out] == [["version", "page", "count"]]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_version_skips_count(self) -> None:
+        replica, checked_out = patched_replica()
+        with replica:
+            pvz_data, total, _ = await GetPVZInfo(
+                page=1, page_size=10, start_date=START, end_date=END, known_version=7, parallel_count=True).get()
+
+        assert (pvz_data, total) == (None, 0)
+        assert [connection.queries for connection in checked_out] == [["version"]]
+
+
+class PooledConnection:
+    """Страница отдается не сразу - к этому моменту все одновременные запросы уже держат по соединению"""
+
+    def __init__(self) -> None:
+        self.queries: List[str] = []
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[None]:
+        yield
+
+    def cursor(self, row_factory: Any = None) -> MagicMock:
+        cursor: MagicMock = MagicMock()
+
+        async def execute(query: Any, params: Any = None) -> None:
+            self.queries.append("page" if "json_agg" in str(query) else "version")
+
+        async def fetchall() -> List[Any]:
+            await sleep(0.01)
+            return []
+
+        cursor.execute = execute
+        cursor.fetchall = fetchall
+        cursor.fetchone = AsyncMock(return_value=VERSION)
+        return cursor
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        self.queries.append("count")
+        cursor: MagicMock = MagicMock()
+        cursor.fetchone = AsyncMock(return_value=(12,))
+        return cursor
+
+
+class TestPVZInfoCountPool:
+    @pytest.mark.asyncio
+    async def test_concurrency_above_pool_size_does_not_starve(self) -> None:
+        pool_size: int = 4
+        pool: Semaphore = Semaphore(pool_size)
+        checked_out: List[PooledConnection] = []
+
+        @asynccontextmanager
+        async def replica(budget: Optional[str] = None) -> AsyncIterator[PooledConnection]:
+            # Пул без свободных соединений ждет, как AsyncConnectionPool до PoolTimeout
+            async with pool:
+                connection: PooledConnection = PooledConnection()
+                checked_out.append(connection)
+                yield connection
+
+        async def load() -> int:
+            _, total, _ = await GetPVZInfo(
+                page=1, page_size=10, start_date=START, end_date=END, parallel_count=True, batched=False).get()
+            return total
+
+        with patch("postgres.sql.mutation.replica", replica), \
+                patch("postgres.sql.mutation.PVZ_INFO_COUNT_SLOTS", Semaphore(pool_size // 2)):
+            totals: List[int] = await wait_for(gather(*(load() for _ in range(pool_size * 2))), timeout=2)
+
+        assert totals == [12] * pool_size * 2
+        pipelined: int = sum(connection.queries == ["version", "page", "count"] for connection in checked_out)
+        parallel: int = sum(connection.queries == ["count"] for connection in checked_out)
+        assert pipelined + parallel == pool_size * 2
+        assert parallel > 0
+
+    @pytest.mark.asyncio
+    async def test_busy_slots_fall_back_to_pipelined_count(self) -> None:
+        replica, checked_out = patched_replica()
+        busy_slots: Semaphore = Semaphore(1)
+        await busy_slots.acquire()
+        with replica, patch("postgres.sql.mutation.PVZ_INFO_COUNT_SLOTS", busy_slots):
+            _, total, _ = await GetPVZInfo(
+                page=1, page_size=10, start_date=START, end_date=END, parallel_count=True, batched=False).get()
+
+        assert total == 12
+        assert [connection.queries for connection in checked_out] == [["version", "page", "count"]]
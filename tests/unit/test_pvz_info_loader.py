@@ -0,0 +1,179 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime
+from json import dumps, loads
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.dto import PVZInfoRow, PVZInfoVersionRow
+from postgres.sql.mutation import (
+    PVZ_AFTER_QUERY,
+    PVZ_INFO_COUNT_QUERY,
+    PVZ_PAGE_QUERY,
+    PVZ_PRODUCTS_QUERY,
+    PVZ_RECEPTIONS_QUERY,
+    GetPVZInfo,
+)
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+VERSION: PVZInfoVersionRow = PVZInfoVersionRow(version=7, changed_at=START)
+# Текст JSON Postgres: дробная часть секунд без хвостовых нулей
+ACCEPTED_AT: str = "2025-04-21T11:00:00.5+03:00"
+
+PAGE: List[Tuple] = [(1, "Москва", START), (2, "Казань", START), (3, "Москва", START)]
+RECEPTIONS: List[Tuple] = [
+    (10, 1, ACCEPTED_AT, "close", [100, 101], 2, 1, 0, 1),
+    (11, 2, ACCEPTED_AT, "in_progress", [102], 1, 0, 1, 0),
+    (12, 1, ACCEPTED_AT, "close", None, 0, 0, 0, 0),
+]
+PRODUCTS: List[Tuple] = [
+    (100, 10, ACCEPTED_AT, "электроника"),
+    (101, 10, ACCEPTED_AT, "обувь"),
+    (102, 11, ACCEPTED_AT, "одежда"),
+]
+
+
+class FakeConnection:
+    def __init__(self, page: List[Tuple]) -> None:
+        # psycopg.sql.SQL не хешируется - результаты и параметры запросов по id() объекта запроса
+        self.results: Dict[int, List[Tuple]] = {
+            id(PVZ_PAGE_QUERY): page,
+            id(PVZ_AFTER_QUERY): page,
+            id(PVZ_RECEPTIONS_QUERY): RECEPTIONS,
+            id(PVZ_PRODUCTS_QUERY): PRODUCTS,
+            id(PVZ_INFO_COUNT_QUERY): [(len(page),)],
+        }
+        self.executed: Dict[int, Any] = {}
+        # Страница однозапросного варианта (json_agg), разобранная psycopg
+        self.aggregated: List[PVZInfoRow] = []
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[None]:
+        yield
+
+    def cursor(self, row_factory: Any = None) -> MagicMock:
+        cursor: MagicMock = MagicMock()
+        cursor.execute = AsyncMock()
+        cursor.fetchone = AsyncMock(return_value=VERSION)
+        cursor.fetchall = AsyncMock(return_value=self.aggregated)
+        return cursor
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        self.executed[id(query)] = params
+        cursor: MagicMock = MagicMock()
+        rows: List[Tuple] = self.results[id(query)]
+        cursor.fetchall = AsyncMock(return_value=rows)
+        cursor.fetchone = AsyncMock(return_value=rows[0] if rows else None)
+        return cursor
+
+
+def load(connection: FakeConnection, summary: bool = False, batched: bool = True) -> Any:
+    @asynccontextmanager
+    async def replica(budget: Optional[str] = None) -> AsyncIterator[FakeConnection]:
+        yield connection
+
+    async def run() -> Tuple[Optional[List[PVZInfoRow]], int, PVZInfoVersionRow]:
+        with patch("postgres.sql.mutation.replica", replica):
+            return await GetPVZInfo(
+                page=2, page_size=3, start_date=START, end_date=END,
+                summary=summary, parallel_count=False, batched=batched
+            ).get()
+
+    return run()
+
+
+class TestBatchedPVZInfo:
+    @pytest.mark.asyncio
+    async def test_tree_is_assembled_from_set_queries(self) -> None:
+        connection: FakeConnection = FakeConnection(PAGE)
+        pvz_data, total, version = await load(connection)
+
+        assert (total, version) == (3, VERSION)
+        assert [row.id for row in pvz_data] == [1, 2, 3]
+        assert [reception["id"] for reception in pvz_data[0].receptions] == [10, 12]
+        assert pvz_data[2].receptions == []
+        assert pvz_data[0].receptions[0] == {
+            "id": 10,
+            "pvz_id": 1,
+            "datetime": ACCEPTED_AT,
+            "status": "close",
+            "product_ids": [100, 101],
+            "products": [
+                {"id": 100, "accepting_id": 10, "datetime": ACCEPTED_AT, "type": "электроника"},
+                {"id": 101, "accepting_id": 10, "datetime": ACCEPTED_AT, "type": "обувь"},
+            ],
+            "product_count": 2,
+            "product_counts": {"электроника": 1, "одежда": 0, "обувь": 1},
+        }
+        assert [product["id"] for product in pvz_data[1].receptions[0]["products"]] == [102]
+
+        params: Dict[str, Any] = connection.executed[id(PVZ_RECEPTIONS_QUERY)]
+        assert params == {"pvz_ids": [1, 2, 3], "start_date": START, "end_date": END}
+        assert connection.executed[id(PVZ_PAGE_QUERY)] == {"page_size": 3, "offset": 3}
+
+    @pytest.mark.asyncio
+    async def test_batched_and_aggregated_pages_serialize_alike(self) -> None:
+        """Даты обоих вариантов - текст JSON Postgres: тело страницы и ETag не зависят от способа загрузки"""
+        assert "to_json(datetime) #>> '{}'" in PVZ_RECEPTIONS_QUERY.as_string(None)
+        assert "to_json(pr.datetime) #>> '{}'" in PVZ_PRODUCTS_QUERY.as_string(None)
+
+        connection: FakeConnection = FakeConnection(PAGE)
+        connection.aggregated = [
+            PVZInfoRow(id=pvz_id, city=city, registered_at=registered_at, receptions=loads(receptions))
+            for (pvz_id, city, registered_at), receptions in zip(PAGE, (
+                f"""[{{"id": 10, "pvz_id": 1, "datetime": "{ACCEPTED_AT}", "status": "close",
+                      "product_ids": [100, 101], "products": [
+                          {{"id": 100, "accepting_id": 10, "datetime": "{ACCEPTED_AT}", "type": "электроника"}},
+                          {{"id": 101, "accepting_id": 10, "datetime": "{ACCEPTED_AT}", "type": "обувь"}}],
+                      "product_count": 2, "product_counts": {{"электроника": 1, "одежда": 0, "обувь": 1}}}},
+                     {{"id": 12, "pvz_id": 1, "datetime": "{ACCEPTED_AT}", "status": "close",
+                      "product_ids": null, "products": [],
+                      "product_count": 0, "product_counts": {{"электроника": 0, "одежда": 0, "обувь": 0}}}}]""",
+                f"""[{{"id": 11, "pvz_id": 2, "datetime": "{ACCEPTED_AT}", "status": "in_progress",
+                      "product_ids": [102], "products": [
+                          {{"id": 102, "accepting_id": 11, "datetime": "{ACCEPTED_AT}", "type": "одежда"}}],
+                      "product_count": 1, "product_counts": {{"электроника": 0, "одежда": 1, "обувь": 0}}}}]""",
+                "[]",
+            ))
+        ]
+
+        batched, _, _ = await load(connection)
+        aggregated, _, _ = await load(connection, batched=False)
+
+        assert dumps([row.receptions for row in batched]) == dumps([row.receptions for row in aggregated])
+
+    @pytest.mark.asyncio
+    async def test_summary_skips_products_query(self) -> None:
+        connection: FakeConnection = FakeConnection(PAGE)
+        pvz_data, _, _ = await load(connection, summary=True)
+
+        assert id(PVZ_PRODUCTS_QUERY) not in connection.executed
+        assert "products" not in pvz_data[0].receptions[0]
+        assert pvz_data[1].receptions[0]["product_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_empty_page_skips_second_phase(self) -> None:
+        connection: FakeConnection = FakeConnection([])
+        connection.results[id(PVZ_INFO_COUNT_QUERY)] = [(0,)]
+        pvz_data, total, _ = await load(connection)
+
+        assert (pvz_data, total) == ([], 0)
+        assert id(PVZ_RECEPTIONS_QUERY) not in connection.executed
+
+    @pytest.mark.asyncio
+    async def test_keyset_page_skips_offset_and_count(self) -> None:
+        connection: FakeConnection = FakeConnection(PAGE)
+
+        @asynccontextmanager
+        async def replica(budget: Optional[str] = None) -> AsyncIterator[FakeConnection]:
+            yield connection
+
+        with patch("postgres.sql.mutation.replica", replica):
+            pvz_data: List[PVZInfoRow] = await GetPVZInfo(
+                page=1, page_size=3, start_date=START, end_date=END
+            ).after(3)
+
+        assert [row.id for row in pvz_data] == [1, 2, 3]
+        assert connection.executed[id(PVZ_AFTER_QUERY)] == {"last_id": 3, "page_size": 3}
+        assert id(PVZ_PAGE_QUERY) not in connection.executed
+        assert id(PVZ_INFO_COUNT_QUERY) not in connection.executed
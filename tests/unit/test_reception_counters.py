@@ -0,0 +1,105 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Generator, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.dto import PVZInfoVersionRow
+from postgres.sql.mutation import GetPVZInfo
+from src.page_cache import PageCache
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dependencies import get_pvz_info
+from src.sso.dto import GetCurrentUserResponse, PVZInfoResponse
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+VERSION: PVZInfoVersionRow = PVZInfoVersionRow(version=7, changed_at=START)
+
+
+@pytest.fixture
+def queries() -> Generator[List[str], None, None]:
+    """Тексты запросов, отправленных GetPVZInfo"""
+    sent: List[str] = []
+
+    def cursor(row_factory: Any = None) -> MagicMock:
+        fake: MagicMock = MagicMock()
+
+        async def execute(query: Any, params: Any = None) -> None:
+            sent.append(query if isinstance(query, str) else query.as_string())
+
+        fake.execute = execute
+        fake.fetchall = AsyncMock(return_value=[])
+        fake.fetchone = AsyncMock(return_value=VERSION)
+        return fake
+
+    async def execute(query: Any, params: Any = None) -> MagicMock:
+        sent.append(query.as_string())
+        count: MagicMock = MagicMock()
+        count.fetchone = AsyncMock(return_value=(0,))
+        return count
+
+    @asynccontextmanager
+    async def pipeline() -> AsyncIterator[None]:
+        yield
+
+    connection: MagicMock = MagicMock()
+    connection.cursor = cursor
+    connection.execute = execute
+    connection.pipeline = pipeline
+
+    @asynccontextmanager
+    async def replica(budget: Optional[str] = None) -> AsyncIterator[MagicMock]:
+        yield connection
+
+    with patch("postgres.sql.mutation.replica", replica):
+        yield sent
+
+
+@pytest.fixture
+def pvz_info_pages() -> Generator[PageCache, None, None]:
+    pages: PageCache = PageCache(name="test", max_entries=8, max_bytes=1024 * 1024)
+    with patch("src.sso.dependencies.PVZ_INFO_PAGES", pages):
+        yield pages
+
+
+class TestPVZInfoCounters:
+    @pytest.mark.asyncio
+    async def test_full_page_lists_products_and_counters(self, queries: List[str]) -> None:
+        await GetPVZInfo(page=1, page_size=10, start_date=START, end_date=END, batched=False).get()
+
+        page_query: str = next(query for query in queries if "json_agg" in query)
+        assert "FROM products pr" in page_query
+        assert "'product_count', ap.product_count" in page_query
+
+    @pytest.mark.asyncio
+    async def test_summary_skips_products_subquery(self, queries: List[str]) -> None:
+        await GetPVZInfo(page=1, page_size=10, start_date=START, end_date=END, summary=True, batched=False).get()
+
+        page_query: str = next(query for query in queries if "json_agg" in query)
+        assert "products pr" not in page_query
+        assert "'product_ids'" not in page_query
+        assert "'обувь', ap.shoes_count" in page_query
+
+
+class TestPVZInfoSummaryDependency:
+    @pytest.mark.asyncio
+    async def test_summary_is_passed_and_cached_separately(self, pvz_info_pages: PageCache) -> None:
+        current_user: GetCurrentUserResponse = GetCurrentUserResponse(
+            message="Authorization successful", email="test@example.com", role=VALID_USER_TYPES["moderator"])
+
+        etags: List[str] = []
+        with patch("src.sso.dependencies.GetPVZInfo", new_callable=MagicMock) as mutation:
+            mutation.return_value.get = AsyncMock(return_value=([], 0, VERSION))
+            for summary in (False, True):
+                result: PVZInfoResponse = await get_pvz_info(
+                    start_date="2025-04-01T00:00:00",
+                    end_date="2025-04-30T23:59:59",
+                    page=1,
+                    page_size=10,
+                    summary=summary,
+                    current_user=current_user
+                )
+                assert result.validators is not None
+                etags.append(result.validators.etag)
+
+        assert [call.kwargs["summary"] for call in mutation.call_args_list] == [False, True]
+        assert etags[0] != etags[1]
@@ -0,0 +1,56 @@
+import pytest
+from json import loads
+from datetime import datetime
+from typing import Any, Dict
+from postgres.dto import PVZInfoRow, ProductRow
+from src.responses import RecordJSONResponse, encode_record
+from src.sso.dto import PVZInfoResponse, AddProductResponse
+
+
+class TestRecordJSONResponse:
+    def test_slots_response_serialized_with_nested_rows(self) -> None:
+        registered_at: datetime = datetime.fromisoformat("2025-04-21T10:00:00+03:00")
+        receptions = [{"id": 1, "pvz_id": 1, "datetime": "2025-04-21T11:00:00+03:00", "products": []}]
+        content: PVZInfoResponse = PVZInfoResponse(
+            pvz_list=[PVZInfoRow(id=1, city="Москва", registered_at=registered_at, receptions=receptions)],
+            total=1,
+            page=1,
+            page_size=10,
+            result={"status": True}
+        )
+
+        body: Dict[str, Any] = loads(RecordJSONResponse(content=content).body)
+
+        assert body == {
+            "result": {"status": True},
+            "errors": None,
+            "pvz_list": [
+                {"id": 1, "city": "Москва", "registered_at": "2025-04-21 10:00:00+03:00", "receptions": receptions}
+            ],
+            "total": 1,
+            "page": 1,
+            "page_size": 10,
+        }
+
+    def test_error_response_keeps_all_fields(self) -> None:
+        body: Dict[str, Any] = loads(RecordJSONResponse(content=AddProductResponse(errors="Приемка закрыта")).body)
+
+        assert body == {
+            "result": None,
+            "errors": "Приемка закрыта",
+            "product_id": None,
+            "accepting_id": None,
+            "type": None,
+            "datetime": None,
+        }
+
+    def test_encode_record_row(self) -> None:
+        product_datetime: datetime = datetime.fromisoformat("2025-04-21T10:00:00+03:00")
+
+        assert encode_record(ProductRow(id=1, accepting_id=2, type="обувь", datetime=product_datetime)) == {
+            "id": 1, "accepting_id": 2, "type": "обувь", "datetime": product_datetime
+        }
+
+    def test_encode_record_unsupported_type(self) -> None:
+        with pytest.raises(TypeError):
+            encode_record(object())
@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Generator, List
+from unittest.mock import AsyncMock, MagicMock, patch
+from google.protobuf.timestamp_pb2 import Timestamp
+from grpc import StatusCode, aio
+from postgres.dto import PVZInfoRow, PVZInfoVersionRow
+from src.rpc.pvz_pb2 import PVZ, ListPVZRequest, ListPVZResponse, StreamPVZRequest
+from src.rpc.pvz_pb2_grpc import PVZServiceStub
+from src.rpc.server import GRPCConfig, GRPCServer, pvz_message
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dto import GetCurrentUserResponse
+
+VERSION: PVZInfoVersionRow = PVZInfoVersionRow(version=42, changed_at=datetime.fromisoformat("2025-04-21T10:00:00+03:00"))
+
+
+def pvz_row(pvz_id: int) -> PVZInfoRow:
+    product: Dict[str, Any] = {
+        "id": pvz_id * 100, "accepting_id": pvz_id * 10, "datetime": "2025-04-21T10:05:00.5+03:00", "type": "обувь"}
+    reception: Dict[str, Any] = {
+        "id": pvz_id * 10,
+        "pvz_id": pvz_id,
+        "datetime": "2025-04-21T10:00:00+03:00",
+        "product_ids": [product["id"]],
+        "status": "close",
+        "products": [product],
+    }
+    return PVZInfoRow(
+        id=pvz_id, city="Казань", registered_at=datetime.fromisoformat("2025-04-01T10:00:00+03:00"),
+        receptions=[reception]
+    )
+
+
+def period(**fields: Any) -> Dict[str, Any]:
+    start_date: Timestamp = Timestamp()
+    start_date.FromDatetime(datetime.fromisoformat("2025-04-01T00:00:00+03:00"))
+    end_date: Timestamp = Timestamp()
+    end_date.FromDatetime(datetime.fromisoformat("2025-04-30T23:59:59+03:00"))
+    return {"start_date": start_date, "end_date": end_date, **fields}
+
+
+@pytest.fixture
+async def stub() -> AsyncIterator[PVZServiceStub]:
+    server: GRPCServer = GRPCServer(GRPCConfig(ENABLED=True, HOST="127.0.0.1", PORT=0, SHUTDOWN_GRACE=0))
+    await server.start()
+    async with aio.insecure_channel(f"127.0.0.1:{server.port}") as channel:
+        yield PVZServiceStub(channel)
+    await server.stop()
+
+
+@pytest.fixture
+def current_user() -> Generator[AsyncMock, None, None]:
+    with patch("src.rpc.server.get_current_user", new_callable=AsyncMock) as mock:
+        mock.return_value = GetCurrentUserResponse(
+            message="Authorization successful", email="test@example.com", role=VALID_USER_TYPES["client"])
+        yield mock
+
+
+@pytest.fixture
+def get_pvz_info() -> Generator[MagicMock, None, None]:
+    with patch("src.rpc.server.GetPVZInfo", new_callable=MagicMock) as mock:
+        yield mock
+
+
+class TestPVZMessage:
+    def test_nested_receptions_and_products(self) -> None:
+        message: PVZ = pvz_message(pvz_row(1))
+
+        assert message.city == "Казань"
+        assert message.registered_at.ToDatetime().isoformat() == "2025-04-01T07:00:00"
+        assert message.receptions[0].product_ids == [100]
+        assert message.receptions[0].products[0].type == "обувь"
+        assert message.receptions[0].products[0].accepted_at.ToDatetime().isoformat() == "2025-04-21T07:05:00.500000"
+
+
+class TestPVZService:
+    @pytest.mark.asyncio
+    async def test_list_pvz(self, stub: PVZServiceStub, current_user: AsyncMock, get_pvz_info: MagicMock) -> None:
+        get_pvz_info.return_value.get = AsyncMock(return_value=([pvz_row(1), pvz_row(2)], 7, VERSION))
+
+        response: ListPVZResponse = await stub.ListPVZ(
+            ListPVZRequest(**period(page=2, page_size=2)), metadata=(("authorization", "Bearer token"),))
+
+        assert [pvz.id for pvz in response.pvz_list] == [1, 2]
+        assert (response.total, response.page, response.page_size, response.version) == (7, 2, 2, 42)
+        assert current_user.call_args.kwargs["token"] == "token"
+        assert get_pvz_info.call_args.kwargs["start_date"] == datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+
+    @pytest.mark.asyncio
+    async def test_stream_pvz_pages_through_results(
+            self, stub: PVZServiceStub, current_user: AsyncMock, get_pvz_info: MagicMock
+    ) -> None:
+        get_pvz_info.return_value.after = AsyncMock(side_effect=[
+            [pvz_row(1), pvz_row(4)],
+            [pvz_row(7)],
+        ])
+
+        received: List[PVZ] = [
+            pvz async for pvz in stub.StreamPVZ(
+                StreamPVZRequest(**period(batch_size=2)), metadata=(("authorization", "Bearer token"),))
+        ]
+
+        assert [pvz.id for pvz in received] == [1, 4, 7]
+        assert [call.args for call in get_pvz_info.return_value.after.await_args_list] == [(0,), (4,)]
+        get_pvz_info.return_value.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalid_token(self, stub: PVZServiceStub, current_user: AsyncMock, get_pvz_info: MagicMock) -> None:
+        current_user.return_value = GetCurrentUserResponse(errors="Некорректный токен")
+
+        with pytest.raises(aio.AioRpcError) as exc_info:
+            await stub.ListPVZ(ListPVZRequest(**period()), metadata=(("authorization", "Bearer bad"),))
+
+        assert exc_info.value.code() == StatusCode.UNAUTHENTICATED
+        assert exc_info.value.details() == "Некорректный токен"
+        get_pvz_info.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_period_is_required(self, stub: PVZServiceStub, current_user: AsyncMock) -> None:
+        with pytest.raises(aio.AioRpcError) as exc_info:
+            await stub.ListPVZ(ListPVZRequest(page=1), metadata=(("authorization", "Bearer token"),))
+
+        assert exc_info.value.code() == StatusCode.INVALID_ARGUMENT
@@ -0,0 +1,66 @@
+import pytest
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.sql.mutation import SweepExpiredSessions
+from src.metrics import METRICS
+from src.sessions import SessionSweeper
+from src.tokens import SessionsConfig, token_digest
+
+
+class FakeConnection:
+    """DELETE удаляет по очереди заданное число строк"""
+
+    def __init__(self, deleted: List[int]) -> None:
+        self.deleted: List[int] = deleted
+        self.batch_sizes: List[int] = []
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+    async def execute(self, query: str, params: Any) -> MagicMock:
+        self.batch_sizes.append(params[0])
+        cursor: MagicMock = MagicMock()
+        cursor.rowcount = self.deleted.pop(0)
+        return cursor
+
+
+@pytest.fixture
+def connection(patch_primary: Callable[[Any], Any]) -> FakeConnection:
+    fake: FakeConnection = FakeConnection([100, 100, 7])
+    patch_primary(fake)
+    return fake
+
+
+class TestTokenDigest:
+    def test_digest_is_fixed_size_and_stable(self) -> None:
+        assert len(token_digest("token")) == 32
+        assert token_digest("token") == token_digest("token")
+        assert token_digest("token") != token_digest("other")
+
+
+class TestSweepExpiredSessions:
+    @pytest.mark.asyncio
+    async def test_sweeps_in_batches(self, connection: FakeConnection) -> None:
+        assert await SweepExpiredSessions(batch_size=100).sweep() == 207
+        assert connection.batch_sizes == [100, 100, 100]
+
+
+class TestSessionSweeper:
+    @pytest.mark.asyncio
+    async def test_run_once_counts_deleted(self) -> None:
+        before: float = METRICS.get("sessions_swept_total")
+        with patch("src.sessions.SweepExpiredSessions", new_callable=MagicMock) as mutation:
+            mutation.return_value.sweep = AsyncMock(return_value=5)
+            deleted: int = await SessionSweeper(SessionsConfig(SWEEP_BATCH_SIZE=50)).run_once()
+
+        assert deleted == 5
+        mutation.assert_called_once_with(batch_size=50)
+        assert METRICS.get("sessions_swept_total") == before + 5
+
+    @pytest.mark.asyncio
+    async def test_run_once_survives_errors(self) -> None:
+        with patch("src.sessions.SweepExpiredSessions", new_callable=MagicMock) as mutation:
+            mutation.return_value.sweep = AsyncMock(side_effect=Exception("connection refused"))
+            assert await SessionSweeper().run_once() == 0
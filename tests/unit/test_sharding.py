@@ -0,0 +1,294 @@
+import pytest
+from asyncio import CancelledError
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Generator, List, Optional, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.config import DEFAULT_SHARD, PSQLConfig, ShardMap, parse_shards
+from postgres.dto import ProductSearchRow, PVZInfoVersionRow
+from postgres.sql.migrations import MigrationsConfig, ShardSequences
+from postgres.sql.mutation import (
+    PVZ_INFO_COUNT_QUERY,
+    PVZ_INFO_VERSION_QUERY,
+    PVZ_PAGE_QUERY,
+    PVZ_RECEPTIONS_QUERY,
+    GetPVZInfo,
+    ImportPVZ,
+    SearchProducts,
+)
+
+START: datetime = datetime.fromisoformat("2025-04-01T00:00:00+03:00")
+END: datetime = datetime.fromisoformat("2025-04-30T23:59:59+03:00")
+COUNT: int = 3
+
+
+def shard_map() -> ShardMap:
+    return ShardMap(routers=[MagicMock() for _ in range(COUNT)], cities={"Казань": 1, "Санкт-Петербург": 2})
+
+
+class ShardConnection:
+    """Шард k хранит ПВЗ с id k + 1, k + 1 + COUNT, ...; запросы запоминаются по id() объекта запроса"""
+
+    def __init__(self, shard: int, pvz_ids: List[int], version: int) -> None:
+        self.shard: int = shard
+        self.version: PVZInfoVersionRow = PVZInfoVersionRow(
+            version=version, changed_at=START + timedelta(days=shard)
+        )
+        self.pvz_rows: List[Tuple] = [(pvz_id, "Москва", START) for pvz_id in pvz_ids]
+        self.executed: List[int] = []
+        self.params: Dict[int, Any] = {}
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[None]:
+        yield
+
+    def cursor(self, row_factory: Any = None) -> MagicMock:
+        cursor: MagicMock = MagicMock()
+
+        async def execute(query: Any, params: Any = None) -> None:
+            self.executed.append(id(query))
+
+        cursor.execute = execute
+        cursor.fetchone = AsyncMock(return_value=self.version)
+        return cursor
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        self.executed.append(id(query))
+        self.params[id(query)] = params
+        rows: List[Tuple] = []
+        if query is PVZ_PAGE_QUERY:
+            rows = self.pvz_rows[:params["page_size"]]
+        elif query is PVZ_INFO_COUNT_QUERY:
+            rows = [(len(self.pvz_rows),)]
+        cursor: MagicMock = MagicMock()
+        cursor.fetchall = AsyncMock(return_value=rows)
+        cursor.fetchone = AsyncMock(return_value=rows[0] if rows else None)
+        return cursor
+
+
+@pytest.fixture
+def shards() -> Generator[List[ShardConnection], None, None]:
+    connections: List[ShardConnection] = [
+        ShardConnection(0, [1, 4, 7], version=5),
+        ShardConnection(1, [2, 5], version=3),
+        ShardConnection(2, [3, 6, 9], version=1),
+    ]
+
+    @asynccontextmanager
+    async def replica(
+            max_lag: Optional[float] = None,
+            budget: Optional[str] = None,
+            shard: int = DEFAULT_SHARD
+    ) -> AsyncIterator[ShardConnection]:
+        assert budget == "GetPVZInfo"
+        yield connections[shard]
+
+    with patch("postgres.sql.mutation.SHARDS", shard_map()), patch("postgres.sql.mutation.replica", replica):
+        yield connections
+
+
+def pvz_info(page: int, page_size: int, known_version: Optional[int] = None) -> GetPVZInfo:
+    return GetPVZInfo(page=page, page_size=page_size, start_date=START, end_date=END, known_version=known_version)
+
+
+class TestShardMap:
+    def test_parse_shards_groups_cities_by_dsn(self) -> None:
+        dsns, cities = parse_shards(" Казань = postgresql://kzn/pvz ; Санкт-Петербург=postgresql://kzn/pvz;"
+                                    "Москва=host=msk dbname=pvz")
+        assert dsns == ["postgresql://kzn/pvz", "host=msk dbname=pvz"]
+        assert cities == {"Казань": 1, "Санкт-Петербург": 1, "Москва": 2}
+
+    def test_routing_by_city_and_id(self) -> None:
+        shards: ShardMap = shard_map()
+        assert shards.enabled
+        assert [shards.for_city(city) for city in ("Москва", "Казань", "Санкт-Петербург")] == [0, 1, 2]
+        assert [shards.for_id(entity_id) for entity_id in (1, 2, 3, 4, 9)] == [0, 1, 2, 0, 2]
+
+    def test_single_database_is_not_sharded(self) -> None:
+        shards: ShardMap = ShardMap(routers=[MagicMock()])
+        assert not shards.enabled
+        assert shards.for_id(42) == shards.for_city("Казань") == DEFAULT_SHARD
+
+
+class TestScatterGatherPVZInfo:
+    @pytest.mark.asyncio
+    async def test_page_is_merged_by_id(self, shards: List[ShardConnection]) -> None:
+        pvz_data, total, version = await pvz_info(page=2, page_size=3).get()
+
+        assert pvz_data is not None
+        assert [row.id for row in pvz_data] == [4, 5, 6]
+        assert total == 8
+        assert version == PVZInfoVersionRow(version=9, changed_at=START + timedelta(days=2))
+        # Каждый шард отдает первые offset + page_size своих ПВЗ
+        assert {connection.params[id(PVZ_PAGE_QUERY)]["page_size"] for connection in shards} == {6}
+        assert shards[1].params[id(PVZ_RECEPTIONS_QUERY)]["pvz_ids"] == [5]
+
+    @pytest.mark.asyncio
+    async def test_shards_without_page_rows_skip_second_phase(self, shards: List[ShardConnection]) -> None:
+        pvz_data, _, _ = await pvz_info(page=1, page_size=2).get()
+
+        assert pvz_data is not None
+        assert [row.id for row in pvz_data] == [1, 2]
+        assert id(PVZ_RECEPTIONS_QUERY) not in shards[2].executed
+
+    @pytest.mark.asyncio
+    async def test_unchanged_version_of_all_shards(self, shards: List[ShardConnection]) -> None:
+        pvz_data, total, version = await pvz_info(page=1, page_size=2, known_version=9).get()
+
+        assert (pvz_data, total, version.version) == (None, 0, 9)
+        assert all(connection.executed == [id(PVZ_INFO_VERSION_QUERY)] for connection in shards)
+
+
+def found(product_id: int, minute: int) -> ProductSearchRow:
+    return ProductSearchRow(
+        id=product_id, accepting_id=product_id, pvz_id=product_id, type="обувь",
+        datetime=datetime.fromisoformat(f"2025-04-21T10:{minute:02d}:00+03:00")
+    )
+
+
+class TestShardedSearch:
+    @pytest.mark.asyncio
+    async def test_pages_are_merged_by_keyset(self) -> None:
+        pages: Dict[int, List[ProductSearchRow]] = {
+            0: [found(1, 1), found(4, 5)],
+            1: [found(2, 2), found(5, 3)],
+            2: [found(3, 4)],
+        }
+        fetch: AsyncMock = AsyncMock(side_effect=lambda shard, query, params: pages[shard])
+        with patch("postgres.sql.mutation.SHARDS", shard_map()), \
+                patch.object(SearchProducts, "_search_shard", fetch):
+            rows: List[ProductSearchRow] = await SearchProducts(start_date=START, end_date=END, limit=3).search()
+
+        assert [row.id for row in rows] == [1, 2, 5]
+
+    @pytest.mark.asyncio
+    async def test_pvz_filter_queries_one_shard(self) -> None:
+        fetch: AsyncMock = AsyncMock(return_value=[found(5, 1)])
+        with patch("postgres.sql.mutation.SHARDS", shard_map()), \
+                patch.object(SearchProducts, "_search_shard", fetch):
+            await SearchProducts(start_date=START, end_date=END, limit=3, pvz_id=5).search()
+
+        assert [call.args[0] for call in fetch.await_args_list] == [1]
+
+
+class TestShardedImport:
+    @pytest.mark.asyncio
+    async def test_ids_are_returned_in_file_order(self) -> None:
+        async def cities() -> AsyncIterator[str]:
+            for city in ("Казань", "Москва", "Казань", "Санкт-Петербург"):
+                yield city
+
+        async def copy(shard: int, rows: AsyncIterator[Tuple[int, str]]) -> List[Tuple[int, int]]:
+            loaded: List[Tuple[int, int]] = [
+                (position, shard + 1 + COUNT * index) async for index, (position, _) in _enumerate(rows)
+            ]
+            return loaded[::-1]
+
+        with patch("postgres.sql.mutation.SHARDS", shard_map()), patch.object(ImportPVZ, "_copy", staticmethod(copy)):
+            created: List[int] = await ImportPVZ(cities=cities()).load()  # type: ignore[assignment]
+
+        assert created == [2, 1, 5, 3]
+
+    @pytest.mark.asyncio
+    async def test_rows_are_copied_while_file_is_read(self) -> None:
+        read: List[int] = [0]
+
+        async def cities() -> AsyncIterator[str]:
+            for city in ("Москва", "Казань") * 5:
+                read[0] += 1
+                yield city
+
+        copied_after: List[int] = []
+
+        async def copy(shard: int, rows: AsyncIterator[Tuple[int, str]]) -> List[Tuple[int, int]]:
+            loaded: List[Tuple[int, int]] = []
+            async for position, _ in rows:
+                copied_after.append(read[0])
+                loaded.append((position, position + 1))
+            return loaded
+
+        with patch("postgres.sql.mutation.SHARDS", shard_map()), patch.object(ImportPVZ, "_copy", staticmethod(copy)), \
+                patch.object(PSQLConfig, "SHARD_IMPORT_QUEUE_SIZE", 1):
+            created: List[int] = await ImportPVZ(cities=cities()).load()  # type: ignore[assignment]
+
+        assert created == list(range(1, 11))
+        # Очередь шарда на одну строку - первые строки ушли в COPY задолго до конца файла
+        assert copied_after[0] < 10
+
+    @pytest.mark.asyncio
+    async def test_failed_shard_stops_import(self) -> None:
+        async def cities() -> AsyncIterator[str]:
+            for city in ("Москва", "Казань") * 5:
+                yield city
+
+        cancelled: List[int] = []
+
+        async def copy(shard: int, rows: AsyncIterator[Tuple[int, str]]) -> List[Tuple[int, int]]:
+            if shard == 1:
+                raise Exception("invalid input value for enum city_type")
+            try:
+                return [(position, position + 1) async for position, _ in rows]
+            except CancelledError:
+                cancelled.append(shard)
+                raise
+
+        with patch("postgres.sql.mutation.SHARDS", shard_map()), patch.object(ImportPVZ, "_copy", staticmethod(copy)), \
+                patch.object(PSQLConfig, "SHARD_IMPORT_QUEUE_SIZE", 1):
+            with pytest.raises(Exception, match="invalid input value"):
+                await ImportPVZ(cities=cities()).load()
+
+        assert cancelled == [0]
+
+
+async def _enumerate(rows: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Tuple[int, Tuple[int, str]]]:
+    index: int = 0
+    async for row in rows:
+        yield index, row
+        index += 1
+
+
+class SequenceConnection:
+    def __init__(self, misplaced: int, increment: int, last_value: int, is_called: bool, max_id: int) -> None:
+        self.results: List[Tuple] = [(misplaced,)]
+        for table in ("pvz_list", "accepting_products", "products"):
+            self.results += [(f"public.{table}_id_seq", increment, max_id), (last_value, is_called)]
+        self.executed: List[Tuple[str, Any]] = []
+
+    async def execute(self, query: Any, params: Any = None) -> MagicMock:
+        text: str = query if isinstance(query, str) else query.as_string(None)
+        self.executed.append((text, params))
+        cursor: MagicMock = MagicMock()
+        # Результаты выдаются по порядку только чтениям, ALTER SEQUENCE и setval ничего не забирают
+        reads: bool = "SELECT" in text and "setval" not in text
+        cursor.fetchone = AsyncMock(return_value=self.results.pop(0) if reads else None)
+        return cursor
+
+
+class TestShardSequences:
+    @pytest.mark.asyncio
+    async def test_fresh_sequences_get_shard_stride(self) -> None:
+        connection: SequenceConnection = SequenceConnection(0, increment=1, last_value=1, is_called=False, max_id=0)
+        await ShardSequences(shard=1, count=COUNT).apply(connection, MigrationsConfig())  # type: ignore[arg-type]
+
+        assert ("ALTER SEQUENCE public.pvz_list_id_seq INCREMENT BY 3", None) in connection.executed
+        assert ("SELECT setval(%s, %s, false)", ("public.pvz_list_id_seq", 2)) in connection.executed
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_move_next_id_past_them(self) -> None:
+        connection: SequenceConnection = SequenceConnection(0, increment=1, last_value=7, is_called=True, max_id=7)
+        await ShardSequences(shard=2, count=COUNT).apply(connection, MigrationsConfig())  # type: ignore[arg-type]
+
+        assert ("SELECT setval(%s, %s, false)", ("public.products_id_seq", 9)) in connection.executed
+
+    @pytest.mark.asyncio
+    async def test_aligned_sequences_are_left_alone(self) -> None:
+        connection: SequenceConnection = SequenceConnection(0, increment=3, last_value=8, is_called=True, max_id=8)
+        await ShardSequences(shard=1, count=COUNT).apply(connection, MigrationsConfig())  # type: ignore[arg-type]
+
+        assert not any("setval" in query or "ALTER" in query for query, _ in connection.executed)
+
+    @pytest.mark.asyncio
+    async def test_foreign_pvz_ids_are_rejected(self) -> None:
+        connection: SequenceConnection = SequenceConnection(4, increment=1, last_value=4, is_called=True, max_id=4)
+        with pytest.raises(Exception, match="ПВЗ с id другого шарда"):
+            await ShardSequences(shard=0, count=COUNT).apply(connection, MigrationsConfig())  # type: ignore[arg-type]
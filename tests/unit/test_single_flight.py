@@ -0,0 +1,133 @@
+import pytest
+from asyncio import CancelledError, Event, create_task, gather, sleep
+from typing import Any, List, Optional
+from src.metrics import METRICS
+from src.single_flight import SingleFlight, SingleFlightConfig
+
+
+class SlowCall:
+    """Вызов ждет release - все одновременные обращения успевают встать в очередь"""
+
+    def __init__(self, result: Any = "digest", error: Optional[Exception] = None) -> None:
+        self.result: Any = result
+        self.error: Optional[Exception] = error
+        self.release: Event = Event()
+        self.calls: int = 0
+        self.cancelled: bool = False
+
+    async def __call__(self) -> Any:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_call(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-shared")
+        call: SlowCall = SlowCall()
+        waiters: List[Any] = [create_task(flight.do("user@mail.ru", call)) for _ in range(5)]
+        await sleep(0)
+        call.release.set()
+
+        assert await gather(*waiters) == ["digest"] * 5
+        assert call.calls == 1
+        assert flight.in_flight() == 0
+        assert METRICS.get("single_flight_calls_total", call="test-shared", role="follower") == 4
+
+    @pytest.mark.asyncio
+    async def test_result_is_not_cached_after_completion(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-sequential")
+        call: SlowCall = SlowCall()
+        call.release.set()
+
+        await flight.do("key", call)
+        await flight.do("key", call)
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-keys")
+        call: SlowCall = SlowCall()
+        waiters: List[Any] = [create_task(flight.do(key, call)) for key in ("a", "b")]
+        await sleep(0)
+        call.release.set()
+
+        await gather(*waiters)
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-error")
+        call: SlowCall = SlowCall(error=Exception("База недоступна"))
+        waiters: List[Any] = [create_task(flight.do("key", call)) for _ in range(3)]
+        await sleep(0)
+        call.release.set()
+
+        results: List[Any] = await gather(*waiters, return_exceptions=True)
+        assert [str(result) for result in results] == ["База недоступна"] * 3
+        assert call.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-cancel-one")
+        call: SlowCall = SlowCall()
+        first = create_task(flight.do("key", call))
+        second = create_task(flight.do("key", call))
+        await sleep(0)
+
+        first.cancel()
+        await sleep(0)
+        call.release.set()
+
+        assert await second == "digest"
+        assert first.cancelled()
+        assert not call.cancelled
+
+    @pytest.mark.asyncio
+    async def test_last_waiter_cancels_call(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-cancel-all")
+        call: SlowCall = SlowCall()
+        waiters: List[Any] = [create_task(flight.do("key", call)) for _ in range(2)]
+        await sleep(0)
+
+        for waiter in waiters:
+            waiter.cancel()
+        await gather(*waiters, return_exceptions=True)
+        await sleep(0)
+
+        assert call.cancelled
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_call_after_last_waiter_cancelled_starts_new_flight(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-cancel-rejoin")
+        call: SlowCall = SlowCall()
+        waiter = create_task(flight.do("key", call))
+        await sleep(0)
+
+        waiter.cancel()
+        # Новый вызов выполняется в той же итерации цикла, сразу после отмены последнего ожидающего
+        rejoined = create_task(flight.do("key", call))
+        await gather(waiter, return_exceptions=True)
+        call.release.set()
+
+        assert await rejoined == "digest"
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_calls_directly(self) -> None:
+        flight: SingleFlight[Any] = SingleFlight("test-disabled", SingleFlightConfig(ENABLED=False))
+        call: SlowCall = SlowCall()
+        waiters: List[Any] = [create_task(flight.do("key", call)) for _ in range(3)]
+        await sleep(0)
+        call.release.set()
+
+        await gather(*waiters)
+        assert call.calls == 3
@@ -0,0 +1,135 @@
+import pytest
+from asyncio import Event, Task, create_task, sleep
+from contextlib import asynccontextmanager
+from functools import partial
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Generator, List
+from unittest.mock import AsyncMock, MagicMock, patch
+from postgres.config import DEFAULT_SHARD
+from postgres.sql.mutation import CloseStaleReceptions
+from src.metrics import METRICS
+from src.sso.constants import VALID_USER_TYPES
+from src.sso.dependencies import close_stale_receptions
+from src.sso.dto import CloseStaleReceptionsResponse, GetCurrentUserResponse
+from src.stale_receptions import StaleReceptionsConfig, StaleReceptionsJob
+
+
+class FakeConnection:
+    """SELECT ... FOR UPDATE SKIP LOCKED отдает заранее заданные пачки id"""
+
+    def __init__(self, batches: List[List[int]]) -> None:
+        self.batches: List[List[int]] = batches
+        self.updates: List[List[int]] = []
+        self.transactions: int = 0
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        self.transactions += 1
+        yield
+
+    async def execute(self, query: str, params: Any) -> MagicMock:
+        cursor: MagicMock = MagicMock()
+        if "FOR UPDATE SKIP LOCKED" in query:
+            cursor.fetchall = AsyncMock(return_value=[(stale_id,) for stale_id in self.batches.pop(0)])
+        else:
+            self.updates.append(params[0])
+        return cursor
+
+
+@pytest.fixture
+def connection(patch_primary: Callable[[Any], Any]) -> FakeConnection:
+    fake: FakeConnection = FakeConnection([[1, 2], [3, 4], [5]])
+    patch_primary(fake)
+    return fake
+
+
+@pytest.fixture
+def mutation() -> Generator[MagicMock, None, None]:
+    with patch("src.stale_receptions.CloseStaleReceptions", new_callable=MagicMock) as mock:
+        mock.return_value.close = AsyncMock(return_value=3)
+        yield mock
+
+
+class TestCloseStaleReceptions:
+    @pytest.mark.asyncio
+    async def test_closes_in_batches_until_short_batch(self, connection: FakeConnection) -> None:
+        closed: int = await CloseStaleReceptions(max_age=timedelta(hours=1), batch_size=2).close()
+
+        assert closed == 5
+        assert connection.updates == [[1, 2], [3, 4], [5]]
+        assert connection.transactions == 3
+
+    @pytest.mark.asyncio
+    async def test_nothing_stale_skips_update(self, patch_primary: Callable[[Any], Any]) -> None:
+        fake: FakeConnection = FakeConnection([[]])
+        patch_primary(fake)
+
+        closed: int = await CloseStaleReceptions(max_age=timedelta(hours=1)).close()
+
+        assert closed == 0
+        assert fake.updates == []
+
+
+class TestStaleReceptionsJob:
+    @pytest.mark.asyncio
+    async def test_run_once_reports_closed(self, mutation: MagicMock) -> None:
+        before: float = METRICS.get("stale_receptions_closed_total", trigger="schedule")
+        job: StaleReceptionsJob = StaleReceptionsJob(StaleReceptionsConfig(MAX_AGE_HOURS=2, BATCH_SIZE=10))
+
+        assert await job.run_once() == 3
+        mutation.assert_called_once_with(max_age=timedelta(hours=2), batch_size=10, shard=DEFAULT_SHARD)
+        assert METRICS.get("stale_receptions_closed_total", trigger="schedule") == before + 3
+
+    @pytest.mark.asyncio
+    async def test_shards_are_closed_concurrently(self, mutation: MagicMock) -> None:
+        started: List[int] = []
+        release: Event = Event()
+
+        async def close(shard: int) -> int:
+            started.append(shard)
+            await release.wait()
+            return shard + 1
+
+        mutation.side_effect = lambda max_age, batch_size, shard: MagicMock(close=partial(close, shard))
+        shards: MagicMock = MagicMock()
+        shards.shards.return_value = range(3)
+        with patch("src.stale_receptions.SHARDS", shards):
+            job: Task = create_task(StaleReceptionsJob().run_once())
+            await sleep(0.01)
+            # Все шарды начали закрытие, пока ни один не закончил
+            assert started == [0, 1, 2]
+            release.set()
+            assert await job == 6
+
+    @pytest.mark.asyncio
+    async def test_run_once_survives_errors(self, mutation: MagicMock) -> None:
+        mutation.return_value.close = AsyncMock(side_effect=Exception("connection refused"))
+        before: float = METRICS.get("stale_receptions_runs_total", status="error")
+
+        assert await StaleReceptionsJob().run_once() == 0
+        assert METRICS.get("stale_receptions_runs_total", status="error") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_job_does_not_start(self) -> None:
+        job: StaleReceptionsJob = StaleReceptionsJob(StaleReceptionsConfig(ENABLED=False))
+        job.start()
+        assert job._task is None
+        await job.stop()
+
+
+class TestCloseStaleReceptionsDependency:
+    @pytest.mark.asyncio
+    async def test_moderator_closes(self, mutation: MagicMock, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: CloseStaleReceptionsResponse = await close_stale_receptions(
+            max_age_hours=6, current_user=user(VALID_USER_TYPES["moderator"]))
+
+        assert (result.closed, result.max_age_hours, result.errors) == (3, 6, None)
+        assert mutation.call_args.kwargs["max_age"] == timedelta(hours=6)
+
+    @pytest.mark.asyncio
+    async def test_client_is_forbidden(self, mutation: MagicMock, user: Callable[[str], GetCurrentUserResponse]) -> None:
+        result: CloseStaleReceptionsResponse = await close_stale_receptions(
+            max_age_hours=None, current_user=user(VALID_USER_TYPES["client"]))
+
+        assert result.errors == "У вас недостаточно прав - необходимая роль: moderator"
+        mutation.assert_not_called()
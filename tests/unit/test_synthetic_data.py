@@ -0,0 +1,90 @@
+import re
+from datetime import datetime
+from typing import List
+from bcrypt import checkpw
+from benchmarks.synthetic_data import (
+    ChunkPlan,
+    SyntheticConfig,
+    UsersPlan,
+    generate_chunk,
+    generate_users,
+    password_hash,
+    plan_chunks,
+    plan_users,
+)
+
+
+def build_config(seed: int = 42) -> SyntheticConfig:
+    return SyntheticConfig(
+        seed=seed,
+        users=25,
+        pvz=23,
+        receptions=(0, 4),
+        products=(0, 5),
+        open_ratio=0.5,
+        moderator_ratio=0.2,
+        start=datetime.fromisoformat("2024-01-01T00:00:00+03:00"),
+        days=30,
+        chunk_size=5,
+        users_chunk_size=10,
+    )
+
+
+class TestPlan:
+    def test_id_ranges_are_dense_across_chunks(self) -> None:
+        config: SyntheticConfig = build_config()
+        plans: List[ChunkPlan] = plan_chunks(config, (100, 200, 300))
+
+        assert [plan.pvz_count for plan in plans] == [5, 5, 5, 5, 3]
+        assert plans[0].first_pvz_id == 101
+        assert plans[0].first_reception_id == 201
+        assert plans[0].first_product_id == 301
+        for previous, current in zip(plans, plans[1:]):
+            assert current.first_reception_id == previous.first_reception_id + previous.receptions
+            assert current.first_product_id == previous.first_product_id + previous.products
+
+    def test_users_are_split_into_chunks(self) -> None:
+        users: List[UsersPlan] = plan_users(build_config(), base_user_id=7)
+
+        assert [(plan.first_user_id, plan.count) for plan in users] == [(8, 10), (18, 10), (28, 5)]
+
+
+class TestGenerate:
+    def test_same_seed_gives_same_rows(self) -> None:
+        plan: ChunkPlan = plan_chunks(build_config(), (0, 0, 0))[2]
+
+        assert generate_chunk(build_config(), plan) == generate_chunk(build_config(), plan)
+        assert generate_chunk(build_config(), plan) != generate_chunk(build_config(seed=7), plan)
+
+    def test_rows_respect_schema_invariants(self) -> None:
+        config: SyntheticConfig = build_config()
+
+        for plan in plan_chunks(config, (0, 0, 0)):
+            pvz_rows, reception_rows, product_rows = generate_chunk(config, plan)
+
+            assert len(reception_rows) == plan.receptions
+            assert len(product_rows) == plan.products
+            assert [row[0] for row in product_rows] == list(
+                range(plan.first_product_id, plan.first_product_id + plan.products))
+
+            for pvz_id, _, registered_at in pvz_rows:
+                receptions = [row for row in reception_rows if row[1] == pvz_id]
+                assert sum(row[4] == "in_progress" for row in receptions) <= 1
+                assert all(row[2] >= registered_at for row in receptions)
+
+            for reception_id, _, accepted_at, product_ids, _ in reception_rows:
+                products = [row for row in product_rows if row[1] == reception_id]
+                assert product_ids == [row[0] for row in products]
+                assert all(row[2] > accepted_at for row in products)
+
+    def test_users_pass_table_checks(self) -> None:
+        config: SyntheticConfig = build_config()
+        hashed: str = password_hash(config, "password123", rounds=4)
+
+        assert hashed == password_hash(config, "password123", rounds=4)
+        assert checkpw(b"password123", hashed.encode())
+        for _, user_type, username, email, password in generate_users(config, plan_users(config, 0)[0], hashed):
+            assert user_type in ("client", "moderator")
+            assert len(username) >= 5
+            assert re.match(r"^[A-Za-z0-9._%-]+@[A-Za-z0-9.-]+[.][A-Za-z]+$", email)
+            assert password == hashed